@@ -49,7 +49,13 @@ def get_metadata():
     return target_db.metadata
 
 
+# Indexes of the models that only exist on PostgreSQL, e.g. the BRIN ones
+POSTGRESQL_ONLY_INDEXES = ["ix_ping_pinged_at_brin"]
+
+
 def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "index" and name in POSTGRESQL_ONLY_INDEXES:
+        return get_engine().dialect.name == "postgresql"
     return name not in ["apscheduler_jobs"]
 
 
@@ -102,6 +108,13 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            # Migrations may rewrite whole tables, past DB_STATEMENT_TIMEOUT: lift it,
+            # on a connection closed afterwards instead of going back to the pool
+            connection.detach()
+            connection.exec_driver_sql("SET statement_timeout = 0")
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -0,0 +1,41 @@
+"""probe_dispatcher
+
+Revision ID: 8a41c6e0d2b7
+Revises: 2fb8c8d409d7
+Create Date: 2026-10-18 09:12:44.118203
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8a41c6e0d2b7"
+down_revision = "2fb8c8d409d7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("service", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("next_probe_at", sa.DateTime(timezone=True), nullable=True)
+        )
+        batch_op.create_index(
+            batch_op.f("ix_service_next_probe_at"), ["next_probe_at"], unique=False
+        )
+
+    # Existing services get probed on the first dispatcher tick
+    op.execute(sa.text("UPDATE service SET next_probe_at = CURRENT_TIMESTAMP"))
+
+    # The per-service jobs are replaced by the single probe dispatcher job
+    if sa.inspect(op.get_bind()).has_table("apscheduler_jobs"):
+        op.execute(
+            sa.text("DELETE FROM apscheduler_jobs WHERE id LIKE 'ping_service_%'")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("service", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_service_next_probe_at"))
+        batch_op.drop_column("next_probe_at")
@@ -0,0 +1,85 @@
+"""canonical_service_uris
+
+Revision ID: a4c7e1b9d2f5
+Revises: b3d8e5f2a7c4
+Create Date: 2026-10-18 23:41:17.530284
+
+"""
+
+from itertools import groupby
+
+import sqlalchemy as sa
+from alembic import op
+
+from downtime_panda.blueprints.service.uris import canonical_uri
+
+# revision identifiers, used by Alembic.
+revision = "a4c7e1b9d2f5"
+down_revision = "b3d8e5f2a7c4"
+branch_labels = None
+depends_on = None
+
+service = sa.table("service", sa.column("id", sa.BigInteger()), sa.column("uri"))
+subscription = sa.table(
+    "subscription",
+    sa.column("user_id", sa.BigInteger()),
+    sa.column("service_id", sa.BigInteger()),
+)
+ping = sa.table("ping", sa.column("service_id", sa.BigInteger()))
+ping_rollup = sa.table("ping_rollup", sa.column("service_id", sa.BigInteger()))
+
+
+def upgrade():
+    """
+    Saves the URIs of the existing services in their canonical form.
+
+    Services whose URIs share a canonical form are merged into one: the one already
+    saved in the canonical form, or the oldest one. The subscriptions and the pings
+    of the others move to it. The rollups are first all dropped, to be computed again
+    from the earliest ping: they only ever resume from their latest bucket, so the
+    buckets of the kept services would miss the pings moved into them.
+    """
+    connection = op.get_bind()
+    services = connection.execute(sa.select(service.c.id, service.c.uri)).all()
+    by_uri = sorted(
+        (canonical_uri(uri), service_id, uri) for service_id, uri in services
+    )
+    if len({row[0] for row in by_uri}) < len(by_uri):
+        # Some services get merged
+        connection.execute(ping_rollup.delete())
+
+    for canonical, group in groupby(by_uri, key=lambda row: row[0]):
+        group = sorted(group, key=lambda row: (row[2] != canonical, row[1]))
+        (_, kept, uri), *merged = group
+        for _, service_id, _ in merged:
+            # A user subscribed to both keeps the subscription to the kept one
+            subscribed = sa.select(subscription.c.user_id).where(
+                subscription.c.service_id == kept
+            )
+            connection.execute(
+                subscription.delete().where(
+                    subscription.c.service_id == service_id,
+                    subscription.c.user_id.in_(subscribed),
+                )
+            )
+            connection.execute(
+                subscription.update()
+                .where(subscription.c.service_id == service_id)
+                .values(service_id=kept)
+            )
+            connection.execute(
+                ping.update()
+                .where(ping.c.service_id == service_id)
+                .values(service_id=kept)
+            )
+            connection.execute(service.delete().where(service.c.id == service_id))
+
+        if uri != canonical:
+            connection.execute(
+                service.update().where(service.c.id == kept).values(uri=canonical)
+            )
+
+
+def downgrade():
+    # The original URIs of the services are not kept, nor are the merged services
+    pass
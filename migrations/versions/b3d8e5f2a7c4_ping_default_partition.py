@@ -0,0 +1,51 @@
+"""ping_default_partition
+
+Revision ID: b3d8e5f2a7c4
+Revises: f1b7d4a2c9e8
+Create Date: 2026-10-18 22:58:41.206937
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b3d8e5f2a7c4"
+down_revision = "f1b7d4a2c9e8"
+branch_labels = None
+depends_on = None
+
+
+def is_ping_partitioned(bind) -> bool:
+    query = sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('ping')"
+    )
+    return bind.execute(query).first() is not None
+
+
+def upgrade():
+    """
+    Adds a DEFAULT partition to the ping table (PostgreSQL only).
+
+    Without it, saving a ping past the last partition fails, e.g. when the
+    retention job did not run for longer than the partitions created ahead.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_ping_partitioned(bind):
+        return
+
+    op.execute("CREATE TABLE IF NOT EXISTS ping_default PARTITION OF ping DEFAULT")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_ping_partitioned(bind):
+        return
+
+    if bind.execute(sa.text("SELECT 1 FROM ping_default LIMIT 1")).first():
+        raise RuntimeError(
+            "The ping_default partition still holds pings: let the retention job"
+            " move them into their partitions before downgrading"
+        )
+    op.execute("ALTER TABLE ping DETACH PARTITION ping_default")
+    op.execute("DROP TABLE ping_default")
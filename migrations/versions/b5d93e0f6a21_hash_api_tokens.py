@@ -0,0 +1,69 @@
+"""hash_api_tokens
+
+Revision ID: b5d93e0f6a21
+Revises: e2a87c5f0d19
+Create Date: 2026-10-18 14:52:06.118204
+
+"""
+
+import hashlib
+import hmac
+
+import sqlalchemy as sa
+from alembic import op
+from flask import current_app
+
+# revision identifiers, used by Alembic.
+revision = "b5d93e0f6a21"
+down_revision = "e2a87c5f0d19"
+branch_labels = None
+depends_on = None
+
+api_token = sa.table(
+    "api_token",
+    sa.column("id", sa.BigInteger()),
+    sa.column("token", sa.String()),
+    sa.column("token_hash", sa.String()),
+    sa.column("token_prefix", sa.String()),
+)
+
+
+def upgrade():
+    with op.batch_alter_table("api_token") as batch_op:
+        batch_op.add_column(
+            sa.Column("token_hash", sa.String(length=64), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("token_prefix", sa.String(length=6), nullable=True)
+        )
+
+    # Existing tokens keep working: hash them with the configured key
+    key = current_app.config["API_TOKEN_HASH_KEY"].encode()
+    connection = op.get_bind()
+    for id, token in connection.execute(sa.select(api_token.c.id, api_token.c.token)):
+        connection.execute(
+            api_token.update()
+            .where(api_token.c.id == id)
+            .values(
+                token_hash=hmac.new(key, token.encode(), hashlib.sha256).hexdigest(),
+                token_prefix=token[:6],
+            )
+        )
+
+    with op.batch_alter_table("api_token", recreate="always") as batch_op:
+        batch_op.alter_column("token_hash", nullable=False)
+        batch_op.alter_column("token_prefix", nullable=False)
+        batch_op.create_unique_constraint("uq_api_token_token_hash", ["token_hash"])
+        batch_op.drop_column("token")
+
+
+def downgrade():
+    # Tokens were never saved in clear, so they cannot be restored
+    op.execute(api_token.delete())
+
+    with op.batch_alter_table("api_token", recreate="always") as batch_op:
+        batch_op.add_column(sa.Column("token", sa.String(length=32), nullable=False))
+        batch_op.create_unique_constraint("uq_api_token_token", ["token"])
+        batch_op.drop_constraint("uq_api_token_token_hash", type_="unique")
+        batch_op.drop_column("token_prefix")
+        batch_op.drop_column("token_hash")
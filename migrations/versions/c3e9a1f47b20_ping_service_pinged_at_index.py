@@ -0,0 +1,53 @@
+"""ping_service_pinged_at_index
+
+Revision ID: c3e9a1f47b20
+Revises: 8a41c6e0d2b7
+Create Date: 2026-10-18 10:03:17.562941
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c3e9a1f47b20"
+down_revision = "8a41c6e0d2b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        op.create_index(
+            "ix_ping_service_id_pinged_at",
+            "ping",
+            ["service_id", sa.text("pinged_at DESC")],
+            unique=False,
+        )
+        return
+
+    # The ping table is huge: build the indexes without locking out the writers
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_ping_service_id_pinged_at",
+            "ping",
+            ["service_id", sa.text("pinged_at DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_ping_pinged_at_brin",
+            "ping",
+            ["pinged_at"],
+            unique=False,
+            postgresql_using="brin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_ping_pinged_at_brin", table_name="ping", if_exists=True)
+    op.drop_index("ix_ping_service_id_pinged_at", table_name="ping")
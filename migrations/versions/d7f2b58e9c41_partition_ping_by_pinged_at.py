@@ -0,0 +1,137 @@
+"""partition_ping_by_pinged_at
+
+Revision ID: d7f2b58e9c41
+Revises: c3e9a1f47b20
+Create Date: 2026-10-18 11:26:08.904517
+
+"""
+
+from datetime import datetime, timedelta
+
+import pytz
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d7f2b58e9c41"
+down_revision = "c3e9a1f47b20"
+branch_labels = None
+depends_on = None
+
+# Daily partitions created right away, the retention job takes over from there
+PARTITIONS_AHEAD = 7
+
+
+def is_ping_partitioned(bind) -> bool:
+    query = sa.text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('ping')"
+    )
+    return bind.execute(query).first() is not None
+
+
+def upgrade():
+    """
+    Turns `ping` into a table partitioned by `pinged_at` (PostgreSQL only).
+
+    The existing rows are not copied: the old table is attached as-is, as the
+    partition holding everything before tomorrow, and dropped by the retention job
+    once all of its pings are expired.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or is_ping_partitioned(bind):
+        return
+
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('ping', 'id')"))
+    sequence = sequence.scalar_one()
+
+    today = datetime.now(pytz.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    boundary = today + timedelta(days=1)
+
+    # Index and constraint names are unique per schema, free them for the new table
+    op.execute("ALTER TABLE ping RENAME TO ping_legacy")
+    op.execute(
+        "ALTER TABLE ping_legacy RENAME CONSTRAINT ping_pkey TO ping_legacy_pkey"
+    )
+    op.execute(
+        "ALTER INDEX ix_ping_service_id_pinged_at"
+        " RENAME TO ix_ping_legacy_service_id_pinged_at"
+    )
+    op.execute(
+        "ALTER INDEX IF EXISTS ix_ping_pinged_at_brin RENAME TO ix_ping_legacy_pinged_at_brin"
+    )
+
+    op.execute(
+        f"""
+        CREATE TABLE ping (
+            id BIGINT NOT NULL DEFAULT nextval('{sequence}'),
+            service_id BIGINT NOT NULL,
+            http_response INTEGER NOT NULL,
+            response_time INTERVAL NOT NULL,
+            pinged_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT ping_pkey PRIMARY KEY (id, pinged_at),
+            CONSTRAINT ping_service_id_fkey FOREIGN KEY (service_id)
+                REFERENCES service (id) ON UPDATE CASCADE ON DELETE RESTRICT
+        ) PARTITION BY RANGE (pinged_at)
+        """
+    )
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY ping.id")
+    op.execute(
+        "CREATE INDEX ix_ping_service_id_pinged_at ON ping (service_id, pinged_at DESC)"
+    )
+    op.execute("CREATE INDEX ix_ping_pinged_at_brin ON ping USING brin (pinged_at)")
+
+    # A validated CHECK constraint lets ATTACH PARTITION skip its own full scan
+    op.execute(
+        "ALTER TABLE ping_legacy ADD CONSTRAINT ping_legacy_pinged_at_check"
+        f" CHECK (pinged_at < '{boundary.isoformat()}') NOT VALID"
+    )
+    op.execute(
+        "ALTER TABLE ping_legacy VALIDATE CONSTRAINT ping_legacy_pinged_at_check"
+    )
+    op.execute(
+        "ALTER TABLE ping ATTACH PARTITION ping_legacy"
+        f" FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+    )
+    op.execute("ALTER TABLE ping_legacy DROP CONSTRAINT ping_legacy_pinged_at_check")
+
+    for day in range(PARTITIONS_AHEAD):
+        start = boundary + timedelta(days=day)
+        end = start + timedelta(days=1)
+        op.execute(
+            f"CREATE TABLE ping_p{start:%Y%m%d} PARTITION OF ping"
+            f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def downgrade():
+    """Moves every ping back into a regular, non-partitioned table."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_ping_partitioned(bind):
+        return
+
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('ping', 'id')"))
+    sequence = sequence.scalar_one()
+
+    op.execute("ALTER TABLE ping RENAME TO ping_partitioned")
+    op.execute(
+        f"""
+        CREATE TABLE ping (
+            id BIGINT NOT NULL DEFAULT nextval('{sequence}'),
+            service_id BIGINT NOT NULL,
+            http_response INTEGER NOT NULL,
+            response_time INTERVAL NOT NULL,
+            pinged_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT ping_plain_pkey PRIMARY KEY (id),
+            CONSTRAINT ping_service_id_fkey FOREIGN KEY (service_id)
+                REFERENCES service (id) ON UPDATE CASCADE ON DELETE RESTRICT
+        )
+        """
+    )
+    op.execute("INSERT INTO ping SELECT * FROM ping_partitioned")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY ping.id")
+    op.execute("DROP TABLE ping_partitioned")
+    op.execute("ALTER TABLE ping RENAME CONSTRAINT ping_plain_pkey TO ping_pkey")
+    op.execute(
+        "CREATE INDEX ix_ping_service_id_pinged_at ON ping (service_id, pinged_at DESC)"
+    )
+    op.execute("CREATE INDEX ix_ping_pinged_at_brin ON ping USING brin (pinged_at)")
@@ -0,0 +1,65 @@
+"""ping_service_id_id_index
+
+Revision ID: f1b7d4a2c9e8
+Revises: e9d3a7b5c1f6
+Create Date: 2026-10-18 21:47:05.318274
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f1b7d4a2c9e8"
+down_revision = "e9d3a7b5c1f6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(
+            "ix_ping_service_id_id", "ping", ["service_id", "id"], unique=False
+        )
+        return
+
+    partitions = bind.execute(
+        sa.text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits"
+            " WHERE inhparent = to_regclass('ping')"
+        )
+    ).scalars()
+    partitions = list(partitions)
+    if not partitions:
+        # The ping table is huge: build the index without locking out the writers
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "ix_ping_service_id_id",
+                "ping",
+                ["service_id", "id"],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        return
+
+    # An index on a partitioned table cannot be built concurrently: create it on
+    # the parent only, then build it concurrently on each partition and attach it
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_ping_service_id_id ON ONLY ping (service_id, id)"
+    )
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_service_id_id_idx"
+                f" ON {partition} (service_id, id)"
+            )
+            op.execute(
+                "ALTER INDEX ix_ping_service_id_id"
+                f" ATTACH PARTITION {partition}_service_id_id_idx"
+            )
+
+
+def downgrade():
+    op.drop_index("ix_ping_service_id_id", table_name="ping")
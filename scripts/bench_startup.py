@@ -0,0 +1,61 @@
+"""
+Startup time benchmark of Downtime Panda.
+
+Boots the application in fresh interpreters, as every web worker does, and reports
+how long importing the package and running `create_app` take, and how many
+database connections were opened on the way (there should be none).
+
+Usage:
+
+    uv run python scripts/bench_startup.py [--runs 10]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+BOOT = """
+import json, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+connections = []
+event.listen(Engine, "connect", lambda *_: connections.append(1))
+from downtime_panda import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "create_app": created - imported,
+    "connections": len(connections),
+}))
+"""
+
+
+def boot() -> dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", BOOT], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [boot() for _ in range(args.runs)]
+    for key in ("import", "create_app"):
+        timings = [run[key] * 1000 for run in runs]
+        print(
+            f"{key:>12}: median {statistics.median(timings):7.1f} ms,"
+            f" min {min(timings):7.1f} ms, max {max(timings):7.1f} ms"
+        )
+    print(f"{'connections':>12}: {max(run['connections'] for run in runs)}")
+
+
+if __name__ == "__main__":
+    main()
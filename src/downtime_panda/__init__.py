@@ -8,11 +8,8 @@ exports:
 __all__ = ["create_app"]
 
 import logging
-import os
 
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from flask import Flask
-from flask_migrate import stamp
 from loguru import logger
 
 from downtime_panda import extensions
@@ -22,11 +19,19 @@ from downtime_panda.blueprints.subscription.api import subscription_api_blueprin
 from downtime_panda.blueprints.subscription.routes import subscription_blueprint
 from downtime_panda.blueprints.token.routes import token_blueprint
 from downtime_panda.blueprints.user.routes import auth_blueprint, user_blueprint
+from downtime_panda.cli import prober_cli, schema_cli
 from downtime_panda.config import Config
+from downtime_panda.database import engine_options
 
 
 def create_app(config_class=Config):
-    """Create and configure the Flask application."""
+    """
+    Create and configure the Flask application.
+
+    The application does not touch the database and never probes anything: the
+    schema is managed by `flask schema init`, and the probes are run by a separate
+    `flask prober run` process.
+    """
     app = Flask(__name__)
 
     # ---------------------------------- LOGGING --------------------------------- #
@@ -57,24 +62,25 @@ def create_app(config_class=Config):
     # -------------------------------- EXTENSIONS -------------------------------- #
     logger.info("Initializing extensions...")
     extensions.login_manager.init_app(app)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
     extensions.db.init_app(app)
     extensions.migrate.init_app(app, extensions.db)
-    with app.app_context():
-        app.config["SCHEDULER_JOBSTORES"] = {
-            "default": SQLAlchemyJobStore(
-                engine=extensions.db.engine,
-                tablename="apscheduler_jobs",
-            ),
-        }
     extensions.scheduler.init_app(app)
+    extensions.latest_pings.init_app(app)
+    extensions.ping_broadcaster.init_app(app, extensions.db, extensions.latest_pings)
+    extensions.adaptive_schedule.init_app(app, extensions.db)
+    extensions.ping_writer.init_app(
+        app,
+        extensions.db,
+        extensions.latest_pings,
+        extensions.ping_broadcaster,
+        extensions.adaptive_schedule,
+    )
+    extensions.prober.init_app(app, extensions.ping_writer)
+    extensions.prober_shard.init_app(app)
     extensions.moment.init_app(app)
-
-    with app.app_context():
-        logger.info("Creating database tables...")
-        extensions.db.create_all()
-        if app.debug:
-            logger.info("Stamping...")
-            stamp()
+    extensions.token_cache.init_app(app)
+    extensions.password_hasher.init_app(app)
 
     # -------------------------------- BLUEPRINTS -------------------------------- #
     logger.info("Registering blueprints...")
@@ -86,14 +92,9 @@ def create_app(config_class=Config):
     app.register_blueprint(subscription_blueprint, url_prefix="/you/subscriptions")
     app.register_blueprint(token_blueprint, url_prefix="/you/tokens")
 
-    # -------------------------- SCHEDULER CONFIGURATION ------------------------- #
-    if (
-        not (app.debug or app.config["DEBUG"])
-        or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
-    ):
-        logger.info("Starting APScheduler...")
-        extensions.scheduler.start()
-        logger.info(extensions.scheduler.scheduler._jobstores)
+    # ------------------------------------ CLI ----------------------------------- #
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(prober_cli)
 
     logger.info("Downtime Panda application configured successfully.")
     return app
@@ -0,0 +1,310 @@
+"""
+ASGI entry point of Downtime Panda.
+
+Ordinary views are still served by the Flask application, on a thread pool. The
+endpoints that dashboards keep hitting are served by async handlers instead: the
+ping stream and the long polling of the live chart wait for new pings on the event
+loop without holding a thread, and the rest of the chart polling runs on its own
+small pool. Thousands of open dashboards therefore never starve logins and
+subscriptions of threads.
+
+Serve it with any ASGI server, e.g.:
+
+    uvicorn --factory downtime_panda.asgi:create_asgi_app
+
+exports:
+    - AsgiApp: The ASGI application wrapping the Flask one.
+    - create_asgi_app: Creates the ASGI application.
+"""
+
+__all__ = ["AsgiApp", "create_asgi_app"]
+
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable
+from urllib.parse import parse_qs, urlencode
+from uuid import UUID
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+
+from downtime_panda import create_app
+from downtime_panda.blueprints.service.models import Service
+from downtime_panda.blueprints.subscription.models import Subscription
+from downtime_panda.config import Config
+from downtime_panda.extensions import db, ping_broadcaster
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream; charset=utf-8"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),
+]
+
+
+class AsgiApp:
+    """
+    Routes requests either to an async handler, or to the Flask application.
+
+    Requests are matched against the Flask URL map, so the async handlers follow
+    the blueprint prefixes. Every endpoint without an async handler, and every
+    error page, is left to Flask.
+    """
+
+    def __init__(self, flask_app: Flask):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.url_adapter = flask_app.url_map.bind("")
+        self.poll_executor = ThreadPoolExecutor(
+            max_workers=flask_app.config["ASGI_POLL_WORKERS"],
+            thread_name_prefix="asgi-poll",
+        )
+        self.handlers = {
+            "service.service_stream": self.service_stream,
+            "subscription.get_subscription_pings_since": self.offload,
+            "subscription.get_subscription_pings_delta": self.long_poll,
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        if scope["type"] == "http":
+            try:
+                endpoint, args = self.url_adapter.match(scope["path"], scope["method"])
+            except HTTPException:
+                endpoint, args = None, {}
+
+            handler = self.handlers.get(endpoint)
+            if handler is not None:
+                await handler(scope, receive, send, **args)
+                return
+
+        await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.poll_executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --------------------------------- HANDLERS --------------------------------- #
+    async def offload(self, scope: Scope, receive: Receive, send: Send, **_) -> None:
+        """
+        Serve a short Flask view on the polling pool.
+
+        The view runs exactly as under WSGI (login, sessions and error pages
+        included), it just never takes a thread from the pool of the other views.
+        """
+        body = await _read_body(receive)
+        await _send_response(send, await self._run_flask(scope, body))
+
+    async def long_poll(
+        self, scope: Scope, receive: Receive, send: Send, uuid: str
+    ) -> None:
+        """
+        Serve the live chart delta, waiting for new pings on the event loop.
+
+        The Flask view is asked to answer right away. When it finds nothing new,
+        the handler waits for the next ping of the service without holding a
+        thread, then asks the view again.
+        """
+        query = parse_qs(scope["query_string"].decode("latin1"))
+        try:
+            wait = float(query.pop("wait", ["0"])[0])
+        except ValueError:
+            wait = 0
+        wait = min(wait, self.flask_app.config["PING_DELTA_MAX_WAIT"])
+        scope = {**scope, "query_string": urlencode(query, doseq=True).encode()}
+
+        body = await _read_body(receive)
+        loop = asyncio.get_running_loop()
+        service_id = await loop.run_in_executor(
+            self.poll_executor, self._get_service_id, uuid
+        )
+        if wait <= 0 or service_id is None:
+            await _send_response(send, await self._run_flask(scope, body))
+            return
+
+        # Subscribe before asking the view, so no ping falls in between
+        async with ping_broadcaster.subscribe_async(service_id) as subscriber:
+            response = await self._run_flask(scope, body)
+            if response[0] == HTTPStatus.NOT_MODIFIED:
+                if await subscriber.get(timeout=wait) is not None:
+                    response = await self._run_flask(scope, body)
+
+        await _send_response(send, response)
+
+    async def service_stream(
+        self, scope: Scope, receive: Receive, send: Send, id: int
+    ) -> None:
+        """
+        Stream the new pings of a service as server-sent events.
+
+        The stream waits on the event loop for the pings pushed by the ping
+        broadcaster, and ends as soon as the client disconnects.
+        """
+        # Subscribe before reading the latest ping, so no ping falls in between
+        async with ping_broadcaster.subscribe_async(id) as subscriber:
+            loop = asyncio.get_running_loop()
+            found, last_ping = await loop.run_in_executor(
+                self.poll_executor, self._get_latest_ping, id
+            )
+            if not found:
+                # Let Flask render its usual 404 page
+                await self.wsgi(scope, receive, send)
+                return
+
+            await send(
+                {"type": "http.response.start", "status": 200, "headers": SSE_HEADERS}
+            )
+            if last_ping is not None:
+                await _send_chunk(send, _event(last_ping))
+
+            disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+            try:
+                while True:
+                    next_ping = asyncio.ensure_future(
+                        subscriber.get(timeout=ping_broadcaster.keepalive)
+                    )
+                    await asyncio.wait(
+                        {next_ping, disconnected}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if disconnected.done():
+                        next_ping.cancel()
+                        return
+
+                    ping = next_ping.result()
+                    await _send_chunk(
+                        send, b": keepalive\n\n" if ping is None else _event(ping)
+                    )
+            finally:
+                disconnected.cancel()
+
+    # ------------------------------- FLASK BRIDGE ------------------------------- #
+    async def _run_flask(self, scope: Scope, body: bytes) -> tuple[int, list, bytes]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.poll_executor, self._call_flask, _build_environ(scope, body)
+        )
+
+    def _call_flask(self, environ: dict[str, Any]) -> tuple[int, list, bytes]:
+        response = {}
+
+        def start_response(status: str, headers: list, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in headers
+            ]
+
+        result = self.flask_app(environ, start_response)
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], content
+
+    def _get_service_id(self, subscription_uuid: str) -> int | None:
+        try:
+            subscription_uuid = UUID(subscription_uuid)
+        except ValueError:
+            return None
+
+        with self.flask_app.app_context():
+            return db.session.scalar(
+                db.select(Subscription.service_id).filter_by(uuid=subscription_uuid)
+            )
+
+    def _get_latest_ping(self, service_id: int) -> tuple[bool, dict | None]:
+        with self.flask_app.app_context():
+            service = db.session.get(Service, service_id)
+            if service is None:
+                return False, None
+
+            ping = service.get_latest_ping()
+            return True, ping.to_dict() if ping is not None else None
+
+
+# ---------------------------------------------------------------------------- #
+#                                    HELPERS                                   #
+# ---------------------------------------------------------------------------- #
+def _event(ping: dict[str, Any]) -> bytes:
+    return f"data: {json.dumps(ping)}\n\n".encode()
+
+
+async def _send_response(send: Send, response: tuple[int, list, bytes]) -> None:
+    status, headers, content = response
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": content})
+
+
+async def _send_chunk(send: Send, chunk: bytes) -> None:
+    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+
+def _build_environ(scope: Scope, body: bytes) -> dict[str, Any]:
+    """The WSGI environ of an ASGI HTTP request, see PEP 3333."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin1"),
+        "PATH_INFO": scope["path"].encode().decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = map(str, scope["client"])
+
+    for raw_name, raw_value in scope["headers"]:
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        value = raw_value.decode("latin1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _wait_for_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def create_asgi_app(config_class=Config) -> AsgiApp:
+    """Create the Flask application, and wrap it in the ASGI application."""
+    return AsgiApp(create_app(config_class))
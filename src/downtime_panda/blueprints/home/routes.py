@@ -1,4 +1,9 @@
-from flask import Blueprint, render_template
+import hmac
+from http import HTTPStatus
+
+from flask import Blueprint, abort, current_app, render_template, request
+
+from downtime_panda.metrics import metrics
 
 home_blueprint = Blueprint("home", __name__)
 
@@ -7,3 +12,35 @@ home_blueprint = Blueprint("home", __name__)
 def index() -> str:
     """Render the home page."""
     return render_template("blueprints/index.html.jinja")
+
+
+def _check_metrics_access() -> None:
+    """Abort unless the metrics are enabled, and the request carries the metrics token, if any."""
+    if not current_app.config["METRICS_ENABLED"]:
+        abort(HTTPStatus.NOT_FOUND)
+
+    token = current_app.config["METRICS_TOKEN"]
+    if token:
+        scheme, _, given = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+            given.encode(), token.encode()
+        ):
+            abort(HTTPStatus.UNAUTHORIZED)
+
+
+@home_blueprint.get("/metrics")
+def get_metrics():
+    """Expose the metrics of this process as JSON, if enabled."""
+    _check_metrics_access()
+    return metrics.snapshot()
+
+
+@home_blueprint.get("/metrics/pool")
+def get_pool_metrics():
+    """Expose the metrics of the database connection pool of this process, if enabled."""
+    _check_metrics_access()
+    return {
+        name: value
+        for name, value in metrics.snapshot().items()
+        if name.startswith("db_pool_")
+    }
@@ -0,0 +1,221 @@
+"""
+Adaptive probe frequency of Downtime Panda.
+
+Once enabled with `PROBE_ADAPTIVE`, every saved probe result adjusts the interval
+of its service, between the bounds of the service (or `PROBE_INTERVAL_MIN` and
+`PROBE_INTERVAL_MAX`):
+
+- a service answering the same healthy status, without slowing down, for
+  `PROBE_BACKOFF_AFTER` probes in a row has its interval multiplied by
+  `PROBE_BACKOFF_FACTOR`;
+- a status change, a failed probe or an error status, or a response slower than
+  `PROBE_LATENCY_REGRESSION_RATIO` times the usual one, drops the interval to its
+  minimum, and moves the next probe of the service forward right away.
+
+Stable services are probed, and saved as pings, far less often, while an outage
+is followed at the shortest interval from the probe that detects it. An outage
+starting on a backed off service is detected within its maximum interval.
+
+exports:
+    - AdaptiveSchedule: Adjusts the probe intervals, as a Flask extension.
+    - ScheduleState: The adaptive state of the schedule of a service.
+    - adapt: The next state of a schedule, given a probe result.
+"""
+
+__all__ = ["AdaptiveSchedule", "ScheduleState", "adapt"]
+
+from dataclasses import dataclass
+from datetime import timedelta
+from http import HTTPStatus
+from itertools import groupby
+from typing import TYPE_CHECKING, Iterable
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select, update
+
+from downtime_panda.metrics import metrics
+
+if TYPE_CHECKING:
+    from downtime_panda.blueprints.service.prober import ProbeResult
+
+# Weight of the newest response time in the usual response time of a service
+LATENCY_SMOOTHING = 0.2
+# Responses faster than this are never a regression, whatever the ratio
+LATENCY_REGRESSION_FLOOR = 0.05
+
+
+@dataclass(frozen=True)
+class ScheduleState:
+    """The adaptive state of the schedule of a service."""
+
+    interval: float
+    """Current interval between two probes, in seconds."""
+    last_status: int | None = None
+    """Status of the previous probe."""
+    latency: float | None = None
+    """Usual response time, in seconds, smoothed over the healthy probes."""
+    stable_probes: int = 0
+    """Number of stable probes since the interval last changed."""
+
+
+def adapt(
+    state: ScheduleState,
+    result: "ProbeResult",
+    interval_min: float,
+    interval_max: float,
+    backoff_after: int,
+    backoff_factor: float,
+    latency_ratio: float,
+) -> tuple[ScheduleState, str | None]:
+    """
+    The next state of a schedule, given the result of a probe.
+
+    Returns:
+        tuple[ScheduleState, str | None]: The new state, and why the interval was
+            tightened (`status_change`, `error` or `latency`), None if it was not
+    """
+    response_time = result.response_time.total_seconds()
+    failed = response_time < 0 or result.http_status >= HTTPStatus.BAD_REQUEST
+
+    reason = None
+    if state.last_status is not None and result.http_status != state.last_status:
+        reason = "status_change"
+    elif failed:
+        reason = "error"
+    elif (
+        state.latency is not None
+        and response_time > LATENCY_REGRESSION_FLOOR
+        and response_time > state.latency * latency_ratio
+    ):
+        reason = "latency"
+
+    latency = state.latency
+    if not failed:
+        latency = (
+            response_time
+            if latency is None
+            else latency + LATENCY_SMOOTHING * (response_time - latency)
+        )
+
+    if reason is not None:
+        return ScheduleState(interval_min, result.http_status, latency, 0), reason
+
+    interval = min(max(state.interval, interval_min), interval_max)
+    stable_probes = state.stable_probes + 1
+    if stable_probes >= backoff_after and interval < interval_max:
+        interval = min(interval * backoff_factor, interval_max)
+        stable_probes = 0
+    return ScheduleState(interval, result.http_status, latency, stable_probes), None
+
+
+class AdaptiveSchedule:
+    """
+    Adjusts the probe interval of the services after each batch of saved pings.
+
+    The ping writer hands every saved batch over; nothing happens unless
+    `PROBE_ADAPTIVE` is enabled.
+    """
+
+    def __init__(self, app: Flask | None = None, db: SQLAlchemy | None = None):
+        self.db: SQLAlchemy | None = None
+        self.enabled = False
+        self.interval = 5.0
+        self.interval_min = 5.0
+        self.interval_max = 300.0
+        self.backoff_after = 12
+        self.backoff_factor = 2.0
+        self.latency_ratio = 2.0
+
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app: Flask, db: SQLAlchemy) -> None:
+        """Read the bounds and the sensitivity of the adaptive schedule from the configuration."""
+        self.db = db
+        self.enabled = app.config["PROBE_ADAPTIVE"]
+        self.interval = app.config["PROBE_INTERVAL"]
+        self.interval_min = app.config["PROBE_INTERVAL_MIN"]
+        self.interval_max = app.config["PROBE_INTERVAL_MAX"]
+        self.backoff_after = app.config["PROBE_BACKOFF_AFTER"]
+        self.backoff_factor = app.config["PROBE_BACKOFF_FACTOR"]
+        self.latency_ratio = app.config["PROBE_LATENCY_REGRESSION_RATIO"]
+        app.extensions["adaptive_schedule"] = self
+
+    def update(self, results: Iterable["ProbeResult"]) -> None:
+        """Adjust the schedule of the services of the saved results, in a single round trip."""
+        if not self.enabled:
+            return
+
+        from downtime_panda.blueprints.service.models import Service
+
+        by_service = {
+            service_id: list(group)
+            for service_id, group in groupby(
+                sorted(results, key=lambda r: (r.service_id, r.pinged_at)),
+                key=lambda r: r.service_id,
+            )
+        }
+        if not by_service:
+            return
+
+        rows = self.db.session.execute(
+            select(
+                Service.id,
+                Service.probe_interval,
+                Service.probe_interval_min,
+                Service.probe_interval_max,
+                Service.adaptive_interval,
+                Service.last_status,
+                Service.latency_baseline,
+                Service.stable_probes,
+            ).where(Service.id.in_(by_service))
+        )
+
+        states = []
+        tightened = {}
+        for id, base, low, high, current, last_status, latency, stable in rows:
+            low = low or self.interval_min
+            high = max(high or self.interval_max, low)
+            state = ScheduleState(
+                current or base or self.interval, last_status, latency, stable or 0
+            )
+            for result in by_service[id]:
+                previous = state.interval
+                state, reason = adapt(
+                    state,
+                    result,
+                    low,
+                    high,
+                    self.backoff_after,
+                    self.backoff_factor,
+                    self.latency_ratio,
+                )
+                if reason is not None:
+                    metrics.counter(
+                        "probe_interval_tightened_total", reason=reason
+                    ).inc()
+                    tightened[id] = result.pinged_at + timedelta(seconds=state.interval)
+                elif state.interval > previous:
+                    metrics.counter("probe_interval_backoffs_total").inc()
+
+            states.append(
+                {
+                    "id": id,
+                    "adaptive_interval": state.interval,
+                    "last_status": state.last_status,
+                    "latency_baseline": state.latency,
+                    "stable_probes": state.stable_probes,
+                }
+            )
+
+        if states:
+            self.db.session.execute(update(Service), states)
+        for id, next_probe_at in tightened.items():
+            # Only ever brings the next probe forward, never pushes it back
+            self.db.session.execute(
+                update(Service)
+                .where(Service.id == id, Service.next_probe_at > next_probe_at)
+                .values(next_probe_at=next_probe_at)
+            )
+        self.db.session.commit()
@@ -0,0 +1,356 @@
+"""
+Fan-out hub pushing new pings to the clients watching a service.
+
+The ping writer publishes every saved batch once, and the broadcaster hands each
+ping to all the subscribers of its service, so the number of open dashboards has
+no effect on the database load.
+
+When several processes are deployed (e.g. the prober and the web server), the
+optional PostgreSQL bridge publishes pings with `NOTIFY`, and every process
+`LISTEN`s on a single dedicated connection to deliver them to its own subscribers.
+Without it, a process whose ping writer is not running polls the database for the
+pings of the watched services instead, with a single query per poll interval.
+Since ping IDs are not committed in order, each poll also looks again at the
+pings probed within the last `PING_BROADCAST_POLL_RESCAN` seconds, delivering
+those it did not see yet.
+
+exports:
+    - PingBroadcaster: The fan-out hub, as a Flask extension.
+    - PingSubscriber: The pings of a service, as received by a single client.
+    - AsyncPingSubscriber: A subscriber awaited from an asyncio event loop.
+"""
+
+__all__ = ["PingBroadcaster", "PingSubscriber", "AsyncPingSubscriber"]
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Iterable
+
+import pytz
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from loguru import logger
+from sqlalchemy import func, make_url, or_, select, text
+
+if TYPE_CHECKING:
+    from downtime_panda.blueprints.service.cache import LatestPingCache
+    from downtime_panda.blueprints.service.prober import ProbeResult
+
+NOTIFY_CHANNEL = "dtpanda_pings"
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+RECONNECT_DELAY = 1
+
+
+class PingSubscriber:
+    """
+    A bounded queue of the new pings of a service.
+
+    When the client falls behind, the oldest pings are dropped: a dashboard only
+    cares about the latest state. Use it as a context manager to unsubscribe.
+    """
+
+    def __init__(self, broadcaster: "PingBroadcaster", service_id: int, size: int):
+        self.broadcaster = broadcaster
+        self.service_id = service_id
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue(maxsize=size)
+
+    def __enter__(self) -> "PingSubscriber":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def put(self, ping: dict[str, Any]) -> None:
+        """Queue a ping, dropping the oldest queued one if the queue is full."""
+        while True:
+            try:
+                self._queue.put_nowait(ping)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """Wait for the next ping, or return None after `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        """Stop receiving pings. Closing twice is harmless."""
+        self.broadcaster.unsubscribe(self)
+
+
+class AsyncPingSubscriber(PingSubscriber):
+    """
+    A subscriber living on an asyncio event loop.
+
+    Pings are published from the ping writer thread, so they are handed over to the
+    loop, where they wait in an `asyncio.Queue` without holding any thread.
+    """
+
+    def __init__(
+        self,
+        broadcaster: "PingBroadcaster",
+        service_id: int,
+        size: int,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        self.broadcaster = broadcaster
+        self.service_id = service_id
+        self._loop = loop
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=size)
+
+    async def __aenter__(self) -> "AsyncPingSubscriber":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def put(self, ping: dict[str, Any]) -> None:
+        """Queue a ping from any thread, dropping the oldest one if the queue is full."""
+        try:
+            self._loop.call_soon_threadsafe(self._put_nowait, ping)
+        except RuntimeError:
+            # The event loop is gone, and so is the client
+            self.close()
+
+    def _put_nowait(self, ping: dict[str, Any]) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(ping)
+
+    async def get(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """Wait for the next ping, or return None after `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class PingBroadcaster:
+    """
+    Delivers new pings to the subscribers of their service.
+
+    The broadcaster follows the usual Flask extension pattern. With
+    `PING_BROADCAST_NOTIFY` enabled on PostgreSQL, pings go through `LISTEN/NOTIFY`
+    instead of being delivered in-process, so every process receives them.
+    Otherwise, pings written by another process are found by polling every
+    `PING_BROADCAST_POLL_INTERVAL` seconds, which also stores them in the latest
+    ping cache of this process.
+    """
+
+    def __init__(
+        self,
+        app: Flask | None = None,
+        db: SQLAlchemy | None = None,
+        cache: "LatestPingCache | None" = None,
+    ):
+        self.app: Flask | None = None
+        self.db: SQLAlchemy | None = None
+        self.cache: "LatestPingCache | None" = None
+        self.queue_size = 100
+        self.keepalive = 15.0
+        self.notify = False
+        self.poll_interval = 1.0
+        self.poll_rescan = 30.0
+
+        self._subscribers: dict[int, set[PingSubscriber]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._bridge: threading.Thread | None = None
+
+        if app is not None:
+            self.init_app(app, db, cache)
+
+    def init_app(
+        self, app: Flask, db: SQLAlchemy, cache: "LatestPingCache | None" = None
+    ) -> None:
+        """Bind the broadcaster to the Flask application, its database and its latest ping cache."""
+        self.app = app
+        self.db = db
+        self.cache = cache
+        self.queue_size = app.config["PING_BROADCAST_QUEUE_SIZE"]
+        self.keepalive = app.config["PING_BROADCAST_KEEPALIVE"]
+        self.poll_interval = app.config["PING_BROADCAST_POLL_INTERVAL"]
+        self.poll_rescan = app.config["PING_BROADCAST_POLL_RESCAN"]
+        self.notify = app.config["PING_BROADCAST_NOTIFY"]
+        dialect = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+        if self.notify and dialect != "postgresql":
+            logger.warning(
+                f"PING_BROADCAST_NOTIFY needs PostgreSQL, not {dialect}:"
+                " polling the database for new pings instead"
+            )
+            self.notify = False
+        app.extensions["ping_broadcaster"] = self
+
+    # -------------------------------- SUBSCRIBERS ------------------------------- #
+    def subscribe(self, service_id: int) -> PingSubscriber:
+        """Start receiving the new pings of a service."""
+        self._start_bridge()
+        return self._add(PingSubscriber(self, service_id, self.queue_size))
+
+    def subscribe_async(self, service_id: int) -> AsyncPingSubscriber:
+        """Start receiving the new pings of a service on the running event loop."""
+        self._start_bridge()
+        loop = asyncio.get_running_loop()
+        return self._add(AsyncPingSubscriber(self, service_id, self.queue_size, loop))
+
+    def _add(self, subscriber: PingSubscriber) -> PingSubscriber:
+        with self._lock:
+            self._subscribers[subscriber.service_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: PingSubscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.service_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.service_id]
+
+    def subscriber_count(self, service_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(service_id, ()))
+
+    # -------------------------------- PUBLISHING -------------------------------- #
+    def publish(self, results: Iterable["ProbeResult"]) -> None:
+        """Publish just saved probe results to the subscribers of their service."""
+        if not self.notify:
+            for result in results:
+                self._deliver(result.service_id, result.to_dict())
+            return
+
+        params = [
+            {
+                "channel": NOTIFY_CHANNEL,
+                "payload": json.dumps(
+                    {"service_id": result.service_id, **result.to_dict()}
+                ),
+            }
+            for result in results
+        ]
+        if params:
+            with self.db.engine.begin() as connection:
+                connection.execute(NOTIFY_SQL, params)
+
+    def _deliver(self, service_id: int, ping: dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(service_id, ()))
+        for subscriber in subscribers:
+            subscriber.put(ping)
+
+    # ---------------------------------- BRIDGE ---------------------------------- #
+    def _start_bridge(self) -> None:
+        if self.notify:
+            target, name = self._listen, "ping-listener"
+        elif self.poll_interval > 0:
+            target, name = self._poll, "ping-poller"
+        else:
+            return
+
+        with self._lock:
+            if self._bridge is not None and self._bridge.is_alive():
+                return
+            self._bridge = threading.Thread(target=target, name=name, daemon=True)
+            self._bridge.start()
+
+    def _writes_locally(self) -> bool:
+        writer = self.app.extensions.get("ping_writer")
+        return writer is not None and writer.running
+
+    def _listen(self) -> None:
+        import psycopg
+
+        with self.app.app_context():
+            url = self.db.engine.url.set(drivername="postgresql")
+        conninfo = url.render_as_string(hide_password=False)
+
+        while True:
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    logger.info(f"Listening for pings on channel {NOTIFY_CHANNEL}")
+                    for notification in connection.notifies():
+                        ping = json.loads(notification.payload)
+                        self._deliver(ping.pop("service_id"), ping)
+            except Exception:
+                logger.exception("Ping listener disconnected, reconnecting")
+                time.sleep(RECONNECT_DELAY)
+
+    def _poll(self) -> None:
+        from downtime_panda.blueprints.service.models import as_utc
+
+        last_id = None
+        # Pings found within the rescan window, with the time of their probe
+        seen: dict[int, datetime] = {}
+        watched: set[int] = set()
+        while self.poll_interval > 0:
+            time.sleep(self.poll_interval)
+            if self._writes_locally():
+                # The writer of this process publishes its pings itself
+                last_id = None
+                continue
+
+            with self._lock:
+                service_ids = list(self._subscribers)
+            since = datetime.now(pytz.utc) - timedelta(seconds=self.poll_rescan)
+            try:
+                with self.app.app_context():
+                    newest, pings = self._fetch_new_pings(last_id, since, service_ids)
+            except Exception:
+                logger.exception("Could not poll the database for new pings")
+                continue
+
+            for id, pinged_at in list(seen.items()):
+                if pinged_at < since:
+                    del seen[id]
+            for service_id, ping in pings:
+                if ping["id"] in seen:
+                    continue
+                seen[ping["id"]] = as_utc(datetime.fromisoformat(ping["pinged_at"]))
+                # Saved before the first poll, or before the service was watched
+                if last_id is None or (
+                    ping["id"] <= last_id and service_id not in watched
+                ):
+                    continue
+
+                if self.cache is not None:
+                    self.cache.set(service_id, ping)
+                self._deliver(service_id, ping)
+
+            last_id = newest
+            watched = set(service_ids)
+
+    def _fetch_new_pings(
+        self, after: int | None, since: datetime, service_ids: list[int]
+    ) -> tuple[int, list[tuple[int, dict[str, Any]]]]:
+        """
+        The newest ping ID, and the pings of the services saved after `after` or
+        probed since `since`: IDs are drawn before the pings are committed, so a
+        ping may be committed after a ping with a higher ID was already found.
+        """
+        from downtime_panda.blueprints.service.models import Ping
+
+        newest = self.db.session.scalar(select(func.max(Ping.id))) or 0
+        if not service_ids:
+            return newest, []
+
+        found = Ping.pinged_at >= since
+        if after is not None:
+            found = or_(Ping.id > after, found)
+        query = (
+            select(Ping)
+            .where(Ping.service_id.in_(service_ids), found, Ping.id <= newest)
+            .order_by(Ping.id)
+        )
+        pings = self.db.session.scalars(query)
+        return newest, [(ping.service_id, ping.to_dict()) for ping in pings]
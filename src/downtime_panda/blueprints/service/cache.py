@@ -0,0 +1,245 @@
+"""
+Cache of the latest ping of every service monitored by Downtime Panda.
+
+The ping writer updates the cache right after saving each batch, and every view
+showing the current status of a service reads from it, so listing many services
+does not cost a query per service. Entries have the same shape as `Ping.to_dict`.
+A probe saved late never replaces the cached entry of a newer ping.
+
+Entries read from the database only live for `LATEST_PING_CACHE_READ_TTL` seconds:
+a web process never sees the batches saved by the prober process, so only the
+entries set by a writer of the same process (or shared through Redis) are kept for
+the longer `LATEST_PING_CACHE_TTL`.
+
+exports:
+    - LatestPingCache: The cache, as a Flask extension.
+    - MemoryBackend: In-process backend, with a time-to-live on every entry.
+    - RedisBackend: Backend for any Redis-compatible server, shared between processes.
+"""
+
+__all__ = ["LatestPingCache", "MemoryBackend", "RedisBackend"]
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable, Protocol
+
+from flask import Flask
+
+if TYPE_CHECKING:
+    from downtime_panda.blueprints.service.prober import ProbeResult
+
+Entry = dict[str, Any]
+
+
+def _is_newer(entry: Entry, cached: Entry | None) -> bool:
+    """Whether an entry is at least as new as the cached one, if any."""
+    from downtime_panda.blueprints.service.models import as_utc
+
+    if cached is None or "pinged_at" not in entry or "pinged_at" not in cached:
+        return True
+    pinged_at = as_utc(datetime.fromisoformat(entry["pinged_at"]))
+    return pinged_at >= as_utc(datetime.fromisoformat(cached["pinged_at"]))
+
+
+class CacheBackend(Protocol):
+    def get_many(self, service_ids: Iterable[int]) -> dict[int, Entry]: ...
+
+    def set_many(self, entries: dict[int, Entry]) -> None: ...
+
+    def add(self, service_id: int, entry: Entry, ttl: float | None = None) -> None: ...
+
+    def delete(self, service_id: int) -> None: ...
+
+
+class MemoryBackend:
+    """
+    Keeps the entries in a dictionary of the current process.
+
+    Entries expire `ttl` seconds after being set (never, if `ttl` is 0), which bounds
+    how stale they get when pings are written by another process. `add` may set a
+    shorter TTL on its own entry.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[int, tuple[float, Entry]] = {}
+        self._lock = threading.Lock()
+
+    def _expires_at(self, ttl: float | None = None) -> float:
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl else float("inf")
+
+    def get_many(self, service_ids: Iterable[int]) -> dict[int, Entry]:
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for service_id in service_ids:
+                expires_at, entry = self._entries.get(service_id, (0, None))
+                if expires_at > now:
+                    found[service_id] = entry
+        return found
+
+    def set_many(self, entries: dict[int, Entry]) -> None:
+        now = time.monotonic()
+        expires_at = self._expires_at()
+        with self._lock:
+            for service_id, entry in entries.items():
+                cached_expires_at, cached = self._entries.get(service_id, (0, None))
+                if cached_expires_at <= now or _is_newer(entry, cached):
+                    self._entries[service_id] = (expires_at, entry)
+
+    def add(self, service_id: int, entry: Entry, ttl: float | None = None) -> None:
+        with self._lock:
+            expires_at, _ = self._entries.get(service_id, (0, None))
+            if expires_at <= time.monotonic():
+                self._entries[service_id] = (self._expires_at(ttl), entry)
+
+    def delete(self, service_id: int) -> None:
+        with self._lock:
+            self._entries.pop(service_id, None)
+
+
+class RedisBackend:
+    """
+    Keeps the entries, as JSON, in a Redis-compatible server.
+
+    Any client exposing the `redis-py` interface works, which includes Valkey,
+    KeyDB and in-process stand-ins such as `fakeredis`.
+    """
+
+    KEY_PREFIX = "dtpanda:latest_ping:"
+
+    def __init__(self, client, ttl: float):
+        self.client = client
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float) -> "RedisBackend":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "The Redis latest ping cache needs the `redis` package,"
+                " install Downtime Panda with the `redis` extra"
+            ) from e
+
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def _key(self, service_id: int) -> str:
+        return f"{self.KEY_PREFIX}{service_id}"
+
+    def _ex(self, ttl: float | None = None) -> int | None:
+        ttl = self.ttl if ttl is None else ttl
+        return max(1, round(ttl)) if ttl else None
+
+    def get_many(self, service_ids: Iterable[int]) -> dict[int, Entry]:
+        service_ids = list(service_ids)
+        if not service_ids:
+            return {}
+
+        values = self.client.mget([self._key(id) for id in service_ids])
+        return {
+            service_id: json.loads(value)
+            for service_id, value in zip(service_ids, values)
+            if value is not None
+        }
+
+    def set_many(self, entries: dict[int, Entry]) -> None:
+        from redis.exceptions import WatchError
+
+        if not entries:
+            return
+
+        keys = {service_id: self._key(service_id) for service_id in entries}
+        with self.client.pipeline() as pipeline:
+            while True:
+                try:
+                    # Compare-and-set: retried if another writer set one of the keys
+                    pipeline.watch(*keys.values())
+                    values = pipeline.mget(list(keys.values()))
+                    pipeline.multi()
+                    for (service_id, entry), value in zip(entries.items(), values):
+                        cached = json.loads(value) if value is not None else None
+                        if _is_newer(entry, cached):
+                            pipeline.set(
+                                keys[service_id], json.dumps(entry), ex=self._ex()
+                            )
+                    pipeline.execute()
+                    return
+                except WatchError:
+                    continue
+
+    def add(self, service_id: int, entry: Entry, ttl: float | None = None) -> None:
+        self.client.set(
+            self._key(service_id), json.dumps(entry), ex=self._ex(ttl), nx=True
+        )
+
+    def delete(self, service_id: int) -> None:
+        self.client.delete(self._key(service_id))
+
+
+class LatestPingCache:
+    """
+    Latest ping of each service, keyed by service ID.
+
+    The backend is picked from `LATEST_PING_CACHE_URL`: a Redis-compatible server if
+    set, the memory of the current process otherwise.
+    """
+
+    def __init__(self, app: Flask | None = None):
+        self.backend: CacheBackend = MemoryBackend(ttl=0)
+        self.read_ttl: float | None = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Create the backend configured for the Flask application."""
+        url = app.config["LATEST_PING_CACHE_URL"]
+        ttl = app.config["LATEST_PING_CACHE_TTL"]
+        self.backend = RedisBackend.from_url(url, ttl) if url else MemoryBackend(ttl)
+        self.read_ttl = app.config["LATEST_PING_CACHE_READ_TTL"]
+        app.extensions["latest_pings"] = self
+
+    def get(self, service_id: int) -> Entry | None:
+        """Get the latest ping of a service, or None if it is not cached."""
+        return self.backend.get_many([service_id]).get(service_id)
+
+    def get_many(self, service_ids: Iterable[int]) -> dict[int, Entry]:
+        """Get the latest ping of each of the services that is cached."""
+        return self.backend.get_many(service_ids)
+
+    def update(self, results: Iterable["ProbeResult"]) -> None:
+        """
+        Store the newest of the just saved probe results of each service, unless a
+        newer ping of the service is already cached.
+        """
+        newest: dict[int, "ProbeResult"] = {}
+        for result in results:
+            current = newest.get(result.service_id)
+            if current is None or result.pinged_at >= current.pinged_at:
+                newest[result.service_id] = result
+
+        self.backend.set_many(
+            {service_id: result.to_dict() for service_id, result in newest.items()}
+        )
+
+    def set(self, service_id: int, entry: Entry) -> None:
+        """Store a ping saved by another process, unless a newer one is cached."""
+        self.backend.set_many({service_id: entry})
+
+    def fill(self, service_id: int, entry: Entry) -> None:
+        """
+        Store a ping read from the database, unless the service is already cached.
+
+        Never overwriting keeps a slow reader from replacing the ping just stored by
+        the writer with an older one. The entry expires after the read TTL, since no
+        writer of this process may ever replace it.
+        """
+        self.backend.add(service_id, entry, self.read_ttl)
+
+    def invalidate(self, service_id: int) -> None:
+        """Forget the latest ping of a service."""
+        self.backend.delete(service_id)
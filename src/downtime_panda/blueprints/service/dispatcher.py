@@ -0,0 +1,102 @@
+"""
+Probe dispatcher for Downtime Panda.
+
+A single scheduler job claims, on each tick, every service of the shard of this
+prober whose next probe is due, and fans them out to the probe engine. A second
+job renews the lease of the prober, rebalancing the shards when probers join or
+die.
+
+exports:
+    - DISPATCHER_JOB_ID: ID of the dispatcher job in the scheduler.
+    - LEASE_JOB_ID: ID of the lease renewal job in the scheduler.
+    - dispatch_due_probes: The dispatcher job.
+    - renew_prober_lease: The lease renewal job.
+    - release_prober_lease: Gives the lease of this prober up.
+    - schedule_dispatcher: Registers the dispatcher jobs in the scheduler.
+"""
+
+__all__ = [
+    "DISPATCHER_JOB_ID",
+    "LEASE_JOB_ID",
+    "dispatch_due_probes",
+    "release_prober_lease",
+    "renew_prober_lease",
+    "schedule_dispatcher",
+]
+
+from datetime import datetime, timedelta
+
+import pytz
+from apscheduler.triggers.interval import IntervalTrigger
+from flask import Flask
+from loguru import logger
+
+from downtime_panda.blueprints.service.models import ProberLease, Service
+from downtime_panda.extensions import prober, prober_shard, scheduler
+
+DISPATCHER_JOB_ID = "probe_dispatcher"
+LEASE_JOB_ID = "prober_lease"
+
+
+def dispatch_due_probes() -> None:
+    """Claim the due services of this prober and hand them over to the probe engine."""
+    with scheduler.app.app_context():
+        now = datetime.now(pytz.utc)
+        interval = timedelta(seconds=scheduler.app.config["PROBE_INTERVAL"])
+        adaptive = scheduler.app.config["PROBE_ADAPTIVE"]
+        slots = prober_shard.slots
+        if len(slots) == prober_shard.slot_count:
+            # Alone, no need to filter the services
+            targets = Service.claim_due(now, interval, adaptive=adaptive)
+        else:
+            targets = Service.claim_due(
+                now,
+                interval,
+                adaptive=adaptive,
+                slots=slots,
+                slot_count=prober_shard.slot_count,
+                # Whatever the shards, an overdue service is never left behind
+                orphaned_before=now - timedelta(seconds=prober_shard.lease_ttl),
+            )
+        if not targets:
+            return
+
+        logger.debug(f"Dispatching {len(targets)} probe(s)")
+        prober.submit(targets)
+
+
+def renew_prober_lease() -> None:
+    """Renew the lease of this prober, and rebalance the shards if the live probers changed."""
+    with scheduler.app.app_context():
+        now = datetime.now(pytz.utc)
+        ttl = timedelta(seconds=prober_shard.lease_ttl)
+        ProberLease.renew(prober_shard.prober_id, now + ttl)
+        ProberLease.purge_expired(now - ttl)
+        prober_shard.rebalance(ProberLease.live_prober_ids(now))
+
+
+def release_prober_lease() -> None:
+    """Give the lease of this prober up, so the others take its services over right away."""
+    with scheduler.app.app_context():
+        ProberLease.release(prober_shard.prober_id)
+
+
+def schedule_dispatcher(app: Flask) -> None:
+    """Register the dispatcher, and the renewal of the lease of this prober, in the scheduler."""
+    scheduler.add_job(
+        id=LEASE_JOB_ID,
+        func=f"{__name__}:renew_prober_lease",
+        # Renewed three times per period, a single failed renewal loses nothing
+        trigger=IntervalTrigger(seconds=app.config["PROBER_LEASE_TTL"] / 3),
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        id=DISPATCHER_JOB_ID,
+        func=f"{__name__}:dispatch_due_probes",
+        trigger=IntervalTrigger(seconds=app.config["PROBE_DISPATCH_INTERVAL"]),
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
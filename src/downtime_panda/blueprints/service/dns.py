@@ -0,0 +1,134 @@
+"""
+DNS cache of the probe engine of Downtime Panda.
+
+Thousands of services usually live on a handful of hosts: instead of resolving
+the host of every probe, the probe engine resolves each host once and shares the
+answer with every probe on its event loop.
+
+Answers are kept for `PROBE_DNS_TTL` seconds (the system resolver does not expose
+the TTL of the records, so the configured one caps them all), failed lookups for
+`PROBE_DNS_NEGATIVE_TTL` seconds, and at most `PROBE_DNS_CACHE_SIZE` hosts are
+kept, the least recently used being evicted first. A host still in use is
+resolved again in the background shortly before its answer expires, so probes
+never wait for the lookup of a busy host. Concurrent lookups of the same host
+share a single query.
+
+exports:
+    - CachingResolver: The DNS cache, as an aiohttp resolver.
+"""
+
+__all__ = ["CachingResolver"]
+
+import asyncio
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from aiohttp.abc import AbstractResolver, ResolveResult
+from aiohttp.resolver import DefaultResolver
+
+from downtime_panda.metrics import metrics
+
+# Share of the TTL after which a host still in use is resolved again in the background
+REFRESH_AHEAD = 0.8
+
+Key = tuple[str, int, socket.AddressFamily]
+
+
+@dataclass
+class _Entry:
+    results: list[ResolveResult] | None
+    error: OSError | None
+    refresh_at: float
+    expires_at: float
+
+
+class CachingResolver(AbstractResolver):
+    """Resolves hosts through another resolver, caching both answers and failures."""
+
+    def __init__(
+        self,
+        resolver: AbstractResolver | None = None,
+        ttl: float = 60.0,
+        negative_ttl: float = 5.0,
+        max_size: int = 1024,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+
+        self._resolver = resolver or DefaultResolver()
+        self._entries: OrderedDict[Key, _Entry] = OrderedDict()
+        self._pending: dict[Key, asyncio.Task] = {}
+        metrics.gauge("probe_dns_cache_entries", lambda: len(self._entries))
+
+    async def resolve(
+        self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET
+    ) -> list[ResolveResult]:
+        key = (host, port, family)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= now:
+            metrics.counter("probe_dns_lookups_total", result="miss").inc()
+            # A probe timing out must not cancel the lookup shared with the others
+            return await asyncio.shield(self._lookup(key))
+
+        self._entries.move_to_end(key)
+        if entry.error is not None:
+            metrics.counter("probe_dns_lookups_total", result="negative_hit").inc()
+            raise type(entry.error)(*entry.error.args)
+
+        metrics.counter("probe_dns_lookups_total", result="hit").inc()
+        if entry.refresh_at <= now and key not in self._pending:
+            metrics.counter("probe_dns_refreshes_total").inc()
+            self._lookup(key)
+        return entry.results
+
+    async def close(self) -> None:
+        for task in list(self._pending.values()):
+            task.cancel()
+        await self._resolver.close()
+
+    def _lookup(self, key: Key) -> asyncio.Task:
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._query(key))
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+        return task
+
+    def _done(self, key: Key, task: asyncio.Task) -> None:
+        self._pending.pop(key, None)
+        if not task.cancelled():
+            # Failed background refreshes are never awaited
+            task.exception()
+
+    async def _query(self, key: Key) -> list[ResolveResult]:
+        host, port, family = key
+        try:
+            with metrics.histogram("probe_dns_resolve_seconds").time():
+                results = await self._resolver.resolve(host, port, family)
+        except OSError as e:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                self._store(key, None, e, self.negative_ttl)
+            raise
+
+        self._store(key, results, None, self.ttl)
+        return results
+
+    def _store(
+        self,
+        key: Key,
+        results: list[ResolveResult] | None,
+        error: OSError | None,
+        ttl: float,
+    ) -> None:
+        now = time.monotonic()
+        self._entries[key] = _Entry(
+            results, error, now + ttl * REFRESH_AHEAD, now + ttl
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
@@ -1,23 +1,42 @@
+import hashlib
+import itertools
+import math
+from concurrent.futures import Future
 from datetime import datetime, timedelta
-from http.client import NOT_FOUND
-from typing import Any, Self, Sequence
+from typing import Any, Collection, Iterator, Self, Sequence
 
 import pytz
-import requests
-from apscheduler.triggers.interval import IntervalTrigger
+from flask import current_app
 from loguru import logger
 from sqlalchemy import (
+    JSON,
     BigInteger,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Integer,
     Interval,
+    Row,
     String,
+    case,
+    delete,
+    event,
+    func,
+    literal,
+    or_,
     select,
+    update,
 )
 from sqlalchemy.orm import Mapped, WriteOnlyMapped, mapped_column, relationship
 
-from downtime_panda.extensions import db, scheduler
+from downtime_panda.blueprints.service.prober import ProbeTarget
+from downtime_panda.blueprints.service.uris import canonical_uri
+from downtime_panda.extensions import db, latest_pings, prober, scheduler
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+CLAIM_BATCH_SIZE = 500
 
 
 class Service(db.Model):
@@ -29,9 +48,33 @@ class Service(db.Model):
         BigInteger().with_variant(Integer, "sqlite"), primary_key=True
     )
     uri: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
+    next_probe_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, index=True
+    )
+    probe_interval: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    """Time, in seconds, between two probes of the service, `PROBE_INTERVAL` if unset."""
+    probe_timeout: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    """Timeout, in seconds, of a probe of the service, `PROBE_TIMEOUT` if unset."""
+    probe_interval_min: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    """Shortest adaptive interval, in seconds, `PROBE_INTERVAL_MIN` if unset."""
+    probe_interval_max: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    """Longest adaptive interval, in seconds, `PROBE_INTERVAL_MAX` if unset."""
+    adaptive_interval: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    """Interval picked by the adaptive schedule, used instead of `probe_interval`."""
+    last_status: Mapped[int | None] = mapped_column(Integer(), nullable=True)
+    """HTTP status of the latest probe seen by the adaptive schedule."""
+    latency_baseline: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    """Usual response time of the service, in seconds, smoothed over its healthy probes."""
+    stable_probes: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    """Number of stable probes since the adaptive interval last changed."""
 
     # ------------------------------- RELATIONSHIPS ------------------------------ #
-    ping: WriteOnlyMapped["Ping"] = relationship(order_by="Ping.pinged_at.desc()")
+    # Pings are never loaded to delete a service, the foreign key decides instead
+    ping: WriteOnlyMapped["Ping"] = relationship(
+        order_by="Ping.pinged_at.desc()", passive_deletes=True
+    )
 
     # ----------------------------- STANDARD METHODS ----------------------------- #
     def __init__(self, uri: str):
@@ -42,29 +85,39 @@ class Service(db.Model):
 
     # -------------------------------- CONSTRUCTOR ------------------------------- #
     @classmethod
-    def create_if_not_exists(cls, uri: str) -> Self:
-        """Create a new service if it does not already exist."""
-        if cls.uri_exists(uri):
-            return cls.get_by_uri(uri)
+    def create_if_not_exists(
+        cls,
+        uri: str,
+        probe_interval: float | None = None,
+        probe_timeout: float | None = None,
+        probe_interval_min: float | None = None,
+        probe_interval_max: float | None = None,
+    ) -> Self:
+        """
+        Create a new service if it does not already exist.
+
+        The URI is saved in its canonical form, so URIs reaching the same resource
+        share a single service. The probe interval, timeout and adaptive bounds (in
+        seconds) only apply to a new service, an existing one keeps its own.
+        """
+        # Services saved before URIs were canonicalized keep their own URI
+        for candidate in dict.fromkeys((canonical_uri(uri), uri)):
+            if (service := cls.get_by_uri(candidate)) is not None:
+                return service
 
         service = Service(
-            uri=uri,
+            uri=canonical_uri(uri),
         )
+        service.probe_interval = probe_interval
+        service.probe_timeout = probe_timeout
+        service.probe_interval_min = probe_interval_min
+        service.probe_interval_max = probe_interval_max
+        # The probe dispatcher picks the service up on its next tick
+        service.next_probe_at = datetime.now(pytz.utc)
         db.session.add(service)
         db.session.commit()
         db.session.refresh(service)
 
-        # Schedule the ping job for the new service
-        trigger = IntervalTrigger(seconds=5)
-        scheduler.add_job(
-            func=service.ping_service,
-            args=[service.id],
-            trigger=trigger,
-            replace_existing=True,
-            id=f"ping_service_{service.id}",
-        )
-
-        db.session.commit()
         return service
 
     @classmethod
@@ -78,35 +131,145 @@ class Service(db.Model):
         return cls.get_by_uri(uri=uri) is not None
 
     @classmethod
-    def ping_service(cls, service_id: int) -> None:
+    def ping_service(cls, service_id: int) -> Future | None:
+        """Hand the service over to the probe engine, without waiting for the response."""
         with scheduler.app.app_context():
             service = db.session.get(cls, service_id)
+            if service is None:
+                logger.warning(f"Service {service_id} not found, skipping ping")
+                return None
+
             logger.info(service)
+            return prober.submit(
+                [
+                    ProbeTarget(
+                        service_id=service.id,
+                        uri=service.uri,
+                        timeout=service.probe_timeout,
+                    )
+                ]
+            )
+
+    @classmethod
+    def claim_due(
+        cls,
+        now: datetime,
+        interval: timedelta,
+        slots: Collection[int] | None = None,
+        slot_count: int = 1,
+        orphaned_before: datetime | None = None,
+        adaptive: bool = False,
+    ) -> list[ProbeTarget]:
+        """
+        Claim all the services whose next probe is due, pushing their next probe forward.
+
+        Each service is scheduled on its own grid (see `next_probe_time`), so a late
+        tick or a slow probe never delays the following probes. The claim is a
+        conditional `UPDATE`, so a service is never handed out twice for the same
+        tick, even by several probers.
+
+        Args:
+            now (datetime): The current time
+            interval (timedelta): Time between two probes of the services without
+                their own interval
+            slots (Collection[int] | None): Only claim the services in these shard
+                slots, or all of them if None
+            slot_count (int): Total number of shard slots
+            orphaned_before (datetime | None): Also claim the services of any slot that
+                were due before this time, e.g. those of a dead prober
+            adaptive (bool): Whether to follow the intervals picked by the adaptive
+                schedule
 
-            pinged_at = datetime.now(pytz.utc)
-            try:
-                response = requests.head(service.uri, allow_redirects=True)
-
-                status_code = response.status_code
-                response_time = response.elapsed
-            except requests.exceptions.ConnectionError:
-                response_time = timedelta(seconds=-1)
-                status_code = NOT_FOUND
-
-            ping = Ping(
-                service_id=f"ping_service_{service.id}",
-                http_status=status_code,
-                response_time=response_time,
-                pinged_at=pinged_at,
+        Returns:
+            list[ProbeTarget]: The services to probe right away
+        """
+        probe_interval = cls.probe_interval
+        if adaptive:
+            probe_interval = func.coalesce(cls.adaptive_interval, cls.probe_interval)
+        query = select(cls.id, cls.uri, cls.next_probe_at, probe_interval).where(
+            cls.next_probe_at <= now
+        )
+        if slots is not None:
+            owned = (cls.id % slot_count).in_(slots)
+            if orphaned_before is not None:
+                owned = or_(owned, cls.next_probe_at <= orphaned_before)
+            query = query.where(owned)
+
+        scheduled_at = {}
+        next_probe_at = {}
+        for id, uri, due_at, probe_interval in db.session.execute(query):
+            seconds = probe_interval or interval.total_seconds()
+            scheduled_at[id] = as_utc(due_at)
+            next_probe_at[id] = cls.next_probe_time(uri, seconds, now)
+
+        claimed = []
+        for ids in itertools.batched(next_probe_at, CLAIM_BATCH_SIZE):
+            next_probe_type = cls.next_probe_at.type
+            query = (
+                update(cls)
+                # Another prober may have claimed some of them in the meantime
+                .where(cls.id.in_(ids), cls.next_probe_at <= now)
+                .values(
+                    next_probe_at=case(
+                        {id: literal(next_probe_at[id], next_probe_type) for id in ids},
+                        value=cls.id,
+                    )
+                )
+                .returning(cls.id, cls.uri, cls.probe_timeout)
+                .execution_options(synchronize_session="fetch")
+            )
+            claimed.extend(db.session.execute(query))
+        db.session.commit()
+
+        return [
+            ProbeTarget(
+                service_id=id,
+                uri=uri,
+                timeout=timeout,
+                scheduled_at=scheduled_at[id],
             )
-            service.ping.add(ping)
-            db.session.commit()
+            for id, uri, timeout in claimed
+        ]
+
+    @staticmethod
+    def next_probe_time(uri: str, interval: float, after: datetime) -> datetime:
+        """
+        The first probe time of a service strictly after `after`.
+
+        The probes of a service fall on a fixed grid of `interval` seconds, shifted by
+        a phase derived from a hash of its canonical URI. The grid never depends on
+        when the previous probe actually ran, so schedules do not drift, and the
+        phases of the services are spread over the interval, instead of all firing in
+        the same second. Services sharing a canonical URI (and interval) are due on
+        the same ticks, so the probe engine coalesces their probes.
+        """
+        digest = hashlib.blake2b(canonical_uri(uri).encode(), digest_size=8).digest()
+        phase = int.from_bytes(digest) / 2**64 * interval
+        elapsed = (after - EPOCH).total_seconds() - phase
+        probes = math.floor(elapsed / interval) + 1
+        return EPOCH + timedelta(seconds=probes * interval + phase)
 
     def get_latest_ping(self) -> "Ping | None":
-        """Get the latest ping for the service."""
-        return db.session.execute(
-            select(Ping).filter_by(service_id=self.id).order_by(Ping.pinged_at.desc())
-        ).scalar()
+        """
+        Get the latest ping for the service.
+
+        The ping is read from the latest ping cache, falling back to the database on a
+        miss. Pings returned from the cache are transient objects, not bound to a session.
+        """
+        cached = latest_pings.get(self.id)
+        if cached is not None:
+            return Ping.from_dict(self.id, cached)
+
+        query = (
+            select(Ping)
+            .filter_by(service_id=self.id)
+            .order_by(Ping.pinged_at.desc())
+            .limit(1)
+        )
+        ping = db.session.execute(query).scalar()
+        if ping is not None:
+            latest_pings.fill(self.id, ping.to_dict())
+        return ping
 
     def get_latest_n_pings(self, n: int) -> Sequence["Ping"]:
         query = (
@@ -126,6 +289,134 @@ class Service(db.Model):
         )
         return db.session.execute(query).scalars().all()
 
+    def get_rollups(
+        self, resolution: int, since: datetime, until: datetime
+    ) -> Sequence["PingRollup"]:
+        """Get the rollups of the given resolution (in seconds) in a time range, oldest first."""
+        query = (
+            select(PingRollup)
+            .filter_by(service_id=self.id, resolution=resolution)
+            .where(PingRollup.bucket_start >= since, PingRollup.bucket_start < until)
+            .order_by(PingRollup.bucket_start)
+        )
+        return db.session.execute(query).scalars().all()
+
+    def get_series(
+        self, since: datetime, until: datetime, max_points: int
+    ) -> tuple[int | None, Sequence["Ping | PingRollup"]]:
+        """
+        Get the status of the service over a time range, in at most about `max_points` points.
+
+        The finest resolution fitting the point budget is picked: raw pings for short
+        ranges, then minute, hour and day rollups. Each lookup reads a bounded number
+        of rows, whatever the length of the range.
+
+        Returns:
+            tuple[int | None, Sequence[Ping | PingRollup]]: The resolution in seconds
+                (`None` for raw pings) and the points, oldest first
+        """
+        span = (until - since).total_seconds()
+        probe_interval = self.probe_interval or current_app.config["PROBE_INTERVAL"]
+
+        if span / probe_interval <= max_points:
+            query = (
+                select(Ping)
+                .filter_by(service_id=self.id)
+                .where(Ping.pinged_at >= since, Ping.pinged_at < until)
+                .order_by(Ping.pinged_at.desc())
+            )
+            return None, db.session.execute(query).scalars().all()[::-1]
+
+        resolution = next(
+            (r for r in PingRollup.RESOLUTIONS if span / r <= max_points),
+            PingRollup.RESOLUTIONS[-1],
+        )
+        return resolution, self.get_rollups(resolution, since, until)
+
+    def get_max_ping_id(self) -> int:
+        """Get the highest ID of the pings of the service, 0 if it has none."""
+        query = select(func.max(Ping.id)).filter_by(service_id=self.id)
+        return db.session.scalar(query) or 0
+
+    def get_pings_after_id(
+        self, cursor: int, limit: int, rescan: timedelta | None = None
+    ) -> Sequence["Ping"]:
+        """
+        Get the newest pings with an ID above `cursor`, at most `limit`, by ID.
+
+        Pings are not saved in the order of their `pinged_at` (a slow probe is saved
+        after a faster one started later), so the page is walked on the ID alone,
+        through the `(service_id, id)` index. IDs are not committed in order either:
+        they are drawn before the batch of the ping is committed, so with several
+        probers (or the COPY path of the writer) a ping may be committed after a
+        ping with a higher ID, once the cursor of a client has moved past it. With
+        `rescan`, the pings with an ID up to `cursor`, probed less than `rescan`
+        before the ping `cursor`, are returned again, for the client to merge.
+        """
+        query = (
+            select(Ping)
+            .filter_by(service_id=self.id)
+            .where(Ping.id > cursor)
+            .order_by(Ping.id.desc())
+            .limit(limit)
+        )
+        pings = db.session.execute(query).scalars().all()[::-1]
+        if not rescan or not cursor:
+            return pings
+
+        since = db.session.scalar(
+            select(Ping.pinged_at).filter_by(service_id=self.id, id=cursor)
+        )
+        if since is None:
+            return pings
+        query = (
+            select(Ping)
+            .filter_by(service_id=self.id)
+            .where(Ping.pinged_at >= since - rescan, Ping.id <= cursor)
+            .order_by(Ping.id)
+        )
+        return [*db.session.execute(query).scalars(), *pings]
+
+    def get_pings_after(self, after: datetime) -> Sequence["Ping"]:
+        """Get the pings strictly newer than `after`, newest first."""
+        query = (
+            select(Ping)
+            .filter_by(service_id=self.id)
+            .where(Ping.pinged_at > after)
+            .order_by(Ping.pinged_at.desc())
+        )
+        return db.session.execute(query).scalars().all()
+
+    def iter_ping_batches(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Sequence[Row]]:
+        """
+        Iterate over the pings of the service in `[since, until)`, oldest first.
+
+        Rows (`pinged_at`, `http_response`, `response_time`) come in batches of
+        `batch_size`, read through a server-side cursor on PostgreSQL, so memory
+        stays constant however many pings are read.
+        """
+        query = (
+            select(Ping.pinged_at, Ping.http_response, Ping.response_time)
+            .filter_by(service_id=self.id)
+            .order_by(Ping.pinged_at)
+            .execution_options(yield_per=batch_size)
+        )
+        if since is not None:
+            query = query.where(Ping.pinged_at >= since)
+        if until is not None:
+            query = query.where(Ping.pinged_at < until)
+
+        result = db.session.execute(query)
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+
 
 class Ping(db.Model):
     """Ping model to store service ping data."""
@@ -141,6 +432,22 @@ class Ping(db.Model):
     http_response: Mapped[int] = mapped_column(Integer(), nullable=False)
     response_time: Mapped[timedelta] = mapped_column(Interval(), nullable=False)
     pinged_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    dns_time: Mapped[timedelta | None] = mapped_column(Interval(), nullable=True)
+    """Time spent resolving the host, None if it was not resolved."""
+    connect_time: Mapped[timedelta | None] = mapped_column(Interval(), nullable=True)
+    """Time spent on the TCP and TLS handshakes, None on a reused connection."""
+    first_byte_time: Mapped[timedelta | None] = mapped_column(Interval(), nullable=True)
+    """Time from the request being sent to the response headers, None if unanswered."""
+
+    # ---------------------------------- INDEXES --------------------------------- #
+    # Every read path filters by service and walks the pings from the newest one
+    __table_args__ = (
+        Index("ix_ping_service_id_pinged_at", service_id, pinged_at.desc()),
+        Index("ix_ping_service_id_id", service_id, id),
+        Index("ix_ping_pinged_at_brin", pinged_at, postgresql_using="brin").ddl_if(
+            dialect="postgresql"
+        ),
+    )
 
     # ----------------------------- STANDARD METHODS ----------------------------- #
     def __init__(
@@ -158,10 +465,152 @@ class Ping(db.Model):
     def __repr__(self) -> str:
         return f"<Ping {self.id} for Service {self.service_id}>"
 
+    @classmethod
+    def from_dict(cls, service_id: int, data: dict[str, Any]) -> Self:
+        """Rebuild a ping of a service from the output of `to_dict`."""
+        ping = cls(
+            service_id=service_id,
+            http_status=data["http_response"],
+            response_time=timedelta(seconds=data["response_time"]),
+            pinged_at=datetime.fromisoformat(data["pinged_at"]),
+        )
+        ping.id = data.get("id")
+        return ping
+
     # ---------------------------------- METHODS --------------------------------- #
+    @property
+    def is_failure(self) -> bool:
+        """Whether the service was unreachable or answered with an error."""
+        return self.http_response >= 400 or self.response_time.total_seconds() < 0
+
     def to_dict(self) -> dict[str, Any]:
         return {
+            "id": self.id,
             "http_response": self.http_response,
             "response_time": self.response_time.total_seconds(),
             "pinged_at": self.pinged_at.isoformat(),
         }
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """A timestamp read from the database, in UTC."""
+    # SQLite drops the timezone, every timestamp is saved in UTC
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=pytz.utc)
+    return timestamp.astimezone(pytz.utc)
+
+
+class PingRollup(db.Model):
+    """Aggregated pings of a service over a fixed-size time bucket."""
+
+    __tablename__ = "ping_rollup"
+
+    RESOLUTIONS = (60, 3600, 86400)
+    """Supported bucket sizes, in seconds, from the finest to the coarsest."""
+
+    # ---------------------------------- COLUMNS --------------------------------- #
+    service_id: Mapped[int] = mapped_column(
+        ForeignKey(Service.id, onupdate="CASCADE", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    resolution: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    count: Mapped[int] = mapped_column(Integer(), nullable=False)
+    failures: Mapped[int] = mapped_column(Integer(), nullable=False)
+    measured: Mapped[int] = mapped_column(Integer(), nullable=False)
+    """Number of pings with a response time, i.e. that reached the service."""
+    response_time_min: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    response_time_avg: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    response_time_max: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    response_time_p95: Mapped[float | None] = mapped_column(Float(), nullable=True)
+    status_histogram: Mapped[dict[str, int]] = mapped_column(JSON(), nullable=False)
+
+    # ----------------------------- STANDARD METHODS ----------------------------- #
+    def __repr__(self) -> str:
+        return (
+            f"<PingRollup {self.resolution}s at {self.bucket_start}"
+            f" for Service {self.service_id}>"
+        )
+
+    # ---------------------------------- METHODS --------------------------------- #
+    @property
+    def dominant_status(self) -> int:
+        """The most frequent HTTP status in the bucket."""
+        return int(max(self.status_histogram, key=self.status_histogram.get))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "resolution": self.resolution,
+            "bucket_start": self.bucket_start.isoformat(),
+            "count": self.count,
+            "failures": self.failures,
+            "response_time_min": self.response_time_min,
+            "response_time_avg": self.response_time_avg,
+            "response_time_max": self.response_time_max,
+            "response_time_p95": self.response_time_p95,
+            "status_histogram": self.status_histogram,
+        }
+
+
+class ProberLease(db.Model):
+    """
+    Lease of a running prober, renewed periodically.
+
+    The probers holding an unexpired lease share the services between them, see
+    `downtime_panda.blueprints.service.sharding`.
+    """
+
+    __tablename__ = "prober_lease"
+    # ---------------------------------- COLUMNS --------------------------------- #
+    prober_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    # ----------------------------- STANDARD METHODS ----------------------------- #
+    def __repr__(self) -> str:
+        return f"<ProberLease {self.prober_id} until {self.expires_at}>"
+
+    # ---------------------------------- METHODS --------------------------------- #
+    @classmethod
+    def renew(cls, prober_id: str, expires_at: datetime) -> None:
+        """Take or extend the lease of a prober."""
+        query = update(cls).filter_by(prober_id=prober_id).values(expires_at=expires_at)
+        if db.session.execute(query).rowcount == 0:
+            db.session.add(cls(prober_id=prober_id, expires_at=expires_at))
+        db.session.commit()
+
+    @classmethod
+    def live_prober_ids(cls, now: datetime) -> list[str]:
+        """The probers whose lease has not expired yet."""
+        query = select(cls.prober_id).where(cls.expires_at > now)
+        return list(db.session.execute(query).scalars())
+
+    @classmethod
+    def release(cls, prober_id: str) -> None:
+        """Give the lease up, handing the services over to the other probers right away."""
+        db.session.execute(delete(cls).filter_by(prober_id=prober_id))
+        db.session.commit()
+
+    @classmethod
+    def purge_expired(cls, before: datetime) -> None:
+        """Forget the probers whose lease expired before the given time."""
+        db.session.execute(delete(cls).where(cls.expires_at < before))
+        db.session.commit()
+
+
+# ---------------------------------------------------------------------------- #
+#                            LATEST PING INVALIDATION                          #
+# ---------------------------------------------------------------------------- #
+# Pings saved by the ping writer update the cache directly, while pings saved
+# through the ORM, and deleted services, only make the cached entry stale
+@event.listens_for(Ping, "after_insert")
+def _invalidate_latest_ping_on_insert(mapper, connection, ping: Ping) -> None:
+    latest_pings.invalidate(ping.service_id)
+
+
+@event.listens_for(Service, "after_delete")
+def _invalidate_latest_ping_on_delete(mapper, connection, service: Service) -> None:
+    latest_pings.invalidate(service.id)
@@ -0,0 +1,359 @@
+"""
+Asynchronous probe engine for Downtime Panda.
+
+All probes are multiplexed over a single asyncio event loop, running in a
+background thread, so scheduler threads only hand work over instead of waiting
+for the full HTTP round trip.
+
+Probes share a pool of keep-alive connections, so a service probed again reuses
+its connection instead of resolving its host and shaking hands all over again.
+Each probe records how long the DNS lookup, the connection (TCP and TLS
+handshakes) and the first byte of the response took; on a reused connection only
+the first byte is measured. With `PROBE_COLD_CONNECTIONS`, every probe opens a
+fresh connection instead, measuring the full handshakes every time.
+
+Services whose URIs only differ in form (see `uris.py`) are probed with a single
+request per batch, its result being saved for each of them.
+
+exports:
+    - ProbeTarget: A service to be probed.
+    - ProbeResult: The outcome of a single probe.
+    - ProbeEngine: The engine running the probes.
+"""
+
+__all__ = ["ProbeTarget", "ProbeResult", "ProbeEngine"]
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Iterable
+
+import pytz
+from flask import Flask
+from loguru import logger
+
+from downtime_panda.blueprints.service.uris import canonical_uri
+from downtime_panda.metrics import metrics
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from downtime_panda.blueprints.service.writer import PingWriter
+
+
+@dataclass(frozen=True)
+class ProbeTarget:
+    """A service to be probed."""
+
+    service_id: int
+    uri: str
+    timeout: float | None = None
+    """Total timeout of the probe, in seconds, the one of the engine if None."""
+    scheduled_at: datetime | None = None
+    """When the probe was meant to start, to measure how late it is."""
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    """The outcome of a single probe, ready to be saved as a `Ping`."""
+
+    service_id: int
+    http_status: int
+    response_time: timedelta
+    pinged_at: datetime
+    ping_id: int | None = None
+    """ID of the saved `Ping`, set by the ping writer."""
+    dns_time: timedelta | None = None
+    """Time spent resolving the host, None if it was not resolved."""
+    connect_time: timedelta | None = None
+    """Time spent on the TCP and TLS handshakes, None on a reused connection."""
+    first_byte_time: timedelta | None = None
+    """Time from the request being sent to the response headers, None if unanswered."""
+
+    def to_dict(self) -> dict[str, Any]:
+        """The result in the same shape as `Ping.to_dict`."""
+        return {
+            "id": self.ping_id,
+            "http_response": self.http_status,
+            "response_time": self.response_time.total_seconds(),
+            "pinged_at": self.pinged_at.isoformat(),
+        }
+
+
+class _Timings:
+    """Phases of a single probe, filled in by the trace hooks of the HTTP session."""
+
+    def __init__(self):
+        self.dns: float | None = None
+        self.connect: float | None = None
+        self.first_byte: float | None = None
+        self._started: dict[str, float] = {}
+
+    def start(self, phase: str) -> None:
+        self._started[phase] = time.perf_counter()
+
+    def end(self, phase: str) -> None:
+        elapsed = time.perf_counter() - self._started.pop(phase)
+        # Redirects may go through the same phase once per hop
+        setattr(self, phase, (getattr(self, phase) or 0) + elapsed)
+
+    @property
+    def handshake(self) -> float | None:
+        # The host is resolved while the connection is being created
+        if self.connect is None:
+            return None
+        return max(self.connect - (self.dns or 0), 0)
+
+
+def _trace_config() -> "aiohttp.TraceConfig":
+    import aiohttp
+
+    def hook(phase: str, start: bool):
+        async def on_signal(session, context, params) -> None:
+            timings = context.trace_request_ctx
+            if not isinstance(timings, _Timings):
+                return
+            if start:
+                timings.start(phase)
+            else:
+                timings.end(phase)
+
+        return on_signal
+
+    async def on_connection_reused(session, context, params) -> None:
+        metrics.counter("probe_connections_reused_total").inc()
+
+    async def on_connection_opened(session, context, params) -> None:
+        metrics.counter("probe_connections_opened_total").inc()
+
+    trace = aiohttp.TraceConfig()
+    trace.on_dns_resolvehost_start.append(hook("dns", start=True))
+    trace.on_dns_resolvehost_end.append(hook("dns", start=False))
+    trace.on_connection_create_start.append(hook("connect", start=True))
+    trace.on_connection_create_end.append(hook("connect", start=False))
+    trace.on_connection_create_end.append(on_connection_opened)
+    trace.on_connection_reuseconn.append(on_connection_reused)
+    trace.on_request_headers_sent.append(hook("first_byte", start=True))
+    trace.on_request_end.append(hook("first_byte", start=False))
+    return trace
+
+
+class ProbeEngine:
+    """
+    Runs HTTP probes concurrently over a single event loop.
+
+    The engine follows the usual Flask extension pattern: create it once, then
+    bind it to the application with `init_app`. The event loop is started
+    lazily, on the first submitted probe.
+    """
+
+    def __init__(self, app: Flask | None = None, writer: "PingWriter | None" = None):
+        self.app: Flask | None = None
+        self.writer: "PingWriter | None" = None
+        self.concurrency = 500
+        self.timeout = 10.0
+        self.pool_per_host = 0
+        self.keepalive_timeout = 30.0
+        self.cold_connections = False
+        self.dns_cache_size = 1024
+        self.dns_ttl = 60.0
+        self.dns_negative_ttl = 5.0
+
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._session: "aiohttp.ClientSession | None" = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+        if app is not None:
+            self.init_app(app, writer)
+
+    def init_app(self, app: Flask, writer: "PingWriter") -> None:
+        """Bind the engine to the Flask application and the writer saving its results."""
+        self.app = app
+        self.writer = writer
+        self.concurrency = app.config["PROBE_CONCURRENCY"]
+        self.timeout = app.config["PROBE_TIMEOUT"]
+        self.pool_per_host = app.config["PROBE_POOL_PER_HOST"]
+        self.keepalive_timeout = app.config["PROBE_POOL_IDLE_TIMEOUT"]
+        self.cold_connections = app.config["PROBE_COLD_CONNECTIONS"]
+        self.dns_cache_size = app.config["PROBE_DNS_CACHE_SIZE"]
+        self.dns_ttl = app.config["PROBE_DNS_TTL"]
+        self.dns_negative_ttl = app.config["PROBE_DNS_NEGATIVE_TTL"]
+        app.extensions["prober"] = self
+
+    # --------------------------------- LIFECYCLE -------------------------------- #
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self) -> None:
+        """Start the event loop thread, if not already running."""
+        with self._lock:
+            if self.running:
+                return
+
+            loop = asyncio.new_event_loop()
+            self._loop = loop
+            self._thread = threading.Thread(
+                target=loop.run_forever, name="probe-engine", daemon=True
+            )
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+            logger.info(f"Probe engine started (concurrency={self.concurrency})")
+
+    def shutdown(self) -> None:
+        """Close the HTTP session and stop the event loop thread."""
+        with self._lock:
+            if not self.running:
+                return
+
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+    async def _open(self) -> None:
+        # aiohttp is only imported by the processes actually probing
+        import aiohttp
+
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self.cold_connections:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency, force_close=True, use_dns_cache=False
+            )
+        elif self.dns_cache_size:
+            from downtime_panda.blueprints.service.dns import CachingResolver
+
+            resolver = CachingResolver(
+                ttl=self.dns_ttl,
+                negative_ttl=self.dns_negative_ttl,
+                max_size=self.dns_cache_size,
+            )
+            # The resolver caches the answers itself, in place of the connector
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency,
+                limit_per_host=self.pool_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                resolver=resolver,
+                use_dns_cache=False,
+            )
+        else:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency,
+                limit_per_host=self.pool_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[_trace_config()],
+        )
+
+    async def _close(self) -> None:
+        await self._session.close()
+
+    # ---------------------------------- PROBING --------------------------------- #
+    def submit(self, targets: Iterable[ProbeTarget]) -> Future:
+        """
+        Schedule the targets to be probed and saved, without waiting for them.
+
+        Returns:
+            Future: Resolves to the list of `ProbeResult` once they are handed to the writer.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self._probe_and_queue(list(targets)), self._loop
+        )
+
+    async def _probe_and_queue(self, targets: list[ProbeTarget]) -> list[ProbeResult]:
+        results = await self.probe_many(targets)
+        for result in results:
+            try:
+                self.writer.put_nowait(result)
+            except queue.Full:
+                # Backpressure: wait for the writer off the event loop
+                await asyncio.to_thread(self.writer.put, result)
+        return results
+
+    async def probe_many(self, targets: Iterable[ProbeTarget]) -> list[ProbeResult]:
+        """
+        Probe all the targets concurrently, in the order given.
+
+        Targets sharing the same canonical URI (and timeout) are probed with a single
+        request, whose result is handed to each of their services.
+        """
+        targets = list(targets)
+        groups: dict[tuple[str, float | None], list[ProbeTarget]] = {}
+        for target in targets:
+            key = (canonical_uri(target.uri), target.timeout)
+            groups.setdefault(key, []).append(target)
+        if coalesced := len(targets) - len(groups):
+            metrics.counter("probe_coalesced_total").inc(coalesced)
+
+        probed = await asyncio.gather(
+            *(self.probe(group[0]) for group in groups.values())
+        )
+        results = {}
+        for group, result in zip(groups.values(), probed):
+            for target in group:
+                results[id(target)] = replace(result, service_id=target.service_id)
+        return [results[id(target)] for target in targets]
+
+    async def probe(self, target: ProbeTarget) -> ProbeResult:
+        """
+        Probe a single target, bounded by the engine's concurrency.
+
+        Never raises: a failed probe is reported as an unreachable service.
+        """
+        import aiohttp
+
+        timings = _Timings()
+        options = {"trace_request_ctx": timings}
+        if target.timeout is not None:
+            options["timeout"] = aiohttp.ClientTimeout(total=target.timeout)
+
+        async with self._semaphore:
+            pinged_at = datetime.now(pytz.utc)
+            if target.scheduled_at is not None:
+                metrics.histogram("probe_schedule_lag_seconds").observe(
+                    (pinged_at - target.scheduled_at).total_seconds()
+                )
+
+            started = time.perf_counter()
+            try:
+                async with self._session.head(
+                    target.uri, allow_redirects=True, **options
+                ) as response:
+                    status_code = response.status
+                    response_time = timedelta(seconds=time.perf_counter() - started)
+            except (aiohttp.ClientError, TimeoutError) as e:
+                logger.debug(f"Probe for service {target.service_id} failed: {e!r}")
+                status_code = HTTPStatus.NOT_FOUND
+                response_time = timedelta(seconds=-1)
+            except Exception:
+                # A bug in a single probe must not fail the rest of the batch
+                logger.exception(f"Probe for service {target.service_id} crashed")
+                status_code = HTTPStatus.NOT_FOUND
+                response_time = timedelta(seconds=-1)
+
+        return ProbeResult(
+            service_id=target.service_id,
+            http_status=status_code,
+            response_time=response_time,
+            pinged_at=pinged_at,
+            dns_time=_delta(timings.dns),
+            connect_time=_delta(timings.handshake),
+            first_byte_time=_delta(timings.first_byte),
+        )
+
+
+def _delta(seconds: float | None) -> timedelta | None:
+    return None if seconds is None else timedelta(seconds=seconds)
@@ -0,0 +1,246 @@
+"""
+Retention policy for the pings saved by Downtime Panda.
+
+On PostgreSQL the ping table is range-partitioned by `pinged_at`: the retention job
+creates the upcoming partitions ahead of time, then detaches and drops the ones
+whose pings are all older than the retention period. A DEFAULT partition catches
+the pings falling outside of every partition (e.g. while the retention job was not
+running): they are moved to their partition once it is created. On any other
+database, or on a PostgreSQL ping table that is not partitioned, old pings are
+deleted in batches.
+
+exports:
+    - RETENTION_JOB_ID: ID of the retention job in the scheduler.
+    - PARTITION_INTERVALS: Supported partition sizes.
+    - DEFAULT_PARTITION: Name of the partition catching the pings of no other one.
+    - enforce_ping_retention: The retention job.
+    - schedule_retention: Registers the retention job in the scheduler.
+"""
+
+__all__ = [
+    "RETENTION_JOB_ID",
+    "PARTITION_INTERVALS",
+    "DEFAULT_PARTITION",
+    "enforce_ping_retention",
+    "schedule_retention",
+]
+
+import re
+from datetime import datetime, timedelta
+
+import pytz
+from apscheduler.triggers.interval import IntervalTrigger
+from flask import Flask
+from loguru import logger
+from sqlalchemy import delete, select, text
+
+from downtime_panda.blueprints.service.models import Ping
+from downtime_panda.extensions import db, prober_shard, scheduler
+
+RETENTION_JOB_ID = "ping_retention"
+
+PARTITION_INTERVALS = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+DEFAULT_PARTITION = "ping_default"
+
+_PARTITIONS_SQL = text(
+    """
+    SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = 'ping'
+    """
+)
+_PARTITION_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def enforce_ping_retention() -> None:
+    """Apply the ping retention policy, with the strategy fitting the database."""
+    # Run by a single prober for all of them
+    if not prober_shard.is_leader:
+        return
+
+    with scheduler.app.app_context():
+        config = scheduler.app.config
+        now = datetime.now(pytz.utc)
+
+        if is_ping_partitioned():
+            create_upcoming_partitions(
+                now,
+                PARTITION_INTERVALS[config["PING_PARTITION_INTERVAL"]],
+                config["PING_PARTITIONS_AHEAD"],
+            )
+            if config["PING_RETENTION_DAYS"]:
+                drop_expired_partitions(
+                    now - timedelta(days=config["PING_RETENTION_DAYS"])
+                )
+        elif config["PING_RETENTION_DAYS"]:
+            delete_expired_pings(
+                now - timedelta(days=config["PING_RETENTION_DAYS"]),
+                config["PING_RETENTION_BATCH_SIZE"],
+            )
+
+
+def schedule_retention(app: Flask) -> None:
+    """Register the retention job in the scheduler, running it once right away."""
+    scheduler.add_job(
+        id=RETENTION_JOB_ID,
+        func=f"{__name__}:enforce_ping_retention",
+        trigger=IntervalTrigger(seconds=app.config["PING_RETENTION_INTERVAL"]),
+        next_run_time=datetime.now(pytz.utc),
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+
+
+# ---------------------------------------------------------------------------- #
+#                                  PARTITIONS                                  #
+# ---------------------------------------------------------------------------- #
+def is_ping_partitioned() -> bool:
+    """Checks whether the ping table is a PostgreSQL partitioned table."""
+    if db.engine.dialect.name != "postgresql":
+        return False
+
+    query = text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('ping')"
+    )
+    return db.session.execute(query).first() is not None
+
+
+def get_partitions() -> dict[str, datetime | None]:
+    """
+    Get the partitions of the ping table.
+
+    Returns:
+        dict[str, datetime | None]: The upper bound of each partition, by name.
+            The bound is `None` for partitions without one (i.e. `MAXVALUE`, or
+            the DEFAULT partition).
+    """
+    partitions = {}
+    for name, bound in db.session.execute(_PARTITIONS_SQL).all():
+        match = _PARTITION_UPPER_BOUND.search(bound)
+        partitions[name] = datetime.fromisoformat(match.group(1)) if match else None
+    return partitions
+
+
+def create_upcoming_partitions(now: datetime, interval: timedelta, ahead: int) -> None:
+    """
+    Make sure partitions exist from now until `ahead` intervals in the future.
+
+    New partitions continue from the upper bound of the latest one, so they never
+    overlap with existing partitions, even after changing the interval.
+    """
+    upper_bounds = [bound for bound in get_partitions().values() if bound]
+    start = (
+        max(upper_bounds)
+        if upper_bounds
+        else now.replace(hour=0, minute=0, second=0, microsecond=0)
+    )
+    horizon = now + interval * ahead
+
+    while start < horizon:
+        end = start + interval
+        create_partition(f"ping_p{start:%Y%m%d}", start, end)
+        start = end
+
+    db.session.commit()
+
+
+def create_partition(name: str, start: datetime, end: datetime) -> None:
+    """
+    Create the partition of the pings in `[start, end)`.
+
+    PostgreSQL refuses to create a partition while the DEFAULT one holds rows of its
+    range: those are moved into the new partition, before attaching it.
+    """
+    logger.info(f"Creating ping partition {name} [{start}, {end})")
+    # DDL statements cannot take bound parameters
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = {"start": start, "end": end}
+    stray = db.session.execute(
+        text(
+            f"SELECT 1 FROM {DEFAULT_PARTITION}"
+            " WHERE pinged_at >= :start AND pinged_at < :end LIMIT 1"
+        ),
+        in_range,
+    ).first()
+    if stray is None:
+        db.session.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF ping {bounds}")
+        )
+        return
+
+    logger.warning(
+        f"Moving the pings of {name} out of the {DEFAULT_PARTITION} partition"
+    )
+    db.session.execute(text(f"CREATE TABLE {name} (LIKE ping INCLUDING DEFAULTS)"))
+    db.session.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION}"
+            " WHERE pinged_at >= :start AND pinged_at < :end RETURNING *)"
+            f" INSERT INTO {name} SELECT * FROM moved"
+        ),
+        in_range,
+    )
+    db.session.execute(text(f"ALTER TABLE ping ATTACH PARTITION {name} {bounds}"))
+
+
+def drop_expired_partitions(cutoff: datetime) -> None:
+    """
+    Detach and drop every partition only holding pings older than `cutoff`.
+
+    The expired pings of the DEFAULT partition, which is never dropped, are deleted.
+    """
+    result = db.session.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE pinged_at < :cutoff"),
+        {"cutoff": cutoff},
+    )
+    db.session.commit()
+    if result.rowcount:
+        logger.info(
+            f"Deleted {result.rowcount} ping(s) older than {cutoff}"
+            f" from the {DEFAULT_PARTITION} partition"
+        )
+
+    for name, upper_bound in get_partitions().items():
+        if upper_bound is None or upper_bound > cutoff:
+            continue
+
+        logger.info(f"Dropping expired ping partition {name}")
+        db.session.execute(text(f"ALTER TABLE ping DETACH PARTITION {name}"))
+        db.session.execute(text(f"DROP TABLE {name}"))
+        db.session.commit()
+
+
+# ---------------------------------------------------------------------------- #
+#                                BATCHED DELETE                                #
+# ---------------------------------------------------------------------------- #
+def delete_expired_pings(cutoff: datetime, batch_size: int) -> int:
+    """
+    Delete the pings older than `cutoff`, `batch_size` rows per transaction.
+
+    Returns:
+        int: The number of deleted pings
+    """
+    deleted = 0
+    while True:
+        expired = select(Ping.id).where(Ping.pinged_at < cutoff).limit(batch_size)
+        result = db.session.execute(
+            delete(Ping)
+            .where(Ping.id.in_(expired.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            break
+
+    if deleted:
+        logger.info(f"Deleted {deleted} ping(s) older than {cutoff}")
+    return deleted
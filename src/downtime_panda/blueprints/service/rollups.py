@@ -0,0 +1,374 @@
+"""
+Downsampled rollups of the pings saved by Downtime Panda.
+
+Raw pings are incrementally aggregated into minute buckets, minute buckets into hour
+buckets, and hour buckets into day buckets, so long-range charts read a bounded
+number of rows instead of every raw ping.
+
+exports:
+    - ROLLUP_JOB_ID: ID of the rollup job in the scheduler.
+    - refresh_rollups_job: The rollup job.
+    - refresh_rollups: Brings every rollup resolution up to date.
+    - schedule_rollups: Registers the rollup job in the scheduler.
+"""
+
+__all__ = [
+    "ROLLUP_JOB_ID",
+    "refresh_rollups",
+    "refresh_rollups_job",
+    "schedule_rollups",
+]
+
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+import pytz
+from apscheduler.triggers.interval import IntervalTrigger
+from flask import Flask
+from loguru import logger
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Float,
+    Integer,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    literal_column,
+    or_,
+    select,
+)
+
+from downtime_panda.blueprints.service.models import Ping, PingRollup, as_utc
+from downtime_panda.extensions import db, prober_shard, scheduler
+
+ROLLUP_JOB_ID = "ping_rollups"
+
+PERCENTILE = 0.95
+
+
+def refresh_rollups_job() -> None:
+    """Bring every rollup resolution up to date."""
+    # Run by a single prober for all of them
+    if not prober_shard.is_leader:
+        return
+
+    with scheduler.app.app_context():
+        refresh_rollups(
+            datetime.now(pytz.utc), scheduler.app.config["ROLLUP_MAX_BUCKETS"]
+        )
+
+
+def schedule_rollups(app: Flask) -> None:
+    """Register the rollup job in the scheduler."""
+    scheduler.add_job(
+        id=ROLLUP_JOB_ID,
+        func=f"{__name__}:refresh_rollups_job",
+        trigger=IntervalTrigger(seconds=app.config["ROLLUP_INTERVAL"]),
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+
+
+def refresh_rollups(now: datetime, max_buckets: int) -> None:
+    """
+    Aggregate the new pings into every rollup resolution.
+
+    Each resolution resumes from its latest bucket (which is recomputed, along with the
+    one before it, to pick up late pings), and advances by at most `max_buckets`
+    buckets per call, so backfilling a long history is spread over several runs.
+    Stretches without any ping are skipped, however long.
+
+    Args:
+        now (datetime): The current time
+        max_buckets (int): Maximum number of buckets computed per resolution
+    """
+    source_resolution = None
+    for resolution in PingRollup.RESOLUTIONS:
+        start = _resume_point(resolution, source_resolution)
+        if start is None:
+            return
+
+        window = timedelta(seconds=resolution * max_buckets)
+        end = start + window
+        # Jump over a gap longer than the window, which would otherwise never move on
+        following = _first_source_at(
+            start + 2 * timedelta(seconds=resolution), source_resolution
+        )
+        if following is not None and following >= end:
+            end = _floor(following, resolution) + window
+        end = min(now, end)
+        if source_resolution is None:
+            buckets = _aggregate_pings(start, end, resolution)
+        else:
+            buckets = _aggregate_rollups(start, end, source_resolution, resolution)
+
+        db.session.execute(
+            delete(PingRollup).where(
+                PingRollup.resolution == resolution,
+                PingRollup.bucket_start >= start,
+                PingRollup.bucket_start < end,
+            )
+        )
+        db.session.add_all(buckets)
+        db.session.commit()
+        logger.debug(f"Refreshed {len(buckets)} rollup(s) of {resolution}s")
+
+        source_resolution = resolution
+
+
+# ---------------------------------------------------------------------------- #
+#                                    HELPERS                                   #
+# ---------------------------------------------------------------------------- #
+def _floor(timestamp: datetime, resolution: int) -> datetime:
+    seconds = math.floor(as_utc(timestamp).timestamp())
+    return datetime.fromtimestamp(seconds - seconds % resolution, pytz.utc)
+
+
+def _resume_point(resolution: int, source_resolution: int | None) -> datetime | None:
+    latest = db.session.scalar(
+        select(func.max(PingRollup.bucket_start)).filter_by(resolution=resolution)
+    )
+    if latest is not None:
+        return as_utc(latest) - timedelta(seconds=resolution)
+
+    if source_resolution is None:
+        earliest = db.session.scalar(select(func.min(Ping.pinged_at)))
+    else:
+        earliest = db.session.scalar(
+            select(func.min(PingRollup.bucket_start)).filter_by(
+                resolution=source_resolution
+            )
+        )
+    return _floor(earliest, resolution) if earliest is not None else None
+
+
+def _first_source_at(since: datetime, source_resolution: int | None) -> datetime | None:
+    if source_resolution is None:
+        query = select(func.min(Ping.pinged_at)).where(Ping.pinged_at >= since)
+    else:
+        query = select(func.min(PingRollup.bucket_start)).where(
+            PingRollup.resolution == source_resolution,
+            PingRollup.bucket_start >= since,
+        )
+    following = db.session.scalar(query)
+    return as_utc(following) if following is not None else None
+
+
+def _percentile(weighted_values: Iterable[tuple[float, int]]) -> float | None:
+    """Nearest-rank percentile of values, each repeated as many times as its weight."""
+    weighted_values = sorted(weighted_values)
+    total = sum(weight for _, weight in weighted_values)
+    if not total:
+        return None
+
+    rank = math.ceil(PERCENTILE * total)
+    seen = 0
+    for value, weight in weighted_values:
+        seen += weight
+        if seen >= rank:
+            return value
+    return weighted_values[-1][0]
+
+
+class _Bucket:
+    """Accumulates pings, or finer rollups, falling into the same bucket."""
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.measured = 0
+        self.response_time_sum = 0.0
+        self.response_time_min: float | None = None
+        self.response_time_max: float | None = None
+        self.weighted_response_times: list[tuple[float, int]] = []
+        self.status_histogram: Counter[str] = Counter()
+
+    def add(
+        self,
+        count: int,
+        failures: int,
+        status_histogram: dict[str, int],
+        measured: int = 0,
+        response_time_min: float | None = None,
+        response_time_avg: float | None = None,
+        response_time_max: float | None = None,
+        response_time_p95: float | None = None,
+    ) -> None:
+        self.count += count
+        self.failures += failures
+        self.status_histogram.update(status_histogram)
+        if not measured:
+            return
+
+        self.measured += measured
+        self.response_time_sum += response_time_avg * measured
+        if self.response_time_min is None or response_time_min < self.response_time_min:
+            self.response_time_min = response_time_min
+        if self.response_time_max is None or response_time_max > self.response_time_max:
+            self.response_time_max = response_time_max
+        self.weighted_response_times.append((response_time_p95, measured))
+
+    def to_rollup(
+        self, service_id: int, resolution: int, bucket_start: datetime
+    ) -> PingRollup:
+        return PingRollup(
+            service_id=service_id,
+            resolution=resolution,
+            bucket_start=bucket_start,
+            count=self.count,
+            failures=self.failures,
+            measured=self.measured,
+            response_time_min=self.response_time_min,
+            response_time_avg=(
+                self.response_time_sum / self.measured if self.measured else None
+            ),
+            response_time_max=self.response_time_max,
+            response_time_p95=_percentile(self.weighted_response_times),
+            status_histogram=dict(self.status_histogram),
+        )
+
+
+def _seconds(column: Any) -> ColumnElement[float]:
+    """Seconds since the epoch of a timestamp column, or length of an interval one."""
+    if db.engine.dialect.name == "postgresql":
+        return cast(func.extract("epoch", column), Float)
+
+    # SQLite stores both as text, an interval as the timestamp that long past the epoch
+    return (
+        cast(func.strftime("%s", column), Integer)
+        - cast(func.strftime("%S", column), Integer)
+        + cast(func.substr(column, 18), Float)
+    )
+
+
+def _bucket_start(column: Any, resolution: int) -> ColumnElement[int]:
+    """Start of the bucket of a timestamp column, in seconds since the epoch."""
+    # Inlined rather than bound, so the GROUP BY matches the selected expression
+    size = literal_column(str(int(resolution)), Integer)
+    if db.engine.dialect.name == "postgresql":
+        return cast(func.floor(_seconds(column) / size) * size, BigInteger)
+    return cast(func.strftime("%s", column), Integer) // size * size
+
+
+def _aggregate_pings(
+    start: datetime, end: datetime, resolution: int
+) -> list[PingRollup]:
+    """
+    Aggregate raw pings into buckets, within the database.
+
+    Counts, minimum, average and maximum come from a single query grouped by service
+    and bucket; the status histogram and the 95th percentile (from a ranking of the
+    response times) from two smaller ones. No ping is loaded into the application.
+    """
+    bucket = _bucket_start(Ping.pinged_at, resolution)
+    response_time = _seconds(Ping.response_time)
+    reached = Ping.response_time >= timedelta(0)
+    in_window = and_(Ping.pinged_at >= start, Ping.pinged_at < end)
+
+    stats_query = (
+        select(
+            Ping.service_id,
+            bucket,
+            func.count(),
+            func.count(case((or_(Ping.http_response >= 400, ~reached), 1))),
+            func.count(case((reached, 1))),
+            func.min(case((reached, response_time))),
+            func.avg(case((reached, response_time))),
+            func.max(case((reached, response_time))),
+        )
+        .where(in_window)
+        .group_by(Ping.service_id, bucket)
+    )
+    rollups: dict[tuple[int, int], PingRollup] = {}
+    for (
+        service_id,
+        bucket_start,
+        count,
+        failures,
+        measured,
+        *times,
+    ) in db.session.execute(stats_query):
+        rollups[service_id, int(bucket_start)] = PingRollup(
+            service_id=service_id,
+            resolution=resolution,
+            bucket_start=datetime.fromtimestamp(int(bucket_start), pytz.utc),
+            count=count,
+            failures=failures,
+            measured=measured,
+            response_time_min=times[0],
+            response_time_avg=times[1],
+            response_time_max=times[2],
+            status_histogram={},
+        )
+
+    histogram_query = (
+        select(Ping.service_id, bucket, Ping.http_response, func.count())
+        .where(in_window)
+        .group_by(Ping.service_id, bucket, Ping.http_response)
+    )
+    for service_id, bucket_start, status, count in db.session.execute(histogram_query):
+        rollups[service_id, int(bucket_start)].status_histogram[str(status)] = count
+
+    # Nearest-rank percentile: the fastest response time ranked past the percentile
+    ranked = (
+        select(
+            Ping.service_id,
+            bucket.label("bucket"),
+            response_time.label("response_time"),
+            func.row_number()
+            .over(partition_by=(Ping.service_id, bucket), order_by=response_time)
+            .label("rank"),
+            func.count().over(partition_by=(Ping.service_id, bucket)).label("measured"),
+        )
+        .where(in_window, reached)
+        .subquery()
+    )
+    percentile_query = (
+        select(ranked.c.service_id, ranked.c.bucket, func.min(ranked.c.response_time))
+        .where(ranked.c.rank >= ranked.c.measured * PERCENTILE)
+        .group_by(ranked.c.service_id, ranked.c.bucket)
+    )
+    for service_id, bucket_start, p95 in db.session.execute(percentile_query):
+        rollups[service_id, int(bucket_start)].response_time_p95 = p95
+
+    return list(rollups.values())
+
+
+def _aggregate_rollups(
+    start: datetime, end: datetime, source_resolution: int, resolution: int
+) -> list[PingRollup]:
+    """
+    Merge finer rollups into coarser ones.
+
+    Counts, minimum, maximum and average are exact; the 95th percentile is
+    approximated as the weighted percentile of the finer buckets' percentiles.
+    """
+    buckets: dict[tuple[int, datetime], _Bucket] = {}
+    query = select(PingRollup).where(
+        PingRollup.resolution == source_resolution,
+        PingRollup.bucket_start >= start,
+        PingRollup.bucket_start < end,
+    )
+    for rollup in db.session.scalars(query):
+        key = (rollup.service_id, _floor(rollup.bucket_start, resolution))
+        buckets.setdefault(key, _Bucket()).add(
+            count=rollup.count,
+            failures=rollup.failures,
+            status_histogram=rollup.status_histogram,
+            measured=rollup.measured,
+            response_time_min=rollup.response_time_min,
+            response_time_avg=rollup.response_time_avg,
+            response_time_max=rollup.response_time_max,
+            response_time_p95=rollup.response_time_p95,
+        )
+
+    return [
+        bucket.to_rollup(service_id, resolution, bucket_start)
+        for (service_id, bucket_start), bucket in buckets.items()
+    ]
@@ -1,18 +1,11 @@
-import time
+import json
 from datetime import datetime
 from http import HTTPStatus
 
-from flask import (
-    Blueprint,
-    Response,
-    abort,
-    render_template,
-    request,
-    stream_with_context,
-)
-from loguru import logger
+from flask import Blueprint, Response, abort, render_template, request
 
-from downtime_panda.extensions import db
+from downtime_panda.blueprints.service.broadcaster import PingSubscriber
+from downtime_panda.extensions import db, ping_broadcaster
 
 from .models import Ping, Service
 
@@ -20,20 +13,24 @@ service_blueprint = Blueprint("service", __name__)
 
 
 # ------------------------------------ SSE ----------------------------------- #
-def stream(service: Service, last_pinged_at: datetime):
-    while True:
-        logger.info("Test")
-        new_pings = db.session.scalars(
-            service.ping.select()
-            .where(Ping.pinged_at > last_pinged_at)
-            .order_by(Ping.pinged_at.desc())
-        ).all()
+def stream(subscriber: PingSubscriber, last_ping: Ping | None, keepalive: float):
+    """
+    Stream the pings pushed to the subscriber, starting from the latest known one.
+
+    The database is never queried while streaming: new pings come from the ping
+    broadcaster, and a comment is sent every `keepalive` idle seconds so proxies
+    keep the connection open.
+    """
+    if last_ping is not None:
+        yield f"data: {json.dumps(last_ping.to_dict())}\n\n"
 
-        if new_pings:
-            last_pinged_at = max(new_pings, key=lambda x: x.pinged_at).pinged_at
-            yield f"data: {new_pings[0].dump_json()}\n\n"
+    while True:
+        ping = subscriber.get(timeout=keepalive)
+        if ping is None:
+            yield ": keepalive\n\n"
+            continue
 
-        time.sleep(1)
+        yield f"data: {json.dumps(ping)}\n\n"
 
 
 # ---------------------------------------------------------------------------- #
@@ -52,14 +49,10 @@ def fetch_latest_pings(id):
     if not latest_timestamp:
         abort(HTTPStatus.BAD_REQUEST, description="Missing latest_timestamp")
 
-    latest_pings = db.session.scalars(
-        service.ping.select()
-        .order_by(Ping.pinged_at.desc())
-        .filter_by(Ping.pinged_at > latest_timestamp)
-    ).all()
+    latest_pings = service.get_pings_after(datetime.fromisoformat(latest_timestamp))
 
     return {
-        "latest_pings": [ping.dump_json() for ping in latest_pings],
+        "latest_pings": [ping.to_dict() for ping in latest_pings],
     }
 
 
@@ -67,14 +60,16 @@ def fetch_latest_pings(id):
 def service_stream(id):
     service = db.get_or_404(Service, id)
 
-    last_ping = db.session.scalars(service.ping.select()).first()
-
-    if not last_ping:
-        abort(404)
-
-    last_pinged_at = last_ping.pinged_at
+    # Subscribe before reading the latest ping, so no ping falls in between
+    subscriber = ping_broadcaster.subscribe(service.id)
+    last_ping = service.get_latest_ping()
 
-    return Response(
-        stream_with_context(stream(service, last_pinged_at)),
+    # The stream runs outside of the request context, so the database session is
+    # released as soon as the response starts instead of when the client leaves
+    response = Response(
+        stream(subscriber, last_ping, ping_broadcaster.keepalive),
         mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+    response.call_on_close(subscriber.close)
+    return response
@@ -0,0 +1,133 @@
+"""
+Sharding of the probes of Downtime Panda across several prober processes.
+
+Every service falls into one of `PROBER_SHARD_SLOTS` slots (its ID modulo the
+number of slots), and the slots are spread over the live probers with consistent
+hashing: each prober places `PROBER_VIRTUAL_NODES` points on a hash ring, and a
+slot belongs to the first prober point following it on the ring. When a prober
+joins or dies, only the slots next to its points move.
+
+The live probers are the ones holding an unexpired lease in the database, which
+each of them renews periodically. Every prober derives the same ring from the same
+leases, and the probes themselves are still claimed with a conditional `UPDATE`,
+so two probers briefly disagreeing on the ring never probe a service twice.
+
+exports:
+    - HashRing: The consistent hash ring of the live probers.
+    - ProberShard: The share of the services of this prober, as a Flask extension.
+    - default_prober_id: ID of this prober, unless configured.
+"""
+
+__all__ = ["HashRing", "ProberShard", "default_prober_id"]
+
+import bisect
+import hashlib
+import os
+import socket
+import threading
+from typing import Iterable
+
+from flask import Flask
+from loguru import logger
+
+from downtime_panda.metrics import metrics
+
+
+def default_prober_id() -> str:
+    """The host name and process ID, unique among running probers."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _hash(key: str) -> int:
+    # Python's own hash() is salted per process, probers must all agree
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
+
+
+class HashRing:
+    """A consistent hash ring, mapping slots to the probers owning them."""
+
+    def __init__(self, probers: Iterable[str], virtual_nodes: int = 64):
+        points = sorted(
+            (_hash(f"{prober}#{i}"), prober)
+            for prober in set(probers)
+            for i in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._probers = [prober for _, prober in points]
+
+    def __bool__(self) -> bool:
+        return bool(self._probers)
+
+    def owner(self, slot: int) -> str | None:
+        """The prober owning the slot, or None if the ring is empty."""
+        if not self._probers:
+            return None
+        i = bisect.bisect(self._hashes, _hash(f"slot:{slot}")) % len(self._hashes)
+        return self._probers[i]
+
+    def slots_of(self, prober: str, slot_count: int) -> frozenset[int]:
+        """All the slots owned by a prober."""
+        return frozenset(
+            slot for slot in range(slot_count) if self.owner(slot) == prober
+        )
+
+
+class ProberShard:
+    """
+    The slots owned by this prober, rebalanced whenever the live probers change.
+
+    Until the first rebalance, the prober owns every slot, as it would alone.
+    """
+
+    def __init__(self, app: Flask | None = None):
+        self.prober_id = default_prober_id()
+        self.slot_count = 1024
+        self.virtual_nodes = 64
+        self.lease_ttl = 15.0
+
+        self.members: frozenset[str] = frozenset()
+        self.slots: frozenset[int] = frozenset(range(self.slot_count))
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Read the identity of the prober and the size of the ring from the configuration."""
+        self.prober_id = app.config["PROBER_ID"] or default_prober_id()
+        self.slot_count = app.config["PROBER_SHARD_SLOTS"]
+        self.virtual_nodes = app.config["PROBER_VIRTUAL_NODES"]
+        self.lease_ttl = app.config["PROBER_LEASE_TTL"]
+        self.members = frozenset()
+        self.slots = frozenset(range(self.slot_count))
+        metrics.gauge("prober_shard_slots", lambda: len(self.slots))
+        metrics.gauge("prober_shard_members", lambda: len(self.members))
+        app.extensions["prober_shard"] = self
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this prober runs the jobs that must run once for all probers."""
+        return not self.members or min(self.members) == self.prober_id
+
+    def rebalance(self, members: Iterable[str]) -> bool:
+        """
+        Recompute the owned slots for the given live probers, this one included.
+
+        Returns:
+            bool: Whether the live probers changed
+        """
+        members = frozenset(members) | {self.prober_id}
+        with self._lock:
+            if members == self.members:
+                return False
+
+            ring = HashRing(members, self.virtual_nodes)
+            self.slots = ring.slots_of(self.prober_id, self.slot_count)
+            self.members = members
+
+        metrics.counter("prober_shard_rebalances_total").inc()
+        logger.info(
+            f"Prober {self.prober_id} owns {len(self.slots)}/{self.slot_count} slots"
+            f" among {len(members)} prober(s)"
+        )
+        return True
@@ -0,0 +1,48 @@
+"""
+Canonical form of the URIs of the services monitored by Downtime Panda.
+
+Two URIs differing only in the case of their scheme or host, a default port, a
+trailing slash, the order of their query parameters or a fragment reach the same
+resource: they share a single canonical form, so that they are saved as a single
+service, and probed with a single request.
+
+exports:
+    - canonical_uri: The canonical form of a URI.
+"""
+
+__all__ = ["canonical_uri"]
+
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_uri(uri: str) -> str:
+    """
+    The canonical form of a URI, or the URI itself if it is not an absolute one.
+
+    The scheme and the host are lowercased, the default port of the scheme, the
+    trailing slash of the path and the fragment are dropped, and the query
+    parameters are sorted.
+    """
+    uri = uri.strip()
+    parts = urlsplit(uri)
+    try:
+        port = parts.port
+    except ValueError:
+        return uri
+    if not parts.scheme or not parts.hostname:
+        return uri
+
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    if ":" in host:
+        host = f"[{host}]"
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    userinfo, _, _ = parts.netloc.rpartition("@")
+    netloc = f"{userinfo}@{host}" if userinfo else host
+
+    path = parts.path.rstrip("/")
+    query = "&".join(sorted(param for param in parts.query.split("&") if param))
+    return urlunsplit((scheme, netloc, path, query, ""))
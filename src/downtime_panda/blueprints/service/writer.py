@@ -0,0 +1,291 @@
+"""
+Write-behind buffer for the probe results of Downtime Panda.
+
+Probe results are queued in memory and saved in batches by a background thread,
+so the probe engine never waits for a database commit per sample. Once a batch is
+saved, the latest ping cache is updated with it, it is published to the clients
+watching its services, and the adaptive schedule adjusts the intervals of its
+services.
+
+exports:
+    - PingWriter: The write-behind buffer.
+"""
+
+__all__ = ["PingWriter"]
+
+import atexit
+import dataclasses
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from loguru import logger
+from sqlalchemy import insert, text
+
+from downtime_panda.metrics import metrics
+
+if TYPE_CHECKING:
+    from downtime_panda.blueprints.service.adaptive import AdaptiveSchedule
+    from downtime_panda.blueprints.service.broadcaster import PingBroadcaster
+    from downtime_panda.blueprints.service.cache import LatestPingCache
+    from downtime_panda.blueprints.service.prober import ProbeResult
+
+COPY_PING_SQL = (
+    "COPY ping (id, service_id, http_response, response_time, pinged_at,"
+    " dns_time, connect_time, first_byte_time) FROM STDIN"
+)
+# COPY cannot return the generated IDs, so they are drawn from the sequence upfront
+NEXT_PING_IDS_SQL = text(
+    "SELECT nextval(pg_get_serial_sequence('ping', 'id'))"
+    " FROM generate_series(1, :count)"
+)
+
+
+class PingWriter:
+    """
+    Collects probe results and saves them as `Ping` rows in batches.
+
+    A batch is written every `PING_WRITER_BATCH_SIZE` rows, or after
+    `PING_WRITER_FLUSH_INTERVAL` milliseconds, whichever comes first. Batches are
+    written with `COPY` on PostgreSQL and with an `INSERT ... RETURNING` elsewhere.
+
+    The queue is bounded by `PING_WRITER_QUEUE_SIZE`: once full, `put` blocks until
+    the writer catches up, slowing the producers down instead of growing forever.
+    """
+
+    def __init__(
+        self,
+        app: Flask | None = None,
+        db: SQLAlchemy | None = None,
+        cache: "LatestPingCache | None" = None,
+        broadcaster: "PingBroadcaster | None" = None,
+        adaptive: "AdaptiveSchedule | None" = None,
+    ):
+        self.app: Flask | None = None
+        self.db: SQLAlchemy | None = None
+        self.cache: "LatestPingCache | None" = None
+        self.broadcaster: "PingBroadcaster | None" = None
+        self.adaptive: "AdaptiveSchedule | None" = None
+        self.batch_size = 500
+        self.flush_interval = 0.25
+
+        self._queue: queue.Queue["ProbeResult"] = queue.Queue()
+        # Serializes the flusher thread with the final flush on shutdown
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        if app is not None:
+            self.init_app(app, db, cache, broadcaster, adaptive)
+
+    def init_app(
+        self,
+        app: Flask,
+        db: SQLAlchemy,
+        cache: "LatestPingCache | None" = None,
+        broadcaster: "PingBroadcaster | None" = None,
+        adaptive: "AdaptiveSchedule | None" = None,
+    ) -> None:
+        """Bind the writer to the Flask application, its database, cache, broadcaster and adaptive schedule."""
+        self.app = app
+        self.db = db
+        self.cache = cache
+        self.broadcaster = broadcaster
+        self.adaptive = adaptive
+        self.batch_size = app.config["PING_WRITER_BATCH_SIZE"]
+        self.flush_interval = app.config["PING_WRITER_FLUSH_INTERVAL"] / 1000
+        self._queue = queue.Queue(maxsize=app.config["PING_WRITER_QUEUE_SIZE"])
+        app.extensions["ping_writer"] = self
+
+    # --------------------------------- LIFECYCLE -------------------------------- #
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background flusher thread, if not already running."""
+        with self._start_lock:
+            if self.running:
+                return
+
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="ping-writer", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def shutdown(self) -> None:
+        """Stop the flusher thread, writing whatever is still queued."""
+        with self._start_lock:
+            if not self.running:
+                return
+
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.shutdown)
+
+        self.flush()
+
+    # ---------------------------------- QUEUE ----------------------------------- #
+    @property
+    def pending(self) -> int:
+        """Number of results waiting to be written."""
+        return self._queue.qsize()
+
+    def put(self, result: "ProbeResult", timeout: float | None = None) -> None:
+        """
+        Queue a result to be written, waiting for room if the queue is full.
+
+        Raises:
+            queue.Full: If there is still no room after `timeout` seconds
+        """
+        self.start()
+        self._queue.put(result, timeout=timeout)
+
+    def put_nowait(self, result: "ProbeResult") -> None:
+        """
+        Queue a result to be written, without waiting.
+
+        Raises:
+            queue.Full: If the queue is full
+        """
+        self.start()
+        self._queue.put_nowait(result)
+
+    def flush(self) -> None:
+        """Write everything queued so far, returning once it is saved."""
+        if self.running:
+            self._queue.join()
+            return
+
+        while batch := self._drain(self.batch_size):
+            self._write(batch)
+
+    def _drain(self, limit: int) -> list["ProbeResult"]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    # ---------------------------------- STORAGE --------------------------------- #
+    def _write(self, batch: list["ProbeResult"]) -> None:
+        with self._write_lock, self.app.app_context():
+            saved = []
+            try:
+                saved = self._save(batch)
+                if self.cache is not None:
+                    self.cache.update(saved)
+                if self.broadcaster is not None:
+                    self.broadcaster.publish(saved)
+                if self.adaptive is not None:
+                    self.adaptive.update(saved)
+            except Exception:
+                # The pings are saved already, only their side effects are missing
+                logger.exception(f"Could not hand over a batch of {len(saved)} ping(s)")
+                self.db.session.rollback()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _save(self, batch: list["ProbeResult"]) -> list["ProbeResult"]:
+        """
+        Save a batch, falling back to one row at a time if the batch fails.
+
+        A single bad result (e.g. of a service deleted meanwhile) would otherwise
+        take the whole batch down with it: only the rows still failing on their own
+        are dropped, and counted in `ping_writer_dropped_total`.
+        """
+        try:
+            if self.db.engine.dialect.name == "postgresql":
+                return self._copy(batch)
+            return self._insert(batch)
+        except Exception:
+            logger.exception(
+                f"Could not write a batch of {len(batch)} ping(s), retrying one by one"
+            )
+            self.db.session.rollback()
+
+        saved = []
+        for result in batch:
+            try:
+                saved += self._insert([result])
+            except Exception:
+                logger.exception(f"Dropping the ping of service {result.service_id}")
+                self.db.session.rollback()
+                metrics.counter("ping_writer_dropped_total").inc()
+        return saved
+
+    def _insert(self, batch: list["ProbeResult"]) -> list["ProbeResult"]:
+        table = self.db.metadata.tables["ping"]
+        # The IDs come back in the order of the batch. Dialects that cannot tell
+        # the order of the RETURNING rows, such as SQLite, insert one row per
+        # statement, still within a single transaction
+        ids = self.db.session.scalars(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [
+                {
+                    "service_id": result.service_id,
+                    "http_response": result.http_status,
+                    "response_time": result.response_time,
+                    "pinged_at": result.pinged_at,
+                    "dns_time": result.dns_time,
+                    "connect_time": result.connect_time,
+                    "first_byte_time": result.first_byte_time,
+                }
+                for result in batch
+            ],
+        ).all()
+        self.db.session.commit()
+        return _with_ids(batch, ids)
+
+    def _copy(self, batch: list["ProbeResult"]) -> list["ProbeResult"]:
+        ids = self.db.session.scalars(NEXT_PING_IDS_SQL, {"count": len(batch)}).all()
+        connection = self.db.session.connection().connection.driver_connection
+        with connection.cursor() as cursor, cursor.copy(COPY_PING_SQL) as copy:
+            for id, result in zip(ids, batch):
+                copy.write_row(
+                    (
+                        id,
+                        result.service_id,
+                        result.http_status,
+                        result.response_time,
+                        result.pinged_at,
+                        result.dns_time,
+                        result.connect_time,
+                        result.first_byte_time,
+                    )
+                )
+        self.db.session.commit()
+        return _with_ids(batch, ids)
+
+
+def _with_ids(batch: list["ProbeResult"], ids: list[int]) -> list["ProbeResult"]:
+    return [dataclasses.replace(result, ping_id=id) for id, result in zip(ids, batch)]
@@ -1,7 +1,21 @@
+import uuid
+from datetime import datetime
 from http import HTTPStatus
 
-from flask import Blueprint, abort, request
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    request,
+    stream_with_context,
+)
 
+from downtime_panda.blueprints.subscription.export import (
+    EXPORT_FORMATS,
+    export_chunks,
+    gzip_chunks,
+)
 from downtime_panda.blueprints.subscription.models import Subscription
 from downtime_panda.blueprints.user.models import User
 from downtime_panda.extensions import token_auth
@@ -44,3 +58,112 @@ def get_status():
         abort(HTTPStatus.NOT_FOUND, description="No pings found for the service.")
 
     return latest_ping.to_dict()
+
+
+@subscription_api_blueprint.route("/statuses", methods=["GET", "POST"])
+@token_auth.login_required
+def get_statuses():
+    """
+    Endpoint to check the status of many subscriptions at once.
+
+    The subscriptions are picked by repeating the `subscription_uuid` query arg, or
+    by a JSON body `{"subscription_uuids": [...]}`. Without either, every
+    subscription of the user is checked. Subscriptions and latest pings are fetched
+    in a single query, however many they are.
+
+    Returns:
+        dict: The latest ping of each subscription by UUID (None if the service was
+            never pinged), and the requested UUIDs not matching any subscription.
+    """
+    user: User | None = token_auth.current_user()
+    if not user:
+        abort(HTTPStatus.UNAUTHORIZED)
+
+    requested = request.args.getlist("subscription_uuid")
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(
+            body.get("subscription_uuids", []), list
+        ):
+            abort(HTTPStatus.BAD_REQUEST, description="Invalid request body.")
+        requested += body.get("subscription_uuids", [])
+    if len(requested) > current_app.config["STATUS_BATCH_MAX_SIZE"]:
+        abort(HTTPStatus.BAD_REQUEST, description="Too many subscriptions.")
+
+    try:
+        uuids = {uuid.UUID(str(subscription_uuid)) for subscription_uuid in requested}
+    except ValueError:
+        abort(HTTPStatus.BAD_REQUEST, description="Invalid subscription UUID.")
+
+    subscriptions = Subscription.get_subscriptions_with_latest_ping(
+        user, uuids if requested else None
+    )
+    statuses = {
+        str(subscription.uuid): None
+        if latest_ping is None
+        else {
+            "http_response": latest_ping.http_response,
+            "response_time": latest_ping.response_time.total_seconds(),
+            "pinged_at": latest_ping.pinged_at.isoformat(),
+        }
+        for subscription, latest_ping in subscriptions
+    }
+    not_found = sorted(
+        str(subscription_uuid)
+        for subscription_uuid in uuids
+        if str(subscription_uuid) not in statuses
+    )
+    return {"statuses": statuses, "not_found": not_found}
+
+
+@subscription_api_blueprint.get("/<uuid>/pings/export")
+@token_auth.login_required
+def export_pings(uuid: str):
+    """
+    Endpoint to export the ping history of a subscription, streamed row by row.
+
+    Query args:
+        format: `ndjson` (default) or `csv`
+        since: ISO 8601 timestamp of the first ping to export, inclusive
+        until: ISO 8601 timestamp of the last ping to export, exclusive
+
+    The export is gzipped when the client accepts the `gzip` encoding.
+    """
+    user: User | None = token_auth.current_user()
+    if not user:
+        abort(HTTPStatus.UNAUTHORIZED)
+
+    format = request.args.get("format", "ndjson")
+    if format not in EXPORT_FORMATS:
+        abort(HTTPStatus.BAD_REQUEST, description="Unknown export format.")
+
+    since = request.args.get("since")
+    until = request.args.get("until")
+    try:
+        since = datetime.fromisoformat(since) if since else None
+        until = datetime.fromisoformat(until) if until else None
+    except ValueError:
+        abort(HTTPStatus.BAD_REQUEST, description="Invalid time range.")
+
+    subscription = Subscription.get_user_subscription_by_uuid(user, uuid)
+    if not subscription:
+        abort(HTTPStatus.NOT_FOUND, description="Subscription not found.")
+
+    batches = subscription.service.iter_ping_batches(
+        since, until, current_app.config["PING_EXPORT_BATCH_SIZE"]
+    )
+    chunks = export_chunks(batches, format)
+
+    compress = "gzip" in request.accept_encodings
+    if compress:
+        chunks = gzip_chunks(chunks)
+
+    # The session, and its cursor, must outlive the view until the last chunk
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[format])
+    if compress:
+        response.content_encoding = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="{subscription.uuid}.{format}"'
+    )
+    return response
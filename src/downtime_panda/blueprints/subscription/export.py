@@ -0,0 +1,69 @@
+"""
+Streaming export of the ping history of a service.
+
+Pings are read in batches through a server-side cursor and encoded one batch at a
+time, so exporting years of pings takes as much memory as exporting a minute of
+them. Every row has the ping timestamp (ISO 8601, UTC), the HTTP status code and
+the response time in seconds (-1 when the service was not reached).
+
+exports:
+    - EXPORT_FORMATS: Mimetype of each export format.
+    - export_chunks: Encodes batches of pings as NDJSON or CSV chunks.
+    - gzip_chunks: Compresses a stream of chunks on the fly.
+"""
+
+__all__ = ["EXPORT_FORMATS", "export_chunks", "gzip_chunks"]
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Sequence
+
+from sqlalchemy import Row
+
+from downtime_panda.blueprints.service.models import as_utc
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_HEADER = ("pinged_at", "http_response", "response_time")
+
+
+def export_chunks(batches: Iterable[Sequence[Row]], format: str) -> Iterator[bytes]:
+    """Encode every batch of pings as a single chunk of the export."""
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(CSV_HEADER)
+        for batch in batches:
+            writer.writerows(_fields(row) for row in batch)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # Header of an empty export
+            yield buffer.getvalue().encode()
+        return
+
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(CSV_HEADER, _fields(row)))) + "\n" for row in batch
+        ).encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress the chunks as a single gzip stream, without buffering it."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _fields(row: Row) -> tuple[str, int, float]:
+    pinged_at, http_response, response_time = row
+    return as_utc(pinged_at).isoformat(), http_response, response_time.total_seconds()
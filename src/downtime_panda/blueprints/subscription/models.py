@@ -1,8 +1,8 @@
 import uuid
-from typing import Self
+from typing import Collection, Self
 
-from sqlalchemy import DateTime, ForeignKey, String, Uuid, func, select
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, ForeignKey, String, Uuid, and_, func, select, true
+from sqlalchemy.orm import Mapped, aliased, contains_eager, mapped_column
 
 from downtime_panda.extensions import db
 
@@ -64,6 +64,64 @@ class Subscription(db.Model):
         subscriptions = db.session.execute(query).scalars().all()
         return subscriptions
 
+    @classmethod
+    def get_subscriptions_with_latest_ping(
+        cls, user: "User", uuids: Collection["uuid.UUID"] | None = None
+    ) -> list[tuple[Self, "Ping | None"]]:
+        """
+        Get all subscriptions for a user, each with its service and latest ping, in a single query.
+
+        On PostgreSQL the latest ping of each service is picked through a lateral join,
+        elsewhere through a window function ranking the pings of each service.
+
+        Args:
+            user (User): The user owning the subscriptions
+            uuids (Collection[UUID] | None): Only get the subscriptions with these
+                UUIDs, all of them if None
+
+        Returns:
+            list[tuple[Subscription, Ping | None]]: The subscriptions, oldest first,
+                with `service` already loaded, next to the latest ping of their service
+        """
+        if db.engine.dialect.name == "postgresql":
+            latest_ping_query = (
+                select(Ping)
+                .where(Ping.service_id == Service.id)
+                .order_by(Ping.pinged_at.desc())
+                .limit(1)
+                .lateral()
+            )
+            latest_ping = aliased(Ping, latest_ping_query)
+            on_clause = true()
+        else:
+            rank = (
+                func.row_number()
+                .over(partition_by=Ping.service_id, order_by=Ping.pinged_at.desc())
+                .label("rank")
+            )
+            user_services = select(cls.service_id).filter_by(user_id=user.id)
+            if uuids is not None:
+                user_services = user_services.where(cls.uuid.in_(uuids))
+            latest_ping_query = (
+                select(Ping, rank).where(Ping.service_id.in_(user_services)).subquery()
+            )
+            latest_ping = aliased(Ping, latest_ping_query)
+            on_clause = and_(
+                latest_ping.service_id == Service.id, latest_ping_query.c.rank == 1
+            )
+
+        query = (
+            select(cls, latest_ping)
+            .join(cls.service)
+            .outerjoin(latest_ping, on_clause)
+            .where(cls.user_id == user.id)
+            .options(contains_eager(cls.service))
+            .order_by(cls.created_at)
+        )
+        if uuids is not None:
+            query = query.where(cls.uuid.in_(uuids))
+        return [tuple(row) for row in db.session.execute(query).all()]
+
     @classmethod
     def get_user_subscription_by_uuid(cls, user: "User", sub_uuid: str) -> Self | None:
         sub_uuid = uuid.UUID(sub_uuid)
@@ -76,5 +134,5 @@ class Subscription(db.Model):
         return latest_ping.http_response if latest_ping else None
 
 
-from downtime_panda.blueprints.service.models import Service  # noqa: E402
+from downtime_panda.blueprints.service.models import Ping, Service  # noqa: E402
 from downtime_panda.blueprints.user.models import User  # noqa: E402
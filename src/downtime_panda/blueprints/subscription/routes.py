@@ -1,6 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from http import HTTPStatus
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+import pytz
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    flash,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from flask_login import current_user, login_required
 
 from downtime_panda.blueprints.service.models import Service
@@ -9,11 +21,27 @@ from downtime_panda.blueprints.subscription.messages import (
     SUBSCRIPTION_REGISTRATION_SUCCESSFUL,
 )
 from downtime_panda.blueprints.subscription.models import Subscription
+from downtime_panda.blueprints.subscription.series import PingSeries, series_response
 
 subscription_blueprint = Blueprint(
     "subscription", __name__, template_folder="templates", static_folder="static"
 )
 
+CHART_RANGES = {
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "1y": timedelta(days=365),
+}
+"""Time ranges selectable on the status chart."""
+
+CHART_RANGE_MAX_POINTS = 500
+"""Point budget of the status chart when showing a time range."""
+
+LIVE_MAX_POINTS = 20
+"""Points shown by the live status chart."""
+
 
 @subscription_blueprint.route("/subscribe", methods=["GET", "POST"])
 @login_required
@@ -49,7 +77,7 @@ def service_subscribe():
 @login_required
 def list_subscriptions():
     """List all subscriptions for the current user."""
-    subscriptions = Subscription.get_subscriptions_by_user(current_user)
+    subscriptions = Subscription.get_subscriptions_with_latest_ping(current_user)
     return render_template(
         "blueprints/subscription/list.html.jinja",
         subscriptions=subscriptions,
@@ -60,21 +88,31 @@ def list_subscriptions():
 @login_required
 def view_subscription(uuid: str):
     """View the status of a subscribed service"""
-    MAX_POINTS = 20
     subscription = Subscription.get_user_subscription_by_uuid(current_user, uuid)
-    pings = subscription.service.get_latest_n_pings(MAX_POINTS)
-    pings = list(reversed(pings))
-    pings = {
-        "x": [ping.pinged_at for ping in pings],
-        "y": [ping.response_time.total_seconds() for ping in pings],
-        "status": [ping.http_response for ping in pings],
-        "type": "scatter",
-    }
+
+    cursor = 0
+    chart_range = request.args.get("range")
+    if chart_range is None:
+        pings = subscription.service.get_latest_n_pings(LIVE_MAX_POINTS)
+        cursor = max((ping.id for ping in pings), default=0)
+        series = PingSeries.from_points(reversed(pings))
+    elif chart_range in CHART_RANGES:
+        until = datetime.now(pytz.utc)
+        _, points = subscription.service.get_series(
+            until - CHART_RANGES[chart_range], until, CHART_RANGE_MAX_POINTS
+        )
+        series = PingSeries.from_points(points)
+    else:
+        abort(HTTPStatus.BAD_REQUEST, description="Unknown chart range.")
+
     return render_template(
         "blueprints/subscription/status.html.jinja",
         subscription=subscription,
-        pings=pings,
-        max_points=MAX_POINTS,
+        pings=series.to_json(),
+        cursor=cursor,
+        max_points=LIVE_MAX_POINTS,
+        chart_range=chart_range,
+        chart_ranges=CHART_RANGES.keys(),
     )
 
 
@@ -86,11 +124,51 @@ def get_subscription_pings_since(uuid: str):
 
     since_date = datetime.fromisoformat(request.args["since"])
     pings = subscription.service.get_pings_since(since_date)
-    pings = list(reversed(pings))
-    pings = {
-        "x": [ping.pinged_at for ping in pings],
-        "y": [ping.response_time.total_seconds() for ping in pings],
-        "status": [ping.http_response for ping in pings],
-        "type": "scatter",
-    }
-    return pings
+    return series_response(PingSeries.from_points(reversed(pings)))
+
+
+@subscription_blueprint.route("/<uuid>/pings/delta", methods=["GET"])
+@login_required
+def get_subscription_pings_delta(uuid: str):
+    """
+    Get the pings saved after a cursor, for the live status chart.
+
+    Query args:
+        cursor: Highest ping ID the client has, omit it to start
+        wait: Seconds to wait for a new ping before answering (long polling),
+            capped by `PING_DELTA_MAX_WAIT`. Only honoured when served by the
+            ASGI entry point (see `asgi.py`), this view always answers right away
+
+    The `ETag` is the highest ping ID of the service. When the client is already
+    up to date, or its `If-None-Match` still matches, the answer is an empty
+    `304 Not Modified`, checked with a single lookup of the `(service_id, id)`
+    index. Otherwise, the pings probed within `PING_DELTA_RESCAN` seconds before
+    the cursor are sent again along with the new ones, so that a ping committed
+    late, below the cursor, still reaches the chart.
+
+    The pings are a compact series (see `series.py`), as JSON or, when the client
+    accepts `application/octet-stream`, as binary typed arrays.
+    """
+    subscription = Subscription.get_user_subscription_by_uuid(current_user, uuid)
+    if subscription is None:
+        abort(HTTPStatus.NOT_FOUND, description="Subscription not found.")
+
+    service = subscription.service
+    cursor = request.args.get("cursor", 0, type=int)
+
+    # `wait` is left to the ASGI entry point, blocking here would hold a WSGI thread
+    max_id = service.get_max_ping_id()
+    etag = str(max_id)
+    if max_id <= cursor or request.if_none_match.contains(etag):
+        response = make_response("", HTTPStatus.NOT_MODIFIED)
+    else:
+        rescan = timedelta(seconds=current_app.config["PING_DELTA_RESCAN"])
+        pings = service.get_pings_after_id(cursor, LIVE_MAX_POINTS, rescan)
+        response = series_response(
+            PingSeries.from_points(sorted(pings, key=lambda ping: ping.pinged_at)),
+            cursor=max([cursor, *(ping.id for ping in pings)]),
+        )
+
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
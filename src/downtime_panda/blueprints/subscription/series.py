@@ -0,0 +1,133 @@
+"""
+Compact, columnar encoding of the ping series drawn by the status chart.
+
+A series is three columns of the same length: the ping timestamps, as epoch
+milliseconds delta-encoded against the first one, the response times in seconds
+with float32 precision (-1 when the service was not reached), and the HTTP status
+codes. Two encodings are served, negotiated through the `Accept` header:
+
+    - JSON (`application/json`, the default): packed arrays,
+      `{"t0": 1749463200000, "dt": [0, 5000], "rt": [1.0, 0.25], "status": [200, 200]}`
+    - Binary (`application/octet-stream`): little-endian typed arrays, read by the
+      chart without any parsing. A 24 bytes header (`uint32` count, `uint32`
+      format version, `float64` t0, `float64` cursor) is followed by `int64` dt,
+      `float32` rt and `uint16` status. Every column starts on a multiple of its
+      item size, so it maps straight onto a JavaScript typed array. The deltas are
+      64 bits wide since a long chart range may leave weeks between two points,
+      past the 24.8 days an `int32` of milliseconds holds.
+
+exports:
+    - PingSeries: A series of pings or rollups, in columns.
+    - series_response: Answers with a series, in the encoding asked by the client.
+"""
+
+__all__ = ["PingSeries", "series_response"]
+
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterable
+
+from flask import Response, jsonify, request
+
+from downtime_panda.blueprints.service.models import Ping, PingRollup, as_utc
+
+JSON_MIMETYPE = "application/json"
+BINARY_MIMETYPE = "application/octet-stream"
+
+BINARY_VERSION = 2
+BINARY_HEADER = struct.Struct("<IIdd")
+
+
+@dataclass
+class PingSeries:
+    """The columns of a series, oldest point first."""
+
+    timestamps: list[int] = field(default_factory=list)
+    """Epoch milliseconds of each point."""
+    response_times: list[float] = field(default_factory=list)
+    """Response time of each point in seconds, -1 if the service was not reached."""
+    statuses: list[int] = field(default_factory=list)
+    """HTTP status code of each point."""
+
+    @classmethod
+    def from_points(cls, points: Iterable[Ping | PingRollup]) -> "PingSeries":
+        """Build a series from raw pings or rollups, sorted by time."""
+        series = cls()
+        for point in points:
+            if isinstance(point, PingRollup):
+                series.timestamps.append(_epoch_ms(point.bucket_start))
+                # Buckets where the service was never reached have no response time
+                series.response_times.append(
+                    -1 if point.response_time_avg is None else point.response_time_avg
+                )
+                series.statuses.append(point.dominant_status)
+            else:
+                series.timestamps.append(_epoch_ms(point.pinged_at))
+                series.response_times.append(point.response_time.total_seconds())
+                series.statuses.append(point.http_response)
+        return series
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def time_deltas(self) -> list[int]:
+        """Milliseconds elapsed since the previous point, 0 for the first one."""
+        return [
+            current - previous
+            for previous, current in zip(
+                self.timestamps[:1] + self.timestamps, self.timestamps
+            )
+        ]
+
+    def to_json(self) -> dict[str, Any]:
+        """The series as packed JSON arrays."""
+        return {
+            "t0": self.timestamps[0] if self.timestamps else 0,
+            "dt": self.time_deltas(),
+            # Seven significant digits is all a float32 holds
+            "rt": [float(f"{rt:.7g}") for rt in self.response_times],
+            "status": self.statuses,
+        }
+
+    def to_binary(self, cursor: int = 0) -> bytes:
+        """The series as little-endian typed arrays, after the binary header."""
+        columns = (
+            array("q", self.time_deltas()),
+            array("f", self.response_times),
+            array("H", self.statuses),
+        )
+        if sys.byteorder == "big":
+            for column in columns:
+                column.byteswap()
+
+        t0 = self.timestamps[0] if self.timestamps else 0
+        header = BINARY_HEADER.pack(len(self), BINARY_VERSION, t0, cursor)
+        return header + b"".join(column.tobytes() for column in columns)
+
+
+def series_response(series: PingSeries, cursor: int | None = None) -> Response:
+    """
+    Answer with a series, as JSON unless the client prefers the binary encoding.
+
+    The cursor of the delta endpoint travels along with the series: as a `cursor`
+    key in JSON, in the header of the binary encoding.
+    """
+    mimetype = request.accept_mimetypes.best_match(
+        [JSON_MIMETYPE, BINARY_MIMETYPE], default=JSON_MIMETYPE
+    )
+    if mimetype == BINARY_MIMETYPE:
+        response = Response(series.to_binary(cursor or 0), mimetype=BINARY_MIMETYPE)
+    elif cursor is None:
+        response = jsonify(series.to_json())
+    else:
+        response = jsonify({"cursor": cursor, **series.to_json()})
+
+    response.vary.add("Accept")
+    return response
+
+
+def _epoch_ms(timestamp: datetime) -> int:
+    return round(as_utc(timestamp).timestamp() * 1000)
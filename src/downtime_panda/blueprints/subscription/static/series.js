@@ -0,0 +1,52 @@
+// Decoders of the compact ping series, see blueprints/subscription/series.py
+
+const SERIES_HEADER_SIZE = 24;
+
+// Packed JSON arrays: {t0, dt, rt, status}
+function decodeSeries(packed) {
+    const x = new Array(packed.dt.length);
+    let t = packed.t0;
+    for (let i = 0; i < packed.dt.length; i++) {
+        t += packed.dt[i];
+        x[i] = new Date(t);
+    }
+    return {x: x, y: packed.rt, status: packed.status, cursor: packed.cursor};
+}
+
+// Little-endian typed arrays, mapped without copying
+function decodeBinarySeries(buffer) {
+    const header = new DataView(buffer, 0, SERIES_HEADER_SIZE);
+    const count = header.getUint32(0, true);
+    const t0 = header.getFloat64(8, true);
+    const cursor = header.getFloat64(16, true);
+
+    const dt = new BigInt64Array(buffer, SERIES_HEADER_SIZE, count);
+    const rt = new Float32Array(buffer, SERIES_HEADER_SIZE + 8 * count, count);
+    const status = new Uint16Array(buffer, SERIES_HEADER_SIZE + 12 * count, count);
+
+    const x = new Array(count);
+    let t = t0;
+    for (let i = 0; i < count; i++) {
+        t += Number(dt[i]);
+        x[i] = new Date(t);
+    }
+    return {x: x, y: Array.from(rt), status: Array.from(status), cursor: cursor};
+}
+
+// Merges the points of a delta into a series, by timestamp, keeping the newest
+// `maxPoints`: the delta sends the latest pings again, and a ping saved late may
+// come after newer ones
+function mergeSeries(series, delta, maxPoints) {
+    const points = new Map();
+    for (const part of [series, delta]) {
+        for (let i = 0; i < part.x.length; i++) {
+            points.set(part.x[i].getTime(), [part.x[i], part.y[i], part.status[i]]);
+        }
+    }
+    const merged = [...points.values()].sort((a, b) => a[0] - b[0]).slice(-maxPoints);
+    return {
+        x: merged.map(point => point[0]),
+        y: merged.map(point => point[1]),
+        status: merged.map(point => point[2]),
+    };
+}
@@ -1,4 +1,6 @@
-SUCCESS_TOKEN_CREATED = "New API token created successfully."
+SUCCESS_TOKEN_CREATED = (
+    "New API token created successfully. Copy it now, it will not be shown again:"
+)
 SUCCESS_TOKEN_REVOKED = "API token revoked successfully."
 
 ERROR_TOKEN_DOESNT_EXIST = ""
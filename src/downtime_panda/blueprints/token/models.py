@@ -1,10 +1,15 @@
+import hashlib
+import hmac
 import secrets
 from typing import Self
 
+from flask import current_app
 from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, func, select
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from downtime_panda.extensions import db
+from downtime_panda.extensions import db, token_cache
+
+TOKEN_PREFIX_LENGTH = 6
 
 
 class APIToken(db.Model):
@@ -21,11 +26,15 @@ class APIToken(db.Model):
         ForeignKey("user.id"),
         nullable=False,
     )
-    token: Mapped[str] = mapped_column(
-        String(32),
+    token_hash: Mapped[str] = mapped_column(
+        String(64),
         unique=True,
         nullable=False,
     )
+    token_prefix: Mapped[str] = mapped_column(
+        String(TOKEN_PREFIX_LENGTH),
+        nullable=False,
+    )
     created_at: Mapped[DateTime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
@@ -41,11 +50,25 @@ class APIToken(db.Model):
     # ----------------------------- STANDARD METHODS ----------------------------- #
     def __init__(self, user_id: int, token: str):
         self.user_id = user_id
+        self.token_hash = self.hash(token)
+        self.token_prefix = token[:TOKEN_PREFIX_LENGTH]
+        # Only known right after creation, the token itself is never saved
         self.token = token
 
     def __repr__(self) -> str:
         return f"<APIToken {self.id} for User {self.user_id}>"
 
+    @staticmethod
+    def hash(token: str) -> str:
+        """
+        Hash a token with the key in `API_TOKEN_HASH_KEY`.
+
+        The hash is keyed (HMAC-SHA256), so a leaked table alone is of no use, and
+        fast, so looking a token up costs a single probe of the unique index.
+        """
+        key = current_app.config["API_TOKEN_HASH_KEY"].encode()
+        return hmac.new(key, token.encode(), hashlib.sha256).hexdigest()
+
     # ------------------------------- CONSTRUCTORS ------------------------------- #
     @classmethod
     def create_for_user(cls, user: "User") -> Self:
@@ -59,6 +82,22 @@ class APIToken(db.Model):
 
         return token
 
+    @classmethod
+    def find_user_id(cls, token: str) -> int | None:
+        """
+        Find the ID of the user owning a token.
+
+        Recently used tokens are answered by the token cache, without any query.
+        """
+        token_hash = cls.hash(token)
+        user_id = token_cache.get(token_hash)
+        if user_id is None:
+            query = select(APIToken.user_id).filter_by(token_hash=token_hash)
+            user_id = db.session.execute(query).scalar_one_or_none()
+            if user_id is not None:
+                token_cache.set(token_hash, user_id)
+        return user_id
+
     @classmethod
     def find_by_id(cls, token_id: int, user: "User") -> Self | None:
         """Finds a token by ID.
@@ -79,8 +118,10 @@ class APIToken(db.Model):
         Revoke this API token.
         """
 
+        token_hash = self.token_hash
         db.session.delete(self)
         db.session.commit()
+        token_cache.invalidate(token_hash)
 
     def exists(self) -> bool:
         query = select(APIToken).filter_by(id=self.id)
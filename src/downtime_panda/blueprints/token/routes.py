@@ -1,7 +1,7 @@
 from http import HTTPStatus
 
 import flask_login
-from flask import Blueprint, flash, redirect, render_template, url_for
+from flask import Blueprint, flash, make_response, redirect, render_template, url_for
 
 from downtime_panda.blueprints.token.messages import (
     ERROR_TOKEN_DOESNT_EXIST,
@@ -24,11 +24,24 @@ def list_tokens():
 @token_blueprint.post("/generate")
 @flask_login.login_required
 def generate_token():
-    """Create a new API token for the user."""
-
-    APIToken.create_for_user(flask_login.current_user)
-    flash(SUCCESS_TOKEN_CREATED, "success")
-    return redirect(url_for(".list_tokens"))
+    """
+    Create a new API token for the user.
+
+    The plaintext token is only rendered in this response: flashing it would store
+    it in the session cookie, which is signed but not encrypted.
+    """
+
+    token = APIToken.create_for_user(flask_login.current_user)
+    response = make_response(
+        render_template(
+            "blueprints/token/list.html.jinja",
+            new_token=token.token,
+            new_token_message=SUCCESS_TOKEN_CREATED,
+        ),
+        HTTPStatus.CREATED,
+    )
+    response.cache_control.no_store = True
+    return response
 
 
 @token_blueprint.post("/revoke/<int:token_id>")
@@ -17,3 +17,6 @@ ERROR_USERNAME_REQUIRED = "Username is required"
 ERROR_USERNAME_TAKEN = "Username already exists"
 
 ERROR_INVALID_CREDENTIALS = "Invalid email or password"
+ERROR_SERVER_BUSY = (
+    "Too many people are logging in right now, please retry in a few seconds"
+)
@@ -2,7 +2,6 @@ import secrets
 from typing import Self
 
 import flask_login
-from argon2 import PasswordHasher
 from sqlalchemy import (
     BigInteger,
     Integer,
@@ -11,7 +10,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from downtime_panda.extensions import db
+from downtime_panda.extensions import db, password_hasher
 
 
 class User(db.Model, flask_login.UserMixin):
@@ -57,12 +56,12 @@ class User(db.Model, flask_login.UserMixin):
 
         Raises:
             ValueError: If the username or email already exists in the database
+            PasswordHashingBusy: If too many passwords are being hashed
 
         Returns:
             Self: The created user instance
         """
-        ph = PasswordHasher()
-        password_hash = ph.hash(password)
+        password_hash = password_hasher.hash(password)
 
         user = cls(username=username, email=email, password_hash=password_hash)
         db.session.add(user)
@@ -101,20 +100,22 @@ class User(db.Model, flask_login.UserMixin):
         return db.session.query(cls).filter_by(email=email).first()
 
     def verify_password(self, password: str) -> bool:
-        """Verify the provided password against the stored hash, and rehash if necessary."""
-        ph = PasswordHasher()
-        try:
-            ph.verify(self.password_hash, password)
-
-            if ph.check_needs_rehash(self.password_hash):
-                # Rehash the password if needed
-                self.password_hash = ph.hash(password)
-                db.session.commit()
-
-            return True
-        except Exception:
+        """
+        Verify the provided password against the stored hash, and rehash if necessary.
+
+        Raises:
+            PasswordHashingBusy: If too many passwords are being hashed
+        """
+        if not password_hasher.verify(self.password_hash, password):
             return False
 
+        if password_hasher.needs_rehash(self.password_hash):
+            # Rehash the password if needed
+            self.password_hash = password_hasher.hash(password)
+            db.session.commit()
+
+        return True
+
     def subscribe_to_service(self, service: "Service") -> None:
         """Subscribe the user to a service."""
         if service not in self.services:
@@ -129,26 +130,24 @@ class User(db.Model, flask_login.UserMixin):
 
     def revoke_token(self, token_id: int) -> None:
         """Revoke an API token for the user."""
-        token_to_remove = db.session.execute(
-            select(APIToken).filter_by(id=token_id, user_id=self.id)
-        ).scalar_one_or_none()
+        token_to_remove = APIToken.find_by_id(token_id=token_id, user=self)
 
         if not token_to_remove:
             raise ValueError(
                 f"Token with ID {token_id} does not exist or does not belong to the user."
             )
 
-        db.session.delete(token_to_remove)
-        db.session.commit()
+        # Also drops the token from the cache of the authenticated tokens
+        token_to_remove.revoke()
 
     @classmethod
     def get_by_token(cls, token: str) -> Self | None:
         """Validate an API token and return the associated user if valid."""
 
-        api_token = db.session.query(APIToken).filter_by(token=token).first()
-        if api_token:
-            return api_token.user
-        return None
+        user_id = APIToken.find_user_id(token)
+        if user_id is None:
+            return None
+        return db.session.get(cls, user_id)
 
 
 from downtime_panda.blueprints.service.models import Service  # noqa: E402
@@ -5,6 +5,8 @@ This module handles user registration, login, logout, profile management,
 and API token management.
 """
 
+from http import HTTPStatus
+
 import flask_login
 from flask import Blueprint, flash, redirect, render_template, url_for
 
@@ -14,11 +16,13 @@ from downtime_panda.blueprints.user.forms import (
 )
 from downtime_panda.blueprints.user.messages import (
     ERROR_INVALID_CREDENTIALS,
+    ERROR_SERVER_BUSY,
     SUCCESS_LOGIN,
     SUCCESS_LOGOUT,
     SUCCESS_REGISTRATION,
 )
 from downtime_panda.extensions import login_manager
+from downtime_panda.passwords import PasswordHashingBusy
 
 from .models import User
 
@@ -53,6 +57,9 @@ def register():
         return render_template(
             "blueprints/user/register.html.jinja", form=form, error=str(e)
         )
+    except PasswordHashingBusy:
+        flash(ERROR_SERVER_BUSY, "danger")
+        return _busy(render_template("blueprints/user/register.html.jinja", form=form))
 
     user = User.get_by_email(form.email.data)
     flask_login.login_user(user)
@@ -69,7 +76,13 @@ def login():
         return render_template("blueprints/user/login.html.jinja", form=form)
 
     user = User.get_by_email(form.email.data)
-    if user and user.verify_password(form.password.data):
+    try:
+        is_valid = user is not None and user.verify_password(form.password.data)
+    except PasswordHashingBusy:
+        flash(ERROR_SERVER_BUSY, "danger")
+        return _busy(render_template("blueprints/user/login.html.jinja", form=form))
+
+    if is_valid:
         flask_login.login_user(user, remember=form.remember_me.data)
         flash(SUCCESS_LOGIN, "success")
         return redirect(url_for("home.index"))
@@ -87,6 +100,11 @@ def logout():
     return redirect(url_for("home.index"))
 
 
+def _busy(page: str):
+    """Answer with the page, telling the client to retry once hashing calms down."""
+    return page, HTTPStatus.SERVICE_UNAVAILABLE, {"Retry-After": "5"}
+
+
 # ---------------------------------------------------------------------------- #
 #                                    PROFILE                                   #
 # ---------------------------------------------------------------------------- #
@@ -0,0 +1,130 @@
+"""
+Command line interface of Downtime Panda, added to the `flask` command.
+
+Creating the application neither touches the database nor starts any background
+thread, so that web workers boot fast, and never probe anything. The schema and
+the probes are managed by explicit commands instead:
+
+    flask schema init       # before the first start, and after every upgrade
+    flask prober run        # the scheduler, the probe engine and the ping writer
+
+The prober runs as its own process, without the HTTP server, so the web and the
+probe capacity are scaled independently.
+
+exports:
+    - schema_cli: The `flask schema` command group.
+    - prober_cli: The `flask prober` command group.
+    - start_prober: Starts the scheduler, the probe engine and the ping writer.
+    - stop_prober: Stops them, saving the pings still queued.
+"""
+
+__all__ = ["prober_cli", "schema_cli", "start_prober", "stop_prober"]
+
+import signal
+import threading
+
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from loguru import logger
+
+from downtime_panda import extensions
+
+schema_cli = AppGroup("schema", help="Manage the database schema.")
+prober_cli = AppGroup("prober", help="Run the probes of the monitored services.")
+
+UNVERSIONED_REVISION = "2fb8c8d409d7"
+"""Migration matching the schema created by the versions without `flask schema init`."""
+
+
+# ---------------------------------------------------------------------------- #
+#                                    SCHEMA                                    #
+# ---------------------------------------------------------------------------- #
+@schema_cli.command("init")
+def init_schema() -> None:
+    """
+    Create the database schema, or upgrade it to the latest migration.
+
+    The migrations run without the `DB_STATEMENT_TIMEOUT` of the application (see
+    `migrations/env.py`), as rewriting a large table takes longer than any query.
+    """
+    from flask_migrate import stamp, upgrade
+    from sqlalchemy import inspect
+
+    tables = inspect(extensions.db.engine).get_table_names()
+    if tables and "alembic_version" not in tables:
+        # Older versions created the tables at every boot, without versioning them:
+        # their schema is the one of the last migration they shipped with
+        logger.warning(
+            f"Unversioned schema found, stamping it as {UNVERSIONED_REVISION}..."
+        )
+        stamp(revision=UNVERSIONED_REVISION)
+
+    logger.info("Upgrading the database schema...")
+    upgrade()
+
+
+# ---------------------------------------------------------------------------- #
+#                                    PROBER                                    #
+# ---------------------------------------------------------------------------- #
+@prober_cli.command("run")
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Maximum number of probes in flight, instead of PROBE_CONCURRENCY.",
+)
+def run_prober(concurrency: int | None) -> None:
+    """Run the scheduler, the probe engine and the ping writer until interrupted."""
+    app = current_app._get_current_object()
+    if concurrency is not None:
+        extensions.prober.concurrency = concurrency
+    if not app.config["PING_BROADCAST_NOTIFY"]:
+        logger.info(
+            "PING_BROADCAST_NOTIFY is disabled: live charts served by other"
+            " processes find the new pings by polling the database"
+        )
+
+    start_prober(app)
+    try:
+        _wait_for_shutdown()
+    finally:
+        logger.info("Stopping the prober...")
+        stop_prober()
+
+
+def _wait_for_shutdown() -> None:
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    stopping.wait()
+
+
+def start_prober(app: Flask) -> None:
+    """Register the recurring jobs and start the scheduler, the probe engine and the ping writer."""
+    from downtime_panda.blueprints.service.dispatcher import (
+        renew_prober_lease,
+        schedule_dispatcher,
+    )
+    from downtime_panda.blueprints.service.retention import schedule_retention
+    from downtime_panda.blueprints.service.rollups import schedule_rollups
+
+    # Jobs are kept in the memory of each prober: a job store shared by several
+    # schedulers would run each job on a single one of them
+    logger.info("Starting APScheduler...")
+    renew_prober_lease()
+    schedule_dispatcher(app)
+    schedule_retention(app)
+    schedule_rollups(app)
+    extensions.scheduler.start()
+    extensions.ping_writer.start()
+    extensions.prober.start()
+
+
+def stop_prober() -> None:
+    """Stop dispatching probes, save the pings still queued, and hand the services over."""
+    from downtime_panda.blueprints.service.dispatcher import release_prober_lease
+
+    extensions.scheduler.shutdown()
+    extensions.prober.shutdown()
+    extensions.ping_writer.shutdown()
+    release_prober_lease()
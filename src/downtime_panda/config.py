@@ -9,7 +9,6 @@ exports:
 import os
 
 import pytz
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 
 
 class Config:
@@ -35,31 +34,440 @@ class Config:
     Defaults to a SQLite database file named `dtpanda.db` if the environment variable is not set, which is saved inside the `src/instance` directory.
     """
 
+    # ------------------------------ CONNECTION POOL ----------------------------- #
+    DB_POOL_SIZE = int(os.getenv("DTPANDA_DB_POOL_SIZE", "10"))
+    """
+    Number of database connections kept open by the pool, shared by the web views, the scheduler and the ping writer.
+    Loaded from the environment variable 'DTPANDA_DB_POOL_SIZE', defaults to 10.
+    """
+
+    DB_POOL_MAX_OVERFLOW = int(os.getenv("DTPANDA_DB_POOL_MAX_OVERFLOW", "10"))
+    """
+    Number of connections the pool may open past its size under load, closed as soon as they are returned.
+    Loaded from the environment variable 'DTPANDA_DB_POOL_MAX_OVERFLOW', defaults to 10.
+    """
+
+    DB_POOL_TIMEOUT = float(os.getenv("DTPANDA_DB_POOL_TIMEOUT", "30"))
+    """
+    Maximum time, in seconds, to wait for a free connection before giving up.
+    Loaded from the environment variable 'DTPANDA_DB_POOL_TIMEOUT', defaults to 30 seconds.
+    """
+
+    DB_POOL_PRE_PING = os.getenv("DTPANDA_DB_POOL_PRE_PING", "true").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+    """
+    Whether connections are checked before being handed out, replacing the ones dropped by the database.
+    Loaded from the environment variable 'DTPANDA_DB_POOL_PRE_PING', defaults to true.
+    """
+
+    DB_POOL_RECYCLE = int(os.getenv("DTPANDA_DB_POOL_RECYCLE", "1800"))
+    """
+    Age, in seconds, after which a connection is replaced, -1 to never replace them.
+    Loaded from the environment variable 'DTPANDA_DB_POOL_RECYCLE', defaults to 1800 seconds.
+    """
+
+    DB_STATEMENT_TIMEOUT = int(os.getenv("DTPANDA_DB_STATEMENT_TIMEOUT", "0"))
+    """
+    Maximum duration, in milliseconds, of a single statement on PostgreSQL, 0 for no limit.
+    Loaded from the environment variable 'DTPANDA_DB_STATEMENT_TIMEOUT', defaults to 0.
+    """
+
     SECRET_KEY = os.getenv("DTPANDA_SECRET_KEY") or "a_very_secret_key"
     """
     The secret key used by Flask for cryptographic operations (e.g., session signing).
     Loaded from the environment variable 'DTPANDA_SECRET'.
     """
 
-    # -------------------------------- APSCHEDULER ------------------------------- #
-    SCHEDULER_JOBSTORES = {
-        "default": SQLAlchemyJobStore(
-            url=SQLALCHEMY_DATABASE_URI
-            if os.getenv("DTPANDA_DB_URL")
-            else "sqlite:///src/instance/dtpanda.db",
-            tablename="apscheduler_jobs",
-        ),
-    }
+    # ---------------------------------- METRICS --------------------------------- #
+    METRICS_ENABLED = os.getenv("DTPANDA_METRICS_ENABLED", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+    """
+    Whether the metrics of each process are exposed as JSON on `/metrics`.
+    Set to True if the environment variable 'DTPANDA_METRICS_ENABLED' is set to 'true', '1', or 'yes' (case-insensitive).
+    """
+
+    METRICS_TOKEN = os.getenv("DTPANDA_METRICS_TOKEN", "")
+    """
+    Token the metrics endpoints require, as an `Authorization: Bearer` header. When empty, the metrics are public.
+    Loaded from the environment variable 'DTPANDA_METRICS_TOKEN', defaults to empty.
     """
-    Configuration for the APScheduler job store.
+
+    # --------------------------------- PASSWORDS -------------------------------- #
+    ARGON2_TIME_COST = int(os.getenv("DTPANDA_ARGON2_TIME_COST", "3"))
+    """
+    Number of iterations of Argon2id when hashing a password.
+    Loaded from the environment variable 'DTPANDA_ARGON2_TIME_COST', defaults to 3.
     """
 
+    ARGON2_MEMORY_COST = int(os.getenv("DTPANDA_ARGON2_MEMORY_COST", "65536"))
+    """
+    Memory, in KiB, used by Argon2id when hashing a password.
+    Loaded from the environment variable 'DTPANDA_ARGON2_MEMORY_COST', defaults to 65536 (64 MiB).
+    """
+
+    ARGON2_PARALLELISM = int(os.getenv("DTPANDA_ARGON2_PARALLELISM", "4"))
+    """
+    Number of parallel lanes of Argon2id when hashing a password.
+    Passwords hashed with other parameters are rehashed at the next login.
+    Loaded from the environment variable 'DTPANDA_ARGON2_PARALLELISM', defaults to 4.
+    """
+
+    PASSWORD_HASH_WORKERS = int(os.getenv("DTPANDA_PASSWORD_HASH_WORKERS", "2"))
+    """
+    Number of worker processes hashing passwords, 0 to hash them on the request thread.
+    Loaded from the environment variable 'DTPANDA_PASSWORD_HASH_WORKERS', defaults to 2.
+    """
+
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("DTPANDA_PASSWORD_HASH_QUEUE_SIZE", "16"))
+    """
+    Maximum number of passwords waiting for a free worker. Past it, logins and registrations are refused until the queue drains.
+    Loaded from the environment variable 'DTPANDA_PASSWORD_HASH_QUEUE_SIZE', defaults to 16.
+    """
+
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("DTPANDA_PASSWORD_HASH_TIMEOUT", "10"))
+    """
+    Maximum time, in seconds, a request waits for its password to be hashed.
+    Loaded from the environment variable 'DTPANDA_PASSWORD_HASH_TIMEOUT', defaults to 10 seconds.
+    """
+
+    # -------------------------------- APSCHEDULER ------------------------------- #
     SCHEDULER_TIMEZONE = pytz.utc
     """
     The timezone used by the APScheduler.
     Set to UTC by default.
     """
 
+    # --------------------------------- RETENTION -------------------------------- #
+    PING_RETENTION_DAYS = int(os.getenv("DTPANDA_PING_RETENTION_DAYS", "90"))
+    """
+    Number of days pings are kept for. Set to 0 to keep them forever.
+    Loaded from the environment variable 'DTPANDA_PING_RETENTION_DAYS', defaults to 90 days.
+    """
+
+    PING_RETENTION_INTERVAL = int(os.getenv("DTPANDA_PING_RETENTION_INTERVAL", "3600"))
+    """
+    Time, in seconds, between two runs of the retention job.
+    Loaded from the environment variable 'DTPANDA_PING_RETENTION_INTERVAL', defaults to 1 hour.
+    """
+
+    PING_PARTITION_INTERVAL = os.getenv("DTPANDA_PING_PARTITION_INTERVAL", "day")
+    """
+    Time range covered by each partition of the ping table on PostgreSQL, either `day` or `week`.
+    Loaded from the environment variable 'DTPANDA_PING_PARTITION_INTERVAL', defaults to `day`.
+    """
+
+    PING_PARTITIONS_AHEAD = int(os.getenv("DTPANDA_PING_PARTITIONS_AHEAD", "7"))
+    """
+    Number of upcoming partitions of the ping table created ahead of time on PostgreSQL.
+    Loaded from the environment variable 'DTPANDA_PING_PARTITIONS_AHEAD', defaults to 7.
+    """
+
+    PING_RETENTION_BATCH_SIZE = int(
+        os.getenv("DTPANDA_PING_RETENTION_BATCH_SIZE", "5000")
+    )
+    """
+    Number of expired pings deleted per transaction, on databases without partitioning.
+    Loaded from the environment variable 'DTPANDA_PING_RETENTION_BATCH_SIZE', defaults to 5000.
+    """
+
+    # ---------------------------------- ROLLUPS --------------------------------- #
+    ROLLUP_INTERVAL = int(os.getenv("DTPANDA_ROLLUP_INTERVAL", "60"))
+    """
+    Time, in seconds, between two runs of the job aggregating pings into rollups.
+    Loaded from the environment variable 'DTPANDA_ROLLUP_INTERVAL', defaults to 60 seconds.
+    """
+
+    ROLLUP_MAX_BUCKETS = int(os.getenv("DTPANDA_ROLLUP_MAX_BUCKETS", "60"))
+    """
+    Maximum number of buckets, per resolution, computed by a single run of the rollup job.
+    Bounds the work of each run while backfilling a long history.
+    Loaded from the environment variable 'DTPANDA_ROLLUP_MAX_BUCKETS', defaults to 60.
+    """
+
+    # ----------------------------- LATEST PING CACHE ---------------------------- #
+    LATEST_PING_CACHE_URL = os.getenv("DTPANDA_LATEST_PING_CACHE_URL", "")
+    """
+    URL of the Redis-compatible server holding the latest ping of every service, e.g. `redis://localhost:6379/0`.
+    When empty, the cache is kept in the memory of each process.
+    Loaded from the environment variable 'DTPANDA_LATEST_PING_CACHE_URL', defaults to empty.
+    """
+
+    LATEST_PING_CACHE_TTL = int(os.getenv("DTPANDA_LATEST_PING_CACHE_TTL", "300"))
+    """
+    Time, in seconds, a latest ping stored by the ping writer is cached for. Set to 0 to keep it until replaced.
+    Loaded from the environment variable 'DTPANDA_LATEST_PING_CACHE_TTL', defaults to 5 minutes.
+    """
+
+    LATEST_PING_CACHE_READ_TTL = float(
+        os.getenv("DTPANDA_LATEST_PING_CACHE_READ_TTL", "5")
+    )
+    """
+    Time, in seconds, a latest ping read from the database is cached for. Set to 0 to keep it until replaced.
+    Bounds how stale the status pages of the web process get, since its pings are written by the prober process.
+    Loaded from the environment variable 'DTPANDA_LATEST_PING_CACHE_READ_TTL', defaults to 5 seconds.
+    """
+
+    # ------------------------------ PING BROADCAST ------------------------------ #
+    PING_BROADCAST_QUEUE_SIZE = int(
+        os.getenv("DTPANDA_PING_BROADCAST_QUEUE_SIZE", "100")
+    )
+    """
+    Maximum number of pings waiting to be streamed to a single client. Once full, the oldest are dropped.
+    Loaded from the environment variable 'DTPANDA_PING_BROADCAST_QUEUE_SIZE', defaults to 100.
+    """
+
+    PING_BROADCAST_KEEPALIVE = float(
+        os.getenv("DTPANDA_PING_BROADCAST_KEEPALIVE", "15")
+    )
+    """
+    Time, in seconds, after which an idle ping stream sends a comment to keep the connection open.
+    Loaded from the environment variable 'DTPANDA_PING_BROADCAST_KEEPALIVE', defaults to 15 seconds.
+    """
+
+    PING_BROADCAST_NOTIFY = os.getenv(
+        "DTPANDA_PING_BROADCAST_NOTIFY", "false"
+    ).lower() in ("true", "1", "yes")
+    """
+    Publishes new pings through PostgreSQL `LISTEN/NOTIFY`, so they reach the clients of every process right away.
+    Without it, the processes that do not write pings poll the database for them. Ignored on databases other than PostgreSQL.
+    Set to True if the environment variable 'DTPANDA_PING_BROADCAST_NOTIFY' is set to 'true', '1', or 'yes' (case-insensitive).
+    """
+
+    PING_BROADCAST_POLL_INTERVAL = float(
+        os.getenv("DTPANDA_PING_BROADCAST_POLL_INTERVAL", "1")
+    )
+    """
+    Time, in seconds, between two database polls for the pings saved by another process, without `LISTEN/NOTIFY`.
+    A single query per process serves every client. Set to 0 to disable polling.
+    Loaded from the environment variable 'DTPANDA_PING_BROADCAST_POLL_INTERVAL', defaults to 1 second.
+    """
+
+    PING_BROADCAST_POLL_RESCAN = float(
+        os.getenv("DTPANDA_PING_BROADCAST_POLL_RESCAN", "30")
+    )
+    """
+    Time, in seconds, during which every poll still looks for pings probed since then, below the highest ping ID already seen.
+    A ping committed after another one with a higher ID (e.g. by another prober) is still delivered, as long as it was
+    probed within this window: it should exceed the longest time between a probe and the commit of its ping.
+    Loaded from the environment variable 'DTPANDA_PING_BROADCAST_POLL_RESCAN', defaults to 30 seconds.
+    """
+
+    PING_DELTA_MAX_WAIT = float(os.getenv("DTPANDA_PING_DELTA_MAX_WAIT", "25"))
+    """
+    Maximum time, in seconds, the live status chart may wait for a new ping in a single request (long polling).
+    Loaded from the environment variable 'DTPANDA_PING_DELTA_MAX_WAIT', defaults to 25 seconds.
+    """
+
+    PING_DELTA_RESCAN = float(os.getenv("DTPANDA_PING_DELTA_RESCAN", "30"))
+    """
+    Time, in seconds, before the latest ping of the live status chart whose pings are sent again with every update.
+    A ping committed after another one with a higher ID (e.g. by another prober) is still drawn, as long as it was
+    probed within this window: it should exceed twice the longest time between a probe and the commit of its ping.
+    Loaded from the environment variable 'DTPANDA_PING_DELTA_RESCAN', defaults to 30 seconds.
+    """
+
+    # ----------------------------------- ASGI ----------------------------------- #
+    ASGI_POLL_WORKERS = int(os.getenv("DTPANDA_ASGI_POLL_WORKERS", "8"))
+    """
+    Number of threads serving the status chart polling, when served through `downtime_panda.asgi`.
+    Polling never takes threads from the pool of the other views.
+    Loaded from the environment variable 'DTPANDA_ASGI_POLL_WORKERS', defaults to 8.
+    """
+
+    # ------------------------------------ API ----------------------------------- #
+    STATUS_BATCH_MAX_SIZE = int(os.getenv("DTPANDA_STATUS_BATCH_MAX_SIZE", "1000"))
+    """
+    Maximum number of subscriptions whose status can be asked in a single API request.
+    Loaded from the environment variable 'DTPANDA_STATUS_BATCH_MAX_SIZE', defaults to 1000.
+    """
+
+    API_TOKEN_HASH_KEY = os.getenv("DTPANDA_API_TOKEN_HASH_KEY") or SECRET_KEY
+    """
+    The key of the keyed hash (HMAC-SHA256) under which API tokens are saved: tokens are never saved in clear.
+    Changing it invalidates every existing token.
+    Loaded from the environment variable 'DTPANDA_API_TOKEN_HASH_KEY', defaults to the secret key.
+    """
+
+    API_TOKEN_CACHE_SIZE = int(os.getenv("DTPANDA_API_TOKEN_CACHE_SIZE", "1024"))
+    """
+    Maximum number of recently used API tokens whose owner is cached, 0 to disable the cache.
+    Loaded from the environment variable 'DTPANDA_API_TOKEN_CACHE_SIZE', defaults to 1024.
+    """
+
+    API_TOKEN_CACHE_TTL = float(os.getenv("DTPANDA_API_TOKEN_CACHE_TTL", "60"))
+    """
+    Time, in seconds, an API token stays cached. Bounds how long a token revoked in another process keeps working.
+    Loaded from the environment variable 'DTPANDA_API_TOKEN_CACHE_TTL', defaults to 60 seconds.
+    """
+
+    # -------------------------------- PING EXPORT ------------------------------- #
+    PING_EXPORT_BATCH_SIZE = int(os.getenv("DTPANDA_PING_EXPORT_BATCH_SIZE", "5000"))
+    """
+    Number of pings fetched at a time from the database when exporting the history of a service.
+    The export only ever holds a single batch in memory, whatever the number of pings.
+    Loaded from the environment variable 'DTPANDA_PING_EXPORT_BATCH_SIZE', defaults to 5000.
+    """
+
+    # ---------------------------------- PROBER ---------------------------------- #
+    PROBE_CONCURRENCY = int(os.getenv("DTPANDA_PROBE_CONCURRENCY", "500"))
+    """
+    Maximum number of probes the probe engine keeps in flight at the same time.
+    Loaded from the environment variable 'DTPANDA_PROBE_CONCURRENCY', defaults to 500.
+    """
+
+    PROBE_TIMEOUT = float(os.getenv("DTPANDA_PROBE_TIMEOUT", "10"))
+    """
+    Total timeout, in seconds, of a single probe. Probes exceeding it are recorded as failed.
+    Services with their own timeout override it.
+    Loaded from the environment variable 'DTPANDA_PROBE_TIMEOUT', defaults to 10 seconds.
+    """
+
+    PROBE_POOL_PER_HOST = int(os.getenv("DTPANDA_PROBE_POOL_PER_HOST", "0"))
+    """
+    Maximum number of keep-alive connections the probe engine keeps open to the same host, 0 for no limit other than `PROBE_CONCURRENCY`.
+    Loaded from the environment variable 'DTPANDA_PROBE_POOL_PER_HOST', defaults to 0.
+    """
+
+    PROBE_POOL_IDLE_TIMEOUT = float(os.getenv("DTPANDA_PROBE_POOL_IDLE_TIMEOUT", "30"))
+    """
+    Time, in seconds, after which an idle keep-alive connection of the probe engine is closed.
+    Loaded from the environment variable 'DTPANDA_PROBE_POOL_IDLE_TIMEOUT', defaults to 30 seconds.
+    """
+
+    PROBE_COLD_CONNECTIONS = os.getenv(
+        "DTPANDA_PROBE_COLD_CONNECTIONS", "false"
+    ).lower() in ("true", "1", "yes")
+    """
+    Opens a fresh connection, with a fresh DNS lookup, for every probe instead of reusing the pooled ones, so every ping measures the full handshakes.
+    Set to True if the environment variable 'DTPANDA_PROBE_COLD_CONNECTIONS' is set to 'true', '1', or 'yes' (case-insensitive).
+    """
+
+    PROBE_DNS_CACHE_SIZE = int(os.getenv("DTPANDA_PROBE_DNS_CACHE_SIZE", "1024"))
+    """
+    Maximum number of hosts in the DNS cache of the probe engine, shared by all its probes. 0 disables the cache.
+    Loaded from the environment variable 'DTPANDA_PROBE_DNS_CACHE_SIZE', defaults to 1024.
+    """
+
+    PROBE_DNS_TTL = float(os.getenv("DTPANDA_PROBE_DNS_TTL", "60"))
+    """
+    Time, in seconds, a resolved host is kept in the DNS cache. Hosts still in use are resolved again in the background shortly before.
+    Loaded from the environment variable 'DTPANDA_PROBE_DNS_TTL', defaults to 60 seconds.
+    """
+
+    PROBE_DNS_NEGATIVE_TTL = float(os.getenv("DTPANDA_PROBE_DNS_NEGATIVE_TTL", "5"))
+    """
+    Time, in seconds, a host that could not be resolved is kept in the DNS cache before being tried again.
+    Loaded from the environment variable 'DTPANDA_PROBE_DNS_NEGATIVE_TTL', defaults to 5 seconds.
+    """
+
+    PING_WRITER_BATCH_SIZE = int(os.getenv("DTPANDA_PING_WRITER_BATCH_SIZE", "500"))
+    """
+    Number of pings the write-behind buffer saves in a single batch.
+    Loaded from the environment variable 'DTPANDA_PING_WRITER_BATCH_SIZE', defaults to 500.
+    """
+
+    PING_WRITER_FLUSH_INTERVAL = int(
+        os.getenv("DTPANDA_PING_WRITER_FLUSH_INTERVAL", "250")
+    )
+    """
+    Maximum time, in milliseconds, a ping waits in the write-behind buffer before being saved.
+    Loaded from the environment variable 'DTPANDA_PING_WRITER_FLUSH_INTERVAL', defaults to 250 milliseconds.
+    """
+
+    PING_WRITER_QUEUE_SIZE = int(os.getenv("DTPANDA_PING_WRITER_QUEUE_SIZE", "10000"))
+    """
+    Maximum number of pings waiting in the write-behind buffer.
+    Once full, the probe engine waits for the buffer to be flushed before queueing more.
+    Loaded from the environment variable 'DTPANDA_PING_WRITER_QUEUE_SIZE', defaults to 10000.
+    """
+
+    PROBE_INTERVAL = float(os.getenv("DTPANDA_PROBE_INTERVAL", "5"))
+    """
+    Time, in seconds, between two probes of the same service.
+    Services with their own interval override it.
+    Loaded from the environment variable 'DTPANDA_PROBE_INTERVAL', defaults to 5 seconds.
+    """
+
+    PROBE_ADAPTIVE = os.getenv("DTPANDA_PROBE_ADAPTIVE", "false").lower() in (
+        "true",
+        "1",
+        "yes",
+    )
+    """
+    Adapts the interval of every service to its health: stable services are probed less and less often, down to `PROBE_INTERVAL_MAX`, while a status change, an error or a slower response brings the interval back to `PROBE_INTERVAL_MIN` right away.
+    Set to True if the environment variable 'DTPANDA_PROBE_ADAPTIVE' is set to 'true', '1', or 'yes' (case-insensitive).
+    """
+
+    PROBE_INTERVAL_MIN = float(os.getenv("DTPANDA_PROBE_INTERVAL_MIN", "5"))
+    """
+    Shortest adaptive interval, in seconds, used while a service is changing. Services with their own bounds override it.
+    Loaded from the environment variable 'DTPANDA_PROBE_INTERVAL_MIN', defaults to 5 seconds.
+    """
+
+    PROBE_INTERVAL_MAX = float(os.getenv("DTPANDA_PROBE_INTERVAL_MAX", "60"))
+    """
+    Longest adaptive interval, in seconds, reached by long-stable services. It bounds how late an outage of a stable service is detected.
+    Loaded from the environment variable 'DTPANDA_PROBE_INTERVAL_MAX', defaults to 60 seconds.
+    """
+
+    PROBE_BACKOFF_AFTER = int(os.getenv("DTPANDA_PROBE_BACKOFF_AFTER", "12"))
+    """
+    Number of stable probes in a row after which the adaptive interval of a service grows.
+    Loaded from the environment variable 'DTPANDA_PROBE_BACKOFF_AFTER', defaults to 12.
+    """
+
+    PROBE_BACKOFF_FACTOR = float(os.getenv("DTPANDA_PROBE_BACKOFF_FACTOR", "2"))
+    """
+    Factor the adaptive interval of a stable service grows by.
+    Loaded from the environment variable 'DTPANDA_PROBE_BACKOFF_FACTOR', defaults to 2.
+    """
+
+    PROBE_LATENCY_REGRESSION_RATIO = float(
+        os.getenv("DTPANDA_PROBE_LATENCY_REGRESSION_RATIO", "2")
+    )
+    """
+    How many times slower than usual a response must be to count as a latency regression, tightening the adaptive interval.
+    Loaded from the environment variable 'DTPANDA_PROBE_LATENCY_REGRESSION_RATIO', defaults to 2.
+    """
+
+    PROBE_DISPATCH_INTERVAL = float(os.getenv("DTPANDA_PROBE_DISPATCH_INTERVAL", "1"))
+    """
+    Time, in seconds, between two ticks of the probe dispatcher job.
+    Loaded from the environment variable 'DTPANDA_PROBE_DISPATCH_INTERVAL', defaults to 1 second.
+    """
+
+    # --------------------------------- SHARDING --------------------------------- #
+    PROBER_ID = os.getenv("DTPANDA_PROBER_ID", "")
+    """
+    Identifier of this prober among all the running ones.
+    Loaded from the environment variable 'DTPANDA_PROBER_ID', defaults to the host name and the process ID.
+    """
+
+    PROBER_LEASE_TTL = float(os.getenv("DTPANDA_PROBER_LEASE_TTL", "15"))
+    """
+    Time, in seconds, after which a prober that stopped renewing its lease is considered dead, and its services are handed over to the others.
+    Leases are renewed three times per period. Services overdue by this long are probed by any prober.
+    Loaded from the environment variable 'DTPANDA_PROBER_LEASE_TTL', defaults to 15 seconds.
+    """
+
+    PROBER_SHARD_SLOTS = int(os.getenv("DTPANDA_PROBER_SHARD_SLOTS", "1024"))
+    """
+    Number of slots the services are spread over, the unit of work moved between probers.
+    Must be the same for every prober. Loaded from the environment variable 'DTPANDA_PROBER_SHARD_SLOTS', defaults to 1024.
+    """
+
+    PROBER_VIRTUAL_NODES = int(os.getenv("DTPANDA_PROBER_VIRTUAL_NODES", "64"))
+    """
+    Number of points of each prober on the consistent hash ring. More points spread the slots more evenly.
+    Must be the same for every prober. Loaded from the environment variable 'DTPANDA_PROBER_VIRTUAL_NODES', defaults to 64.
+    """
+
 
 class TestingConfig(Config):
     """
@@ -89,3 +497,20 @@ class TestingConfig(Config):
     Disables CSRF protection for testing.
     This is often done in tests to simplify form submissions.
     """
+
+    PASSWORD_HASH_WORKERS = 0
+    """
+    Hashes passwords on the calling thread, without starting worker processes.
+    """
+
+    PING_BROADCAST_POLL_INTERVAL = 0
+    """
+    Never polls the database for new pings: the tests write them in-process, and
+    share a single in-memory connection.
+    """
+
+    PING_DELTA_RESCAN = 0
+    """
+    Only sends the pings above the cursor of the live status chart, so the tests
+    see exactly the new ones.
+    """
@@ -0,0 +1,82 @@
+"""
+The database connection pool shared by the whole of Downtime Panda.
+
+Flask-SQLAlchemy, the ping writer and the scheduler jobs all check connections
+out of a single engine, whose pool is sized by the configuration. The pool
+reports how long checkouts wait, how many connections are in use, and how often
+it has to overflow, to the metrics of the process.
+
+exports:
+    - engine_options: The engine options of the configured pool.
+    - InstrumentedQueuePool: A queue pool reporting its usage to the metrics.
+"""
+
+__all__ = ["InstrumentedQueuePool", "engine_options"]
+
+import time
+from typing import Any, Mapping
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+
+from downtime_panda.metrics import metrics
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    A `QueuePool` timing every checkout.
+
+    Checkout latency is the time spent waiting for a free connection (or opening
+    one), which grows as soon as the pool is too small for the load.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A disposed engine recreates its pool, the gauges follow the newest one
+        metrics.gauge("db_pool_size", self.size)
+        metrics.gauge("db_pool_checked_out", self.checkedout)
+        metrics.gauge("db_pool_overflow", self.overflow)
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        overflow = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.counter("db_pool_timeouts_total").inc()
+            raise
+        finally:
+            metrics.histogram("db_pool_checkout_seconds").observe(
+                time.perf_counter() - started
+            )
+
+        if self._overflow > overflow:
+            metrics.counter("db_pool_overflow_total").inc()
+        return connection
+
+
+def engine_options(config: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Build the engine options of the pool described by the configuration.
+
+    In-memory SQLite databases live in a single connection, so they keep the
+    static pool set up by Flask-SQLAlchemy.
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_POOL_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+    }
+    if url.get_backend_name() == "postgresql" and config["DB_STATEMENT_TIMEOUT"]:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"
+        }
+    return options
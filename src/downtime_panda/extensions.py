@@ -5,8 +5,16 @@ __all__ = [
     "migrate",
     "login_manager",
     "scheduler",
+    "prober",
+    "prober_shard",
+    "adaptive_schedule",
+    "ping_writer",
+    "latest_pings",
+    "ping_broadcaster",
     "moment",
+    "password_hasher",
     "token_auth",
+    "token_cache",
 ]
 
 from flask_apscheduler import APScheduler
@@ -18,6 +26,15 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import declarative_base
 from werkzeug.http import HTTP_STATUS_CODES
 
+from downtime_panda.blueprints.service.adaptive import AdaptiveSchedule
+from downtime_panda.blueprints.service.broadcaster import PingBroadcaster
+from downtime_panda.blueprints.service.cache import LatestPingCache
+from downtime_panda.blueprints.service.prober import ProbeEngine
+from downtime_panda.blueprints.service.sharding import ProberShard
+from downtime_panda.blueprints.service.writer import PingWriter
+from downtime_panda.passwords import PasswordHashingPool
+from downtime_panda.token_cache import TokenCache
+
 # --------------------------------- DATABASE --------------------------------- #
 Base = declarative_base()
 
@@ -28,15 +45,25 @@ migrate = Migrate()
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 login_manager.session_protection = "strong"
+password_hasher = PasswordHashingPool()
 
 # -------------------------------- APSCHEDULER ------------------------------- #
 scheduler = APScheduler()
 
+# ---------------------------------- PROBER ---------------------------------- #
+prober = ProbeEngine()
+prober_shard = ProberShard()
+adaptive_schedule = AdaptiveSchedule()
+ping_writer = PingWriter()
+latest_pings = LatestPingCache()
+ping_broadcaster = PingBroadcaster()
+
 # ---------------------------------- MOMENT ---------------------------------- #
 moment = Moment()
 
 # ------------------------------ HTTP TOKEN AUTH ----------------------------- #
 token_auth = HTTPTokenAuth(scheme="Bearer")
+token_cache = TokenCache()
 
 from downtime_panda.blueprints.user.models import User  # noqa: E402
 
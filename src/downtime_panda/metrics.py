@@ -0,0 +1,135 @@
+"""
+In-process metrics of Downtime Panda.
+
+Metrics are plain counters, histograms and gauges kept in the memory of each
+process, and exposed as JSON by the metrics endpoint. Every metric is named like
+a Prometheus one, labels included, e.g. `password_hash_seconds{op="verify"}`.
+
+exports:
+    - metrics: The registry of the process.
+    - MetricsRegistry: A registry of metrics.
+    - Counter: A monotonically increasing count.
+    - Histogram: A distribution of observed values, e.g. latencies.
+"""
+
+__all__ = ["Counter", "Histogram", "MetricsRegistry", "metrics"]
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+"""Upper bounds, in seconds, of the buckets of latency histograms."""
+
+
+class Counter:
+    """A count that only goes up."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> int:
+        return self.value
+
+
+class Histogram:
+    """Counts observed values in cumulative buckets, as Prometheus does."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe how many seconds the block takes, even when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "max": self.max,
+                "buckets": {
+                    str(bound): count for bound, count in zip(self.buckets, self.counts)
+                },
+            }
+
+
+class MetricsRegistry:
+    """
+    The metrics of a process, created on first use.
+
+    Gauges are callables, read only when the metrics are collected, so reporting
+    e.g. the size of a pool costs nothing until someone looks.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._gauges: dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        return self._get(_key(name, labels), Counter)
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        return self._get(_key(name, labels), Histogram)
+
+    def gauge(self, name: str, read: Callable[[], Any], **labels: str) -> None:
+        """Register a gauge, replacing any previous one with the same name."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = read
+
+    def _get(self, key: str, kind: type) -> Any:
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = kind()
+            return metric
+
+    def snapshot(self) -> dict[str, Any]:
+        """The current value of every metric, by name."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            gauges = dict(self._gauges)
+
+        snapshot = {key: metric.snapshot() for key, metric in metrics.items()}
+        snapshot.update({key: read() for key, read in gauges.items()})
+        return dict(sorted(snapshot.items()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self._gauges.clear()
+
+
+def _key(name: str, labels: dict[str, str]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+metrics = MetricsRegistry()
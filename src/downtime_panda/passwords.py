@@ -0,0 +1,182 @@
+"""
+Password hashing of Downtime Panda, off the request threads.
+
+Argon2 is slow on purpose, so hashing a password on the request thread lets a
+burst of logins pin every thread of the web server. Hashes are computed in a
+small pool of worker processes instead, and at most `PASSWORD_HASH_QUEUE_SIZE`
+more hashes may wait for a worker: past that, logins are refused right away
+with `PasswordHashingBusy`, and the rest of the application keeps answering.
+
+exports:
+    - PasswordHashingPool: The worker pool, as a Flask extension.
+    - PasswordHashingBusy: Raised when too many hashes are already waiting.
+"""
+
+__all__ = ["PasswordHashingBusy", "PasswordHashingPool"]
+
+import atexit
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from flask import Flask
+
+from downtime_panda.metrics import metrics
+
+Parameters = tuple[int, int, int]
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Too many passwords are being hashed, the client should retry later."""
+
+
+class PasswordHashingPool:
+    """
+    Hashes and verifies passwords with Argon2, in a bounded process pool.
+
+    The Argon2 parameters come from the configuration. With
+    `PASSWORD_HASH_WORKERS` set to 0, hashes are computed on the calling thread,
+    still within the same limit of concurrent hashes.
+    """
+
+    def __init__(self, app: Flask | None = None):
+        self.parameters: Parameters = (3, 65536, 4)
+        self.workers = 0
+        self.timeout = 10.0
+
+        self.limit = 1
+        self._in_flight = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Read the Argon2 parameters and the size of the pool from the configuration."""
+        self.parameters = (
+            app.config["ARGON2_TIME_COST"],
+            app.config["ARGON2_MEMORY_COST"],
+            app.config["ARGON2_PARALLELISM"],
+        )
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        self.limit = max(self.workers, 1) + app.config["PASSWORD_HASH_QUEUE_SIZE"]
+        metrics.gauge("password_hash_in_flight", self.in_flight)
+        app.extensions["password_hasher"] = self
+
+    # ---------------------------------- HASHING --------------------------------- #
+    def hash(self, password: str) -> str:
+        """Hash a password."""
+        return self._run("hash", _hash, self.parameters, password)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """Whether the password matches the hash."""
+        return self._run("verify", _verify, self.parameters, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether the hash was made with other parameters than the configured ones."""
+        return _hasher(self.parameters).check_needs_rehash(password_hash)
+
+    def _run(self, op: str, function: Callable, *args):
+        if not self._acquire():
+            metrics.counter("password_hash_rejected_total", op=op).inc()
+            raise PasswordHashingBusy("Too many passwords are being hashed.")
+
+        latency = metrics.histogram("password_hash_seconds", op=op)
+        if self.workers == 0:
+            try:
+                with latency.time():
+                    return function(*args)
+            finally:
+                self._release()
+
+        future: Future | None = None
+        try:
+            with latency.time():
+                executor = self._get_executor()
+                future = executor.submit(function, *args)
+                # The slot is only freed once the worker is done, even after a timeout
+                future.add_done_callback(lambda _: self._release())
+                return future.result(timeout=self.timeout)
+        except FutureTimeoutError as e:
+            metrics.counter("password_hash_timeouts_total", op=op).inc()
+            raise PasswordHashingBusy("Password hashing timed out.") from e
+        except BrokenProcessPool as e:
+            self._discard(executor, op)
+            raise PasswordHashingBusy("A password hashing worker died.") from e
+        finally:
+            # Not handed over to a worker, whatever went wrong
+            if future is None:
+                self._release()
+
+    # ----------------------------------- POOL ----------------------------------- #
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a process running threads is unsafe, start fresh workers
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor, op: str) -> None:
+        """Drop a pool whose worker died, the next hash starts a new one."""
+        with self._lock:
+            # Another thread may have replaced the broken pool already
+            if self._executor is executor:
+                self._executor = None
+                metrics.counter("password_hash_pool_restarts_total", op=op).inc()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def in_flight(self) -> int:
+        """Number of hashes being computed or waiting for a worker."""
+        return self._in_flight
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# ---------------------------------------------------------------------------- #
+#                                    WORKERS                                   #
+# ---------------------------------------------------------------------------- #
+@functools.cache
+def _hasher(parameters: Parameters) -> PasswordHasher:
+    time_cost, memory_cost, parallelism = parameters
+    return PasswordHasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+
+
+def _hash(parameters: Parameters, password: str) -> str:
+    return _hasher(parameters).hash(password)
+
+
+def _verify(parameters: Parameters, password_hash: str, password: str) -> bool:
+    try:
+        return _hasher(parameters).verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
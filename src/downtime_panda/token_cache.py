@@ -0,0 +1,83 @@
+"""
+Cache of the API tokens recently used to authenticate.
+
+API clients keep calling with the same few tokens, so the user owning each token
+is remembered for a short while, and authenticating a request costs no query
+for the token. Tokens are cached by their hash, never in clear.
+
+exports:
+    - TokenCache: The cache, as a Flask extension.
+"""
+
+__all__ = ["TokenCache"]
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Flask
+
+
+class TokenCache:
+    """
+    Least recently used token hashes, each with the ID of the user owning it.
+
+    Entries expire `API_TOKEN_CACHE_TTL` seconds after being stored, and revoking a
+    token drops its entry at once. Other processes only see a revocation once
+    their own entry expires, so the time-to-live bounds how long a revoked token
+    keeps working there.
+    """
+
+    def __init__(self, app: Flask | None = None):
+        self.max_size = 1024
+        self.ttl = 60.0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """Size the cache as configured for the Flask application."""
+        self.max_size = app.config["API_TOKEN_CACHE_SIZE"]
+        self.ttl = app.config["API_TOKEN_CACHE_TTL"]
+        self.clear()
+        app.extensions["token_cache"] = self
+
+    def get(self, token_hash: str) -> int | None:
+        """Get the ID of the user owning a token, or None if it is not cached."""
+        with self._lock:
+            expires_at, user_id = self._entries.get(token_hash, (0, None))
+            if expires_at <= time.monotonic():
+                self._entries.pop(token_hash, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(token_hash)
+            self.hits += 1
+            return user_id
+
+    def set(self, token_hash: str, user_id: int) -> None:
+        """Remember the owner of a token, evicting the least recently used one."""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[token_hash] = (time.monotonic() + self.ttl, user_id)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token_hash: str) -> None:
+        """Forget a token, e.g. because it was revoked."""
+        with self._lock:
+            self._entries.pop(token_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -1,10 +1,17 @@
-from typing import Literal
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, ContextManager, Iterable, Iterator, Literal
 
 import pytest
 from flask import Flask, url_for
 from flask.testing import FlaskClient, FlaskCliRunner
+from sqlalchemy import event
+from sqlalchemy.engine import ExecutionContext
 
 from downtime_panda import create_app
+from downtime_panda.blueprints.service.models import Ping, Service
+from downtime_panda.blueprints.subscription.models import Subscription
 from downtime_panda.blueprints.token.models import APIToken
 from downtime_panda.blueprints.user.models import User
 from downtime_panda.config import TestingConfig
@@ -99,3 +106,95 @@ def alice_token(client: FlaskClient, app: Flask, user_alice: User):
         token = APIToken.create_for_user(user_alice)
 
     return token
+
+
+PingSample = tuple[datetime, int, float]
+"""A ping to save: when it was done, its HTTP status and its response time in seconds."""
+
+
+@pytest.fixture()
+def make_service(app: Flask) -> Callable[..., Service]:
+    """Saves a service along with the given pings, and returns it"""
+
+    def make(
+        pings: Iterable[PingSample] = (),
+        uri: str = "https://random.nonexistent.service",
+    ) -> Service:
+        with app.app_context():
+            service = Service(uri)
+            db.session.add(service)
+            db.session.commit()
+            for pinged_at, status, response_time in pings:
+                service.ping.add(
+                    Ping(
+                        service_id=service.id,
+                        http_status=status,
+                        response_time=timedelta(seconds=response_time),
+                        pinged_at=pinged_at,
+                    )
+                )
+            db.session.commit()
+            # Loaded, so that its columns can still be read once detached
+            db.session.refresh(service)
+
+        return service
+
+    return make
+
+
+@pytest.fixture()
+def service_pings() -> list[PingSample]:
+    """Pings of `service`, none unless a module overrides or parametrizes this fixture"""
+    return []
+
+
+@pytest.fixture()
+def service(make_service: Callable[..., Service], service_pings) -> Service:
+    """A service saved in the app, with the pings of `service_pings`"""
+    return make_service(service_pings)
+
+
+@pytest.fixture()
+def subscription_uuid(app: Flask, user_alice: User, service: Service) -> str:
+    """UUID of a subscription of Alice to `service`"""
+    with app.app_context():
+        db.session.add_all([user_alice, service])
+        subscription = Subscription.subscribe_user_to_service(
+            user_alice, service, "A Random Nonexistent Service"
+        )
+        return str(subscription.uuid)
+
+
+@dataclass
+class CapturedQuery:
+    statement: str
+    parameters: Any
+    context: ExecutionContext
+
+
+@pytest.fixture()
+def capture_queries(
+    app: Flask,
+) -> Callable[[str | None], ContextManager[list[CapturedQuery]]]:
+    """
+    Collects the statements run on the database of the app inside a `with` block,
+    only those containing `match` if given.
+    """
+
+    @contextmanager
+    def capture(match: str | None = None) -> Iterator[list[CapturedQuery]]:
+        queries = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if match is None or match in statement:
+                queries.append(CapturedQuery(statement, parameters, context))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            yield queries
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+    return capture
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+import pytz
+from flask import Flask
+
+from downtime_panda.blueprints.service.adaptive import ScheduleState, adapt
+from downtime_panda.blueprints.service.models import Service
+from downtime_panda.blueprints.service.prober import ProbeResult
+from downtime_panda.extensions import adaptive_schedule, db, ping_writer
+
+BOUNDS = {
+    "interval_min": 5,
+    "interval_max": 60,
+    "backoff_after": 3,
+    "backoff_factor": 2,
+    "latency_ratio": 2,
+}
+
+
+def result(
+    status: int = HTTPStatus.OK, response_time: float = 0.1, service_id: int = 1
+) -> ProbeResult:
+    return ProbeResult(
+        service_id=service_id,
+        http_status=status,
+        response_time=timedelta(seconds=response_time),
+        pinged_at=datetime.now(pytz.utc),
+    )
+
+
+def test_stable_service_backs_off_up_to_max():
+    """Tests that a stable service is probed less and less often, within its maximum"""
+    state = ScheduleState(interval=5)
+    intervals = []
+    for _ in range(15):
+        state, reason = adapt(state, result(), **BOUNDS)
+        assert reason is None
+        intervals.append(state.interval)
+
+    assert intervals[:3] == [5, 5, 10]
+    assert intervals[-1] == 60
+    assert max(intervals) == 60
+
+
+@pytest.mark.parametrize(
+    ("probe", "reason"),
+    [
+        (result(HTTPStatus.SERVICE_UNAVAILABLE), "status_change"),
+        (result(HTTPStatus.OK, 1.0), "latency"),
+        (result(HTTPStatus.NOT_FOUND, -1), "status_change"),
+    ],
+)
+def test_unstable_service_tightens_to_min(probe: ProbeResult, reason: str):
+    """Tests that a status change or a latency regression drops the interval to its minimum"""
+    state = ScheduleState(interval=40, last_status=HTTPStatus.OK, latency=0.1)
+
+    state, tightened = adapt(state, probe, **BOUNDS)
+
+    assert tightened == reason
+    assert state.interval == 5
+    assert state.stable_probes == 0
+
+
+def test_persistent_error_stays_at_min():
+    """Tests that a service still failing keeps being probed at its shortest interval"""
+    state = ScheduleState(interval=5, last_status=HTTPStatus.BAD_GATEWAY)
+    for _ in range(10):
+        state, reason = adapt(state, result(HTTPStatus.BAD_GATEWAY), **BOUNDS)
+        assert reason == "error"
+
+    assert state.interval == 5
+
+
+@pytest.fixture()
+def adaptive(app: Flask):
+    """The adaptive schedule, enabled for the test only"""
+    adaptive_schedule.enabled = True
+    yield adaptive_schedule
+    adaptive_schedule.enabled = False
+    ping_writer.shutdown()
+
+
+def test_saved_pings_adjust_the_schedule(app: Flask, adaptive):
+    """Tests that saving pings adjusts the interval and brings a failing service forward"""
+    with app.app_context():
+        service = Service.create_if_not_exists(
+            "https://adaptive.service", probe_interval_min=2, probe_interval_max=20
+        )
+        for _ in range(adaptive.backoff_after):
+            ping_writer.put(result(service_id=service.id))
+        ping_writer.flush()
+        db.session.refresh(service)
+        assert service.adaptive_interval == adaptive.interval * adaptive.backoff_factor
+
+        now = datetime.now(pytz.utc)
+        Service.claim_due(now, timedelta(seconds=5), adaptive=True)
+        db.session.refresh(service)
+        next_probe_at = service.next_probe_at.replace(tzinfo=pytz.utc)
+        assert next_probe_at - now <= timedelta(seconds=service.adaptive_interval)
+
+        next_probe_at = now + timedelta(seconds=60)
+        service.next_probe_at = next_probe_at
+        db.session.commit()
+        ping_writer.put(result(HTTPStatus.BAD_GATEWAY, service_id=service.id))
+        ping_writer.flush()
+        db.session.refresh(service)
+
+        assert service.adaptive_interval == 2
+        assert service.last_status == HTTPStatus.BAD_GATEWAY
+        assert service.next_probe_at.replace(tzinfo=pytz.utc) < next_probe_at
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from importlib.metadata import version
+from typing import Literal
+
+import pytest
+import pytz
+from flask import Flask
+from flask.testing import FlaskClient
+
+from downtime_panda.asgi import AsgiApp
+from downtime_panda.blueprints.service.models import Ping, Service
+from downtime_panda.blueprints.service.prober import ProbeResult
+from downtime_panda.blueprints.subscription.models import Subscription
+from downtime_panda.blueprints.user.models import User
+from downtime_panda.extensions import db, ping_broadcaster
+
+NOW = datetime(2025, 6, 9, 10, 0, 0, tzinfo=pytz.utc)
+
+
+@pytest.fixture()
+def asgi_app(app: Flask):
+    asgi_app = AsgiApp(app)
+    yield asgi_app
+    asgi_app.poll_executor.shutdown()
+
+
+@pytest.fixture()
+def service_pings() -> list[tuple]:
+    """A single ping"""
+    return [(NOW, HTTPStatus.OK, 1)]
+
+
+@pytest.fixture()
+def service_id(service: Service) -> int:
+    """ID of the service, with its single ping"""
+    return service.id
+
+
+def http_scope(path: str, query_string: bytes = b"", headers=()) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(b"host", b"localhost"), *headers],
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 12345),
+    }
+
+
+async def request(asgi_app: AsgiApp, scope: dict) -> tuple[int, bytes]:
+    """Run a plain request through the ASGI app, returning status and body"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi_app(scope, receive, send)
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return messages[0]["status"], body
+
+
+def test_stream_served_on_event_loop(asgi_app: AsgiApp, service_id: int):
+    """Tests that the stream pushes pings without a thread, and ends on disconnect"""
+
+    async def run():
+        chunks = asyncio.Queue()
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            await chunks.put(message)
+
+        threads = threading.active_count()
+        task = asyncio.create_task(
+            asgi_app(http_scope(f"/service/stream/{service_id}"), receive, send)
+        )
+
+        start = await asyncio.wait_for(chunks.get(), timeout=5)
+        first = await asyncio.wait_for(chunks.get(), timeout=5)
+        assert start["status"] == HTTPStatus.OK
+        assert json.loads(first["body"].removeprefix(b"data: "))["pinged_at"]
+
+        ping_broadcaster.publish(
+            [
+                ProbeResult(
+                    service_id=service_id,
+                    http_status=HTTPStatus.BAD_GATEWAY,
+                    response_time=timedelta(seconds=2),
+                    pinged_at=NOW + timedelta(seconds=5),
+                )
+            ]
+        )
+        pushed = await asyncio.wait_for(chunks.get(), timeout=5)
+        assert json.loads(pushed["body"].removeprefix(b"data: "))["http_response"] == (
+            HTTPStatus.BAD_GATEWAY
+        )
+        # Waiting for pings does not hold a thread
+        assert threading.active_count() <= threads + 1
+
+        disconnect.set()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(run())
+    assert ping_broadcaster.subscriber_count(service_id) == 0
+
+
+def test_stream_unknown_service(asgi_app: AsgiApp):
+    """Tests that streaming an unknown service falls back to the Flask 404 page"""
+    status, _ = asyncio.run(request(asgi_app, http_scope("/service/stream/404")))
+
+    assert status == HTTPStatus.NOT_FOUND
+    assert ping_broadcaster.subscriber_count(404) == 0
+
+
+def test_polling_requires_login(asgi_app: AsgiApp):
+    """Tests that the polling endpoint keeps the Flask login checks"""
+    scope = http_scope(
+        "/you/subscriptions/00000000-0000-0000-0000-000000000000/pings_since",
+        query_string=b"since=2025-06-09T00:00:00",
+    )
+    status, _ = asyncio.run(request(asgi_app, scope))
+
+    assert status == HTTPStatus.FOUND
+
+
+def test_polling_served_by_flask_view(
+    app: Flask,
+    asgi_app: AsgiApp,
+    client: FlaskClient,
+    user_alice: User,
+    is_alice_logged_in: Literal[True],
+    service_id: int,
+):
+    """Tests that the polling endpoint answers with the Flask view output"""
+    with app.app_context():
+        db.session.add(user_alice)
+        subscription = Subscription.subscribe_user_to_service(
+            user_alice, db.session.get(Service, service_id), "A Service"
+        )
+        uuid = subscription.uuid
+
+    cookie = client.get_cookie("session")
+    scope = http_scope(
+        f"/you/subscriptions/{uuid}/pings_since",
+        query_string=b"since=2025-06-09T00:00:00",
+        headers=[
+            (b"cookie", f"session={cookie.value}".encode()),
+            # Same user agent as the test client, or the strong session protection
+            # of Flask-Login would drop the session
+            (b"user-agent", f"Werkzeug/{version('werkzeug')}".encode()),
+        ],
+    )
+    status, body = asyncio.run(request(asgi_app, scope))
+
+    assert status == HTTPStatus.OK
+    assert json.loads(body)["status"] == [HTTPStatus.OK]
+
+
+def test_other_views_served_by_flask(asgi_app: AsgiApp):
+    """Tests that ordinary views go through the wrapped Flask application"""
+    status, body = asyncio.run(
+        request(asgi_app, http_scope("/api/subscriptions/heartbeat"))
+    )
+
+    assert status == HTTPStatus.OK
+    assert json.loads(body) == {"status": "ok"}
+
+
+def test_long_poll_waits_on_event_loop(
+    app: Flask,
+    asgi_app: AsgiApp,
+    client: FlaskClient,
+    user_alice: User,
+    is_alice_logged_in: Literal[True],
+    service_id: int,
+):
+    """Tests that the live chart long poll answers once a new ping is published"""
+    with app.app_context():
+        db.session.add(user_alice)
+        service = db.session.get(Service, service_id)
+        subscription = Subscription.subscribe_user_to_service(
+            user_alice, service, "A Service"
+        )
+        uuid = subscription.uuid
+        cursor = service.get_latest_ping().id
+
+    cookie = client.get_cookie("session")
+    scope = http_scope(
+        f"/you/subscriptions/{uuid}/pings/delta",
+        query_string=f"cursor={cursor}&wait=10".encode(),
+        headers=[
+            (b"cookie", f"session={cookie.value}".encode()),
+            (b"user-agent", f"Werkzeug/{version('werkzeug')}".encode()),
+        ],
+    )
+
+    async def run():
+        poll = asyncio.create_task(request(asgi_app, scope))
+        while ping_broadcaster.subscriber_count(service_id) == 0:
+            await asyncio.sleep(0.01)
+
+        with app.app_context():
+            db.session.get(Service, service_id).ping.add(
+                Ping(
+                    service_id=service_id,
+                    http_status=HTTPStatus.BAD_GATEWAY,
+                    response_time=timedelta(seconds=2),
+                    pinged_at=NOW + timedelta(seconds=5),
+                )
+            )
+            db.session.commit()
+        ping_broadcaster.publish(
+            [
+                ProbeResult(
+                    service_id=service_id,
+                    http_status=HTTPStatus.BAD_GATEWAY,
+                    response_time=timedelta(seconds=2),
+                    pinged_at=NOW + timedelta(seconds=5),
+                )
+            ]
+        )
+        return await asyncio.wait_for(poll, timeout=5)
+
+    status, body = asyncio.run(run())
+
+    assert status == HTTPStatus.OK
+    assert json.loads(body)["status"] == [HTTPStatus.BAD_GATEWAY]
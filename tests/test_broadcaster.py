@@ -0,0 +1,191 @@
+import json
+import time
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+import pytz
+from flask import Flask
+from flask.testing import FlaskClient
+
+from downtime_panda import create_app
+from downtime_panda.blueprints.service.models import Ping, Service
+from downtime_panda.blueprints.service.prober import ProbeResult
+from downtime_panda.config import TestingConfig
+from downtime_panda.extensions import db, latest_pings, ping_broadcaster, ping_writer
+
+NOW = datetime(2025, 6, 9, 10, 0, 0, tzinfo=pytz.utc)
+
+
+@pytest.fixture()
+def services(make_service) -> tuple[int, int]:
+    """IDs of a watched service, and of another one"""
+    watched = make_service()
+    other = make_service(uri="https://another.nonexistent.service")
+    return watched.id, other.id
+
+
+def probe_result(service_id: int, seconds: int = 0) -> ProbeResult:
+    return ProbeResult(
+        service_id=service_id,
+        http_status=HTTPStatus.OK,
+        response_time=timedelta(seconds=1),
+        pinged_at=NOW + timedelta(seconds=seconds),
+    )
+
+
+def test_writer_publishes_to_subscribers(app: Flask, services):
+    """Tests that every subscriber of a service receives its pings, and only those"""
+    watched_id, other_id = services
+    with app.app_context():
+        with (
+            ping_broadcaster.subscribe(watched_id) as first,
+            ping_broadcaster.subscribe(watched_id) as second,
+        ):
+            ping_writer.put_nowait(probe_result(other_id))
+            ping_writer.put_nowait(probe_result(watched_id))
+            ping_writer.flush()
+
+            for subscriber in (first, second):
+                assert subscriber.get(timeout=1)["pinged_at"] == NOW.isoformat()
+                assert subscriber.get(timeout=0) is None
+
+        assert ping_broadcaster.subscriber_count(watched_id) == 0
+
+
+def test_slow_subscriber_drops_oldest_pings(app: Flask, services):
+    """Tests that a subscriber falling behind keeps only the newest pings"""
+    watched_id, _ = services
+    with ping_broadcaster.subscribe(watched_id) as subscriber:
+        results = [probe_result(watched_id, seconds) for seconds in range(150)]
+        ping_broadcaster.publish(results)
+
+        received = []
+        while (ping := subscriber.get(timeout=0)) is not None:
+            received.append(ping)
+
+    assert received == [result.to_dict() for result in results[-100:]]
+
+
+def test_stream_does_not_query_pings(
+    app: Flask, client: FlaskClient, capture_queries, services
+):
+    """Tests that the SSE stream pushes new pings without querying the database"""
+    watched_id, _ = services
+    with app.app_context():
+        db.session.get(Service, watched_id).ping.add(
+            Ping(
+                service_id=watched_id,
+                http_status=HTTPStatus.OK,
+                response_time=timedelta(seconds=1),
+                pinged_at=NOW,
+            )
+        )
+        db.session.commit()
+
+    response = client.get(f"/service/stream/{watched_id}", buffered=False)
+    chunks = iter(response.response)
+    assert json.loads(next(chunks).removeprefix(b"data: "))["http_response"] == 200
+
+    ping_broadcaster.publish([probe_result(watched_id, seconds=5)])
+    with capture_queries("SELECT") as queries:
+        chunk = next(chunks)
+
+    assert (
+        json.loads(chunk.removeprefix(b"data: "))
+        == probe_result(watched_id, seconds=5).to_dict()
+    )
+    assert queries == []
+
+    response.close()
+    assert ping_broadcaster.subscriber_count(watched_id) == 0
+
+
+@pytest.fixture()
+def polling_app(tmp_path):
+    """An application polling for new pings, on a database shared between connections"""
+
+    class PollingConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'dtpanda.db'}"
+        PING_BROADCAST_POLL_INTERVAL = 0.05
+
+    app = create_app(PollingConfig)
+    with app.app_context():
+        db.create_all()
+    # Pings are only polled for while no ping writer runs in the process
+    ping_writer.shutdown()
+
+    yield app
+
+    ping_broadcaster.poll_interval = 0
+    if ping_broadcaster._bridge is not None:
+        ping_broadcaster._bridge.join()
+
+
+def test_pings_of_other_processes_are_polled(polling_app: Flask):
+    """Tests that pings saved by another process reach the subscribers, and refresh the cache"""
+    with polling_app.app_context():
+        service = Service("https://random.nonexistent.service")
+        db.session.add(service)
+        db.session.commit()
+        latest_pings.fill(
+            service.id,
+            {"http_response": 200, "response_time": 1.0, "pinged_at": NOW.isoformat()},
+        )
+
+        with ping_broadcaster.subscribe(service.id) as subscriber:
+            # Let the poller find the newest ping before this one is saved
+            time.sleep(0.2)
+            # Saved by the prober process: neither published nor cached by this one
+            ping = Ping(
+                service_id=service.id,
+                http_status=HTTPStatus.BAD_GATEWAY,
+                response_time=timedelta(seconds=1),
+                pinged_at=NOW + timedelta(seconds=5),
+            )
+            db.session.add(ping)
+            db.session.commit()
+            latest_pings.fill(
+                service.id,
+                {
+                    "http_response": 200,
+                    "response_time": 1.0,
+                    "pinged_at": NOW.isoformat(),
+                },
+            )
+
+            received = subscriber.get(timeout=5)
+
+        assert received is not None
+        assert received["id"] == ping.id
+        assert service.get_latest_ping().http_response == HTTPStatus.BAD_GATEWAY
+
+
+def test_pings_committed_out_of_order_are_polled(polling_app: Flask):
+    """Tests that a ping committed after one with a higher ID still reaches the subscribers"""
+    with polling_app.app_context():
+        service = Service("https://random.nonexistent.service")
+        db.session.add(service)
+        db.session.commit()
+
+        with ping_broadcaster.subscribe(service.id) as subscriber:
+            received = []
+            # Another prober draws ID 5 first, but commits after ID 10
+            for id in (10, 5):
+                # Let the poller find the newest ping before this one is saved
+                time.sleep(0.2)
+                ping = Ping(
+                    service_id=service.id,
+                    http_status=HTTPStatus.OK,
+                    response_time=timedelta(seconds=1),
+                    pinged_at=datetime.now(pytz.utc),
+                )
+                ping.id = id
+                db.session.add(ping)
+                db.session.commit()
+                received.append(subscriber.get(timeout=5))
+
+            time.sleep(0.2)
+            assert subscriber.get(timeout=0) is None
+
+        assert [ping["id"] for ping in received] == [10, 5]
@@ -0,0 +1,168 @@
+import os
+
+import pytest
+from flask import Flask
+from flask_migrate import upgrade
+from sqlalchemy import inspect, text
+
+from downtime_panda import cli, create_app
+from downtime_panda.blueprints.service.dispatcher import DISPATCHER_JOB_ID
+from downtime_panda.blueprints.service.models import ProberLease
+from downtime_panda.cli import UNVERSIONED_REVISION, start_prober, stop_prober
+from downtime_panda.config import TestingConfig
+from downtime_panda.extensions import db, ping_writer, prober, prober_shard, scheduler
+
+# Same format as DTPANDA_DB_URL; the database is wiped by the tests
+POSTGRESQL_URL = os.getenv("DTPANDA_TEST_DB_URL")
+
+
+def file_app(tmp_path) -> Flask:
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'dtpanda.db'}"
+
+    return create_app(FileConfig)
+
+
+def alembic_version(app: Flask) -> str:
+    with app.app_context():
+        return db.session.execute(
+            text("SELECT version_num FROM alembic_version")
+        ).scalar()
+
+
+def test_create_app_does_not_touch_database(tmp_path, monkeypatch):
+    """Tests that the application boots without connecting to the database, nor probing"""
+    # As when serving outside of the debug mode, or from the reloader process
+    monkeypatch.setenv("WERKZEUG_RUN_MAIN", "true")
+    file_app(tmp_path)
+
+    assert not (tmp_path / "dtpanda.db").exists()
+    assert not scheduler.running
+
+
+def test_schema_init_empty_database(tmp_path):
+    """Tests that the migrations create the whole schema of an empty database"""
+    app = file_app(tmp_path)
+
+    result = app.test_cli_runner().invoke(args=["schema", "init"])
+
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        tables = set(inspect(db.engine).get_table_names())
+    assert {"user", "service", "subscription", "ping", "api_token"} <= tables
+    assert alembic_version(app) is not None
+
+
+def test_schema_matches_models(tmp_path):
+    """Tests that the migrated schema matches the models, as checked by `flask db check`"""
+    app = file_app(tmp_path)
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=["schema", "init"]).exit_code == 0
+
+    result = runner.invoke(args=["db", "check"])
+
+    assert result.exit_code == 0, result.output
+
+
+@pytest.mark.postgresql
+def test_schema_init_without_statement_timeout():
+    """Tests that the migrations are not bound by the statement timeout of the app"""
+    if not POSTGRESQL_URL:
+        pytest.skip("DTPANDA_TEST_DB_URL is not set")
+
+    class PostgreSQLConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"postgresql+psycopg://{POSTGRESQL_URL}"
+        DB_STATEMENT_TIMEOUT = 1
+
+    app = create_app(PostgreSQLConfig)
+    try:
+        with app.app_context():
+            db.session.execute(text("DROP SCHEMA public CASCADE"))
+            db.session.execute(text("CREATE SCHEMA public"))
+            db.session.commit()
+
+        result = app.test_cli_runner().invoke(args=["schema", "init"])
+
+        assert result.exit_code == 0, result.output
+        with app.app_context():
+            timeout = db.session.execute(text("SHOW statement_timeout")).scalar()
+            assert timeout == "1ms"
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+def test_schema_init_unversioned_database(tmp_path):
+    """Tests that a schema created without migrations is stamped, then migrated"""
+    app = file_app(tmp_path)
+    with app.app_context():
+        # The schema older versions created at boot, without versioning it
+        upgrade(revision=UNVERSIONED_REVISION)
+        db.session.execute(text("DROP TABLE alembic_version"))
+        db.session.execute(text("INSERT INTO service (uri) VALUES ('https://legacy')"))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["schema", "init"])
+    assert result.exit_code == 0, result.output
+    version = alembic_version(app)
+    assert version != UNVERSIONED_REVISION
+    with app.app_context():
+        columns = {c["name"] for c in inspect(db.engine).get_columns("service")}
+        assert {"next_probe_at", "probe_interval", "adaptive_interval"} <= columns
+        ping_columns = {c["name"] for c in inspect(db.engine).get_columns("ping")}
+        assert "first_byte_time" in ping_columns
+        assert db.session.execute(text("SELECT uri FROM service")).scalar() == (
+            "https://legacy"
+        )
+
+    # Running it again is a no-op
+    result = app.test_cli_runner().invoke(args=["schema", "init"])
+    assert result.exit_code == 0, result.output
+    assert alembic_version(app) == version
+
+
+def test_start_prober(tmp_path):
+    """Tests that the prober starts probing, and takes its lease while running"""
+    app = file_app(tmp_path)
+    app.test_cli_runner().invoke(args=["schema", "init"])
+
+    start_prober(app)
+    try:
+        assert scheduler.running
+        assert prober.running
+        assert ping_writer.running
+        assert scheduler.get_job(DISPATCHER_JOB_ID) is not None
+        with app.app_context():
+            assert db.session.get(ProberLease, prober_shard.prober_id) is not None
+    finally:
+        stop_prober()
+
+    with app.app_context():
+        assert db.session.get(ProberLease, prober_shard.prober_id) is None
+
+    assert not scheduler.running
+    assert not prober.running
+    assert not ping_writer.running
+
+
+def test_prober_run(tmp_path, monkeypatch):
+    """Tests that `flask prober run` probes until stopped, then saves the queued pings"""
+    app = file_app(tmp_path)
+    app.test_cli_runner().invoke(args=["schema", "init"])
+    seen = {}
+
+    def stop_right_away():
+        seen.update(
+            scheduler=scheduler.running,
+            prober=prober.running,
+            concurrency=prober.concurrency,
+        )
+
+    monkeypatch.setattr(cli, "_wait_for_shutdown", stop_right_away)
+    result = app.test_cli_runner().invoke(args=["prober", "run", "--concurrency", "7"])
+
+    assert result.exit_code == 0, result.output
+    assert seen == {"scheduler": True, "prober": True, "concurrency": 7}
+    assert not scheduler.running
+    assert not prober.running
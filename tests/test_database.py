@@ -0,0 +1,64 @@
+from http import HTTPStatus
+
+from flask import url_for
+from sqlalchemy import text
+
+from downtime_panda import create_app
+from downtime_panda.config import Config, TestingConfig
+from downtime_panda.database import InstrumentedQueuePool, engine_options
+from downtime_panda.extensions import db
+
+
+def pool_config(uri: str, **overrides) -> dict:
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    return {**config, "SQLALCHEMY_DATABASE_URI": uri, **overrides}
+
+
+def test_engine_options_postgresql():
+    """Tests that the configured pool, and statement timeout, reach the engine"""
+    options = engine_options(
+        pool_config(
+            "postgresql+psycopg://user:pw@db/dtpanda",
+            DB_POOL_SIZE=4,
+            DB_POOL_MAX_OVERFLOW=2,
+            DB_STATEMENT_TIMEOUT=5000,
+        )
+    )
+
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (4, 2)
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+def test_engine_options_in_memory_sqlite():
+    """Tests that in-memory SQLite keeps the single connection of its static pool"""
+    assert engine_options(pool_config("sqlite:///:memory:")) == {}
+
+
+def test_shared_pool_metrics(tmp_path):
+    """Tests that the application pool reports its usage"""
+
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'dtpanda.db'}"
+        DB_POOL_SIZE = 1
+        DB_POOL_MAX_OVERFLOW = 1
+        METRICS_ENABLED = True
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        assert isinstance(db.engine.pool, InstrumentedQueuePool)
+
+        with db.engine.connect() as first, db.engine.connect() as second:
+            first.execute(text("SELECT 1"))
+            second.execute(text("SELECT 1"))
+            assert db.engine.pool.checkedout() == 2
+
+    with app.test_request_context():
+        response = app.test_client().get(url_for("home.get_pool_metrics"))
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json["db_pool_size"] == 1
+    assert response.json["db_pool_checked_out"] == 0
+    assert response.json["db_pool_checkout_seconds"]["count"] >= 2
+    assert response.json["db_pool_overflow_total"] >= 1
@@ -0,0 +1,122 @@
+import asyncio
+import socket
+
+import pytest
+from aiohttp.abc import AbstractResolver
+
+from downtime_panda.blueprints.service.dns import CachingResolver
+
+
+class _CountingResolver(AbstractResolver):
+    """Answers every host with a single address, counting the lookups"""
+
+    def __init__(self, fail: bool = False, delay: float = 0):
+        self.fail = fail
+        self.delay = delay
+        self.lookups = 0
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        self.lookups += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [
+            {
+                "hostname": host,
+                "host": "192.0.2.1",
+                "port": port,
+                "family": family,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST,
+            }
+        ]
+
+    async def close(self):
+        pass
+
+
+def test_cache_hits_until_ttl():
+    """Tests that a host is resolved once, then again only once its answer expired"""
+    upstream = _CountingResolver()
+    cache = CachingResolver(upstream, ttl=0.2)
+
+    async def run():
+        for _ in range(5):
+            await cache.resolve("example.com", 443)
+        await asyncio.sleep(0.25)
+        await cache.resolve("example.com", 443)
+
+    asyncio.run(run())
+
+    assert upstream.lookups == 2
+
+
+def test_concurrent_lookups_share_a_query():
+    """Tests that probes resolving the same host at once wait for a single query"""
+    upstream = _CountingResolver(delay=0.05)
+    cache = CachingResolver(upstream)
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.resolve("example.com", 443) for _ in range(20))
+        )
+
+    results = asyncio.run(run())
+
+    assert upstream.lookups == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_failures_are_cached():
+    """Tests that a host that cannot be resolved is not queried again right away"""
+    upstream = _CountingResolver(fail=True)
+    cache = CachingResolver(upstream, negative_ttl=60)
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(socket.gaierror):
+                await cache.resolve("nowhere.invalid", 443)
+
+    asyncio.run(run())
+
+    assert upstream.lookups == 1
+
+
+def test_cache_is_bounded():
+    """Tests that the least recently used hosts are evicted past the size of the cache"""
+    upstream = _CountingResolver()
+    cache = CachingResolver(upstream, max_size=2)
+
+    async def run():
+        await cache.resolve("a.example", 443)
+        await cache.resolve("b.example", 443)
+        await cache.resolve("a.example", 443)
+        await cache.resolve("c.example", 443)
+        # b.example was the least recently used one
+        await cache.resolve("a.example", 443)
+        await cache.resolve("b.example", 443)
+
+    asyncio.run(run())
+
+    assert upstream.lookups == 4
+
+
+def test_busy_host_is_refreshed_ahead():
+    """Tests that a host still in use is resolved again before its answer expires"""
+    upstream = _CountingResolver()
+    cache = CachingResolver(upstream, ttl=0.5)
+
+    async def run():
+        await cache.resolve("example.com", 443)
+        await asyncio.sleep(0.42)
+        # Still answered from the cache, while refreshing it in the background
+        await cache.resolve("example.com", 443)
+        await asyncio.sleep(0.01)
+        assert upstream.lookups == 2
+
+        await asyncio.sleep(0.15)
+        await cache.resolve("example.com", 443)
+
+    asyncio.run(run())
+
+    assert upstream.lookups == 2
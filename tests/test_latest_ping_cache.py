@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+import pytz
+from flask import Flask
+
+from downtime_panda.blueprints.service.cache import MemoryBackend, RedisBackend
+from downtime_panda.blueprints.service.models import Ping, Service
+from downtime_panda.blueprints.service.prober import ProbeResult
+from downtime_panda.extensions import db, latest_pings, ping_writer
+
+NOW = datetime(2025, 6, 9, 10, 0, 0, tzinfo=pytz.utc)
+
+
+def test_writer_updates_cache(app: Flask, capture_queries, service: Service):
+    """Tests that the latest ping saved by the writer is read without a query"""
+    with app.app_context():
+        db.session.add(service)
+        for seconds, status in ((0, HTTPStatus.OK), (5, HTTPStatus.BAD_GATEWAY)):
+            ping_writer.put_nowait(
+                ProbeResult(
+                    service_id=service.id,
+                    http_status=status,
+                    response_time=timedelta(seconds=1),
+                    pinged_at=NOW + timedelta(seconds=seconds),
+                )
+            )
+        ping_writer.flush()
+
+        with capture_queries("FROM ping") as queries:
+            latest = service.get_latest_ping()
+        assert queries == []
+        assert latest.http_response == HTTPStatus.BAD_GATEWAY
+        assert latest.pinged_at == NOW + timedelta(seconds=5)
+
+
+def test_late_save_keeps_newer_ping(app: Flask, service: Service):
+    """Tests that a probe saved after a newer ping does not replace it in the cache"""
+    with app.app_context():
+        db.session.add(service)
+        for seconds in (0, 5, 10, 7):
+            ping_writer.put_nowait(
+                ProbeResult(
+                    service_id=service.id,
+                    http_status=HTTPStatus.OK
+                    if seconds != 7
+                    else HTTPStatus.BAD_GATEWAY,
+                    response_time=timedelta(seconds=1),
+                    pinged_at=NOW + timedelta(seconds=seconds),
+                )
+            )
+            if seconds == 10:
+                ping_writer.flush()
+        ping_writer.flush()
+
+        latest = service.get_latest_ping()
+        assert latest.pinged_at == NOW + timedelta(seconds=10)
+        assert latest.http_response == HTTPStatus.OK
+
+
+def test_cache_miss_reads_through(app: Flask, capture_queries, service: Service):
+    """Tests that a miss is served from the database, then from the cache"""
+    with app.app_context():
+        db.session.add(service)
+        service.ping.add(
+            Ping(
+                service_id=service.id,
+                http_status=HTTPStatus.OK,
+                response_time=timedelta(seconds=1),
+                pinged_at=NOW,
+            )
+        )
+        db.session.commit()
+
+        with capture_queries("FROM ping") as queries:
+            service.get_latest_ping()
+        assert len(queries) == 1
+
+        with capture_queries("FROM ping") as queries:
+            service.get_latest_ping()
+        assert queries == []
+
+
+def test_orm_insert_invalidates_cache(app: Flask, service: Service):
+    """Tests that a ping saved through the ORM is not hidden by a stale entry"""
+    with app.app_context():
+        db.session.add(service)
+        latest_pings.fill(
+            service.id,
+            {"http_response": 500, "response_time": 1.0, "pinged_at": NOW.isoformat()},
+        )
+        service.ping.add(
+            Ping(
+                service_id=service.id,
+                http_status=HTTPStatus.OK,
+                response_time=timedelta(seconds=1),
+                pinged_at=NOW + timedelta(seconds=5),
+            )
+        )
+        db.session.commit()
+
+        assert service.get_latest_ping().http_response == HTTPStatus.OK
+
+
+def test_service_deletion_invalidates_cache(app: Flask, service: Service):
+    """Tests that deleting a service drops its cached latest ping"""
+    with app.app_context():
+        db.session.add(service)
+        latest_pings.fill(
+            service.id,
+            {"http_response": 200, "response_time": 1.0, "pinged_at": NOW.isoformat()},
+        )
+
+        db.session.delete(service)
+        db.session.commit()
+
+        assert latest_pings.get(service.id) is None
+
+
+def test_database_reads_expire_sooner(
+    app: Flask, service: Service, monkeypatch: pytest.MonkeyPatch
+):
+    """Tests that a ping read from the database is kept for the read TTL only, unlike a saved one"""
+    clock = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: clock[0])
+    read_ttl = app.config["LATEST_PING_CACHE_READ_TTL"]
+    with app.app_context():
+        db.session.add(service)
+        latest_pings.fill(
+            service.id,
+            {"http_response": 200, "response_time": 1.0, "pinged_at": NOW.isoformat()},
+        )
+        clock[0] += read_ttl + 1
+        assert latest_pings.get(service.id) is None
+
+        latest_pings.update(
+            [
+                ProbeResult(
+                    service_id=service.id,
+                    http_status=HTTPStatus.OK,
+                    response_time=timedelta(seconds=1),
+                    pinged_at=NOW,
+                )
+            ]
+        )
+        clock[0] += read_ttl + 1
+        assert latest_pings.get(service.id) is not None
+
+
+def test_memory_backend_expires_entries(monkeypatch: pytest.MonkeyPatch):
+    """Tests that memory entries expire after their TTL, and `add` never overwrites"""
+    clock = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: clock[0])
+    backend = MemoryBackend(ttl=10)
+
+    backend.set_many({1: {"http_response": 200}})
+    backend.add(1, {"http_response": 500})
+    assert backend.get_many([1, 2]) == {1: {"http_response": 200}}
+
+    clock[0] += 11
+    assert backend.get_many([1]) == {}
+
+    backend.add(1, {"http_response": 500})
+    assert backend.get_many([1]) == {1: {"http_response": 500}}
+
+
+def test_redis_backend():
+    """Tests the Redis backend against an in-process Redis stand-in"""
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisBackend(fakeredis.FakeRedis(), ttl=10)
+
+    backend.set_many({1: {"http_response": 200}, 2: {"http_response": 404}})
+    backend.add(1, {"http_response": 500})
+    backend.delete(2)
+
+    assert backend.get_many([1, 2, 3]) == {1: {"http_response": 200}}
+
+    newer = {"http_response": 200, "pinged_at": NOW.isoformat()}
+    older = {
+        "http_response": 500,
+        "pinged_at": (NOW - timedelta(seconds=1)).isoformat(),
+    }
+    backend.set_many({3: newer})
+    backend.set_many({3: older})
+    assert backend.get_many([3]) == {3: newer}
+    assert backend.client.ttl(f"{RedisBackend.KEY_PREFIX}1") == 10
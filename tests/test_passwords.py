@@ -0,0 +1,140 @@
+import os
+from http import HTTPStatus
+
+import pytest
+from flask import Flask, url_for
+from flask.testing import FlaskClient
+
+from downtime_panda.blueprints.user.models import User
+from downtime_panda.extensions import db, password_hasher
+from downtime_panda.metrics import metrics
+from downtime_panda.passwords import PasswordHashingBusy, PasswordHashingPool
+
+
+def test_hashing_in_worker_process(app: Flask):
+    """Tests hashing and verifying passwords in a worker process"""
+    app.config["PASSWORD_HASH_WORKERS"] = 1
+    pool = PasswordHashingPool(app)
+    try:
+        password_hash = pool.hash("password")
+
+        assert pool.verify(password_hash, "password")
+        assert not pool.verify(password_hash, "wrong password")
+        assert not pool.verify("not a hash", "password")
+        assert pool.in_flight() == 0
+    finally:
+        pool.shutdown()
+
+
+def test_dead_worker_replaced(app: Flask):
+    """Tests that a worker dying mid-hash is reported as busy, and the pool started again"""
+    app.config["PASSWORD_HASH_WORKERS"] = 1
+    pool = PasswordHashingPool(app)
+    try:
+        with pytest.raises(PasswordHashingBusy):
+            pool._run("hash", os._exit, 1)
+
+        assert pool.verify(pool.hash("password"), "password")
+    finally:
+        pool.shutdown()
+
+
+def test_failed_submit_frees_slot(app: Flask, monkeypatch: pytest.MonkeyPatch):
+    """Tests that a hash never handed to a worker gives its slot back"""
+    app.config["PASSWORD_HASH_WORKERS"] = 1
+    pool = PasswordHashingPool(app)
+    try:
+
+        def submit(*args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+        monkeypatch.setattr(pool._get_executor(), "submit", submit)
+        with pytest.raises(RuntimeError):
+            pool.hash("password")
+
+        assert pool.in_flight() == 0
+    finally:
+        pool.shutdown()
+
+
+def test_hashing_queue_limit(app: Flask):
+    """Tests that hashes past the queue limit are refused right away"""
+    rejected = metrics.counter("password_hash_rejected_total", op="hash")
+    before = rejected.value
+    for _ in range(password_hasher.limit):
+        assert password_hasher._acquire()
+
+    try:
+        with pytest.raises(PasswordHashingBusy):
+            password_hasher.hash("password")
+    finally:
+        for _ in range(password_hasher.limit):
+            password_hasher._release()
+
+    assert rejected.value == before + 1
+    assert password_hasher.hash("password")
+
+
+def test_login_busy(app: Flask, client: FlaskClient, user_alice: User):
+    """Tests that a login during a login storm is answered with a 503"""
+    for _ in range(password_hasher.limit):
+        password_hasher._acquire()
+
+    try:
+        with app.test_request_context():
+            response = client.post(
+                url_for("auth.login"),
+                data={"email": "alice@mail.com", "password": "password"},
+            )
+    finally:
+        for _ in range(password_hasher.limit):
+            password_hasher._release()
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"]
+
+
+def test_rehash_on_new_parameters(app: Flask, user_alice: User):
+    """Tests that passwords are rehashed at login once the Argon2 parameters change"""
+    password_hasher.parameters = (1, 1024, 1)
+    with app.app_context():
+        db.session.add(user_alice)
+
+        assert user_alice.verify_password("password")
+        assert "m=1024,t=1,p=1" in user_alice.password_hash
+        assert user_alice.verify_password("password")
+
+
+def test_metrics_endpoint(app: Flask, client: FlaskClient, user_alice: User):
+    """Tests that hash latencies are exposed on the metrics endpoint, once enabled"""
+    app.config["METRICS_ENABLED"] = True
+    with app.test_request_context():
+        response = client.get(url_for("home.get_metrics"))
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json['password_hash_seconds{op="hash"}']["count"] >= 1
+    assert response.json["password_hash_in_flight"] == 0
+
+    app.config["METRICS_ENABLED"] = False
+    with app.test_request_context():
+        assert client.get(url_for("home.get_metrics")).status_code == (
+            HTTPStatus.NOT_FOUND
+        )
+
+
+def test_metrics_token(app: Flask, client: FlaskClient):
+    """Tests that the metrics require the metrics token, when one is configured"""
+    app.config["METRICS_ENABLED"] = True
+    app.config["METRICS_TOKEN"] = "metrics-secret"
+    with app.test_request_context():
+        url = url_for("home.get_metrics")
+
+    assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+    assert (
+        client.get(url, headers={"Authorization": "Bearer wrong"}).status_code
+        == HTTPStatus.UNAUTHORIZED
+    )
+    assert (
+        client.get(url, headers={"Authorization": "Bearer metrics-secret"}).status_code
+        == HTTPStatus.OK
+    )
@@ -0,0 +1,129 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+import pytz
+from flask import Flask, url_for
+from flask.testing import FlaskClient
+
+from downtime_panda.blueprints.token.models import APIToken
+from downtime_panda.extensions import db
+
+NOW = datetime(2025, 6, 9, 10, 0, 0, tzinfo=pytz.utc)
+
+
+@pytest.fixture()
+def service_pings() -> list[tuple]:
+    """5 pings, 5 seconds apart, the first one failed"""
+    return [
+        (
+            NOW + timedelta(seconds=seconds),
+            HTTPStatus.OK if seconds else HTTPStatus.BAD_GATEWAY,
+            0.25,
+        )
+        for seconds in range(0, 25, 5)
+    ]
+
+
+def export(
+    app: Flask, client: FlaskClient, token: APIToken, uuid: str, headers=None, **args
+):
+    with app.test_request_context():
+        db.session.add(token)
+        url = url_for("subscription_api.export_pings", uuid=uuid, **args)
+        authorization = f"Bearer {token.token}"
+    return client.get(url, headers={"Authorization": authorization, **(headers or {})})
+
+
+def test_export_ndjson(
+    app: Flask, client: FlaskClient, alice_token: APIToken, subscription_uuid: str
+):
+    """Tests that the default export has a JSON object per ping, oldest first"""
+    response = export(app, client, alice_token, subscription_uuid)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 5
+    assert rows[0] == {
+        "pinged_at": NOW.isoformat(),
+        "http_response": HTTPStatus.BAD_GATEWAY,
+        "response_time": 0.25,
+    }
+
+
+def test_export_csv_range(
+    app: Flask, client: FlaskClient, alice_token: APIToken, subscription_uuid: str
+):
+    """Tests the CSV export of a time range, the end being excluded"""
+    response = export(
+        app,
+        client,
+        alice_token,
+        subscription_uuid,
+        format="csv",
+        since=(NOW + timedelta(seconds=5)).isoformat(),
+        until=(NOW + timedelta(seconds=15)).isoformat(),
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.mimetype == "text/csv"
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows == [
+        ["pinged_at", "http_response", "response_time"],
+        [(NOW + timedelta(seconds=5)).isoformat(), "200", "0.25"],
+        [(NOW + timedelta(seconds=10)).isoformat(), "200", "0.25"],
+    ]
+
+
+def test_export_gzip_in_batches(
+    app: Flask,
+    client: FlaskClient,
+    capture_queries,
+    alice_token: APIToken,
+    subscription_uuid: str,
+):
+    """Tests that pings are read in batches, and gzipped when the client accepts it"""
+    app.config["PING_EXPORT_BATCH_SIZE"] = 2
+    with capture_queries("FROM ping") as queries:
+        response = export(
+            app,
+            client,
+            alice_token,
+            subscription_uuid,
+            headers={"Accept-Encoding": "gzip"},
+        )
+        data = response.get_data()
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.content_encoding == "gzip"
+    assert len(gzip.decompress(data).splitlines()) == 5
+    yield_per = [query.context.execution_options.get("yield_per") for query in queries]
+    assert yield_per == [2]
+
+
+def test_export_errors(
+    app: Flask, client: FlaskClient, alice_token: APIToken, subscription_uuid: str
+):
+    """Tests that unknown formats, bad ranges and missing subscriptions are refused"""
+    assert (
+        export(app, client, alice_token, subscription_uuid, format="xml").status_code
+        == HTTPStatus.BAD_REQUEST
+    )
+    assert (
+        export(
+            app, client, alice_token, subscription_uuid, since="yesterday"
+        ).status_code
+        == HTTPStatus.BAD_REQUEST
+    )
+    assert (
+        export(
+            app, client, alice_token, "00000000-0000-0000-0000-000000000000"
+        ).status_code
+        == HTTPStatus.NOT_FOUND
+    )
@@ -0,0 +1,77 @@
+"""
+Checks, through `EXPLAIN QUERY PLAN`, that every ping read path is served by one
+of the per-service ping indexes instead of scanning and sorting the table.
+"""
+
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+from flask import Flask
+
+from downtime_panda.blueprints.service.models import Service
+from downtime_panda.extensions import db
+
+SINCE = datetime(2025, 6, 9, 0, 0, 0)
+
+PINGED_AT_INDEX = "ix_ping_service_id_pinged_at"
+ID_INDEX = "ix_ping_service_id_id"
+
+READ_PATHS = {
+    "get_latest_ping": (lambda service: service.get_latest_ping(), PINGED_AT_INDEX),
+    "get_latest_n_pings": (
+        lambda service: service.get_latest_n_pings(20),
+        PINGED_AT_INDEX,
+    ),
+    "get_pings_since": (
+        lambda service: service.get_pings_since(SINCE),
+        PINGED_AT_INDEX,
+    ),
+    "get_pings_after": (
+        lambda service: service.get_pings_after(SINCE),
+        PINGED_AT_INDEX,
+    ),
+    "get_max_ping_id": (lambda service: service.get_max_ping_id(), ID_INDEX),
+    "get_pings_after_id": (
+        lambda service: service.get_pings_after_id(1, 20),
+        ID_INDEX,
+    ),
+}
+
+
+def query_plan(statement: str, parameters) -> str:
+    rows = db.session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters
+    )
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.fixture()
+def service_with_pings(make_service) -> Service:
+    """A service with a few pings, next to another service with its own pings"""
+    pings = [
+        (SINCE + timedelta(minutes=minutes), HTTPStatus.OK, 1) for minutes in range(10)
+    ]
+    service = make_service(pings)
+    make_service(pings, uri="https://another.nonexistent.service")
+    return service
+
+
+@pytest.mark.parametrize(
+    ("read_path", "index"), READ_PATHS.values(), ids=READ_PATHS.keys()
+)
+def test_read_path_uses_ping_index(
+    app: Flask, capture_queries, service_with_pings: Service, read_path, index: str
+):
+    """Tests that the read path neither scans the ping table nor sorts its results"""
+    with app.app_context():
+        db.session.add(service_with_pings)
+
+        with capture_queries("FROM ping") as queries:
+            read_path(service_with_pings)
+
+        assert queries
+        for query in queries:
+            plan = query_plan(query.statement, query.parameters)
+            assert index in plan
+            assert "TEMP B-TREE" not in plan
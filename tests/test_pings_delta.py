@@ -0,0 +1,211 @@
+import time
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from typing import Literal
+from uuid import UUID
+
+import pytest
+import pytz
+from flask import Flask, url_for
+from flask.testing import FlaskClient
+
+from downtime_panda.blueprints.service.models import Ping
+from downtime_panda.blueprints.service.prober import ProbeResult
+from downtime_panda.blueprints.subscription.models import Subscription
+from downtime_panda.blueprints.subscription.series import BINARY_HEADER
+from downtime_panda.extensions import db, ping_writer
+
+NOW = datetime(2025, 6, 9, 10, 0, 0, tzinfo=pytz.utc)
+
+
+@pytest.fixture()
+def service_pings() -> list[tuple]:
+    """3 pings, 5 seconds apart"""
+    return [
+        (NOW + timedelta(seconds=seconds * 5), HTTPStatus.OK, 1) for seconds in range(3)
+    ]
+
+
+def save_ping(app: Flask, subscription_uuid: str, seconds: int) -> None:
+    with app.app_context():
+        service_id = db.session.scalar(
+            db.select(Subscription.service_id).filter_by(uuid=UUID(subscription_uuid))
+        )
+        ping_writer.put_nowait(
+            ProbeResult(
+                service_id=service_id,
+                http_status=HTTPStatus.BAD_GATEWAY,
+                response_time=timedelta(seconds=2),
+                pinged_at=NOW + timedelta(seconds=seconds),
+            )
+        )
+        ping_writer.flush()
+
+
+def get_delta(app: Flask, client: FlaskClient, uuid: str, headers=None, **args):
+    with app.test_request_context():
+        url = url_for("subscription.get_subscription_pings_delta", uuid=uuid, **args)
+    return client.get(url, headers=headers or {})
+
+
+def test_delta_without_cursor(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: Literal[True],
+    subscription_uuid: str,
+):
+    """Tests that the first request returns the latest pings, and a cursor"""
+    response = get_delta(app, client, subscription_uuid)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json["status"] == [HTTPStatus.OK] * 3
+    assert response.headers["ETag"] == f'"{response.json["cursor"]}"'
+
+
+def test_delta_returns_only_new_pings(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: Literal[True],
+    subscription_uuid: str,
+):
+    """Tests that a client only receives the pings saved after its cursor"""
+    cursor = get_delta(app, client, subscription_uuid).json["cursor"]
+    save_ping(app, subscription_uuid, seconds=15)
+
+    response = get_delta(app, client, subscription_uuid, cursor=cursor)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json["status"] == [HTTPStatus.BAD_GATEWAY]
+    assert response.json["cursor"] > cursor
+
+
+def test_delta_returns_late_pings(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: Literal[True],
+    subscription_uuid: str,
+):
+    """Tests that a ping saved after the cursor is sent even if it was probed before it"""
+    cursor = get_delta(app, client, subscription_uuid).json["cursor"]
+    # A slow probe, started before the latest ping, but saved after it
+    save_ping(app, subscription_uuid, seconds=7)
+
+    response = get_delta(app, client, subscription_uuid, cursor=cursor)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json["status"] == [HTTPStatus.BAD_GATEWAY]
+    assert response.json["cursor"] > cursor
+
+
+def test_delta_binary(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: Literal[True],
+    subscription_uuid: str,
+):
+    """Tests that the series is sent as typed arrays when the client accepts them"""
+    cursor = get_delta(app, client, subscription_uuid).json["cursor"]
+    save_ping(app, subscription_uuid, seconds=15)
+
+    response = get_delta(
+        app,
+        client,
+        subscription_uuid,
+        headers={"Accept": "application/octet-stream"},
+        cursor=cursor,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.mimetype == "application/octet-stream"
+    assert "Accept" in response.vary
+    count, _, _, new_cursor = BINARY_HEADER.unpack_from(response.data)
+    assert count == 1
+    assert new_cursor > cursor
+    assert response.headers["ETag"] == f'"{int(new_cursor)}"'
+    status_offset = BINARY_HEADER.size + 12 * count
+    assert response.data[status_offset:] == HTTPStatus.BAD_GATEWAY.to_bytes(2, "little")
+
+
+def test_delta_not_modified_with_a_single_lookup(
+    app: Flask,
+    client: FlaskClient,
+    capture_queries,
+    is_alice_logged_in: Literal[True],
+    subscription_uuid: str,
+):
+    """Tests that an up to date client gets a 304 after a lookup of the highest ping ID"""
+    cursor = get_delta(app, client, subscription_uuid).json["cursor"]
+
+    with capture_queries("FROM ping") as queries:
+        by_cursor = get_delta(app, client, subscription_uuid, cursor=cursor)
+        by_etag = get_delta(
+            app, client, subscription_uuid, headers={"If-None-Match": f'"{cursor}"'}
+        )
+
+    assert by_cursor.status_code == HTTPStatus.NOT_MODIFIED
+    assert by_etag.status_code == HTTPStatus.NOT_MODIFIED
+    assert [query.statement.startswith("SELECT max(ping.id)") for query in queries] == [
+        True,
+        True,
+    ]
+
+
+def test_delta_rescans_pings_committed_late(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: Literal[True],
+    subscription_uuid: str,
+):
+    """Tests that a ping committed after the cursor moved past its ID is sent again"""
+    app.config["PING_DELTA_RESCAN"] = 30
+    with app.app_context():
+        service_id = db.session.scalar(
+            db.select(Subscription.service_id).filter_by(uuid=UUID(subscription_uuid))
+        )
+        # Another prober draws a higher ID, and commits first
+        ping = Ping(
+            service_id=service_id,
+            http_status=HTTPStatus.OK,
+            response_time=timedelta(seconds=1),
+            pinged_at=NOW + timedelta(seconds=15),
+        )
+        ping.id = 10
+        db.session.add(ping)
+        db.session.commit()
+    cursor = get_delta(app, client, subscription_uuid).json["cursor"]
+    assert cursor == 10
+
+    with app.app_context():
+        ping = Ping(
+            service_id=service_id,
+            http_status=HTTPStatus.GATEWAY_TIMEOUT,
+            response_time=timedelta(seconds=-1),
+            pinged_at=NOW + timedelta(seconds=12),
+        )
+        ping.id = 5
+        db.session.add(ping)
+        db.session.commit()
+    save_ping(app, subscription_uuid, seconds=20)
+
+    response = get_delta(app, client, subscription_uuid, cursor=cursor)
+
+    assert response.status_code == HTTPStatus.OK
+    assert HTTPStatus.GATEWAY_TIMEOUT in response.json["status"]
+    assert response.json["status"][-1] == HTTPStatus.BAD_GATEWAY
+    assert response.json["cursor"] > cursor
+
+
+def test_delta_ignores_wait_under_wsgi(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: Literal[True],
+    subscription_uuid: str,
+):
+    """Tests that the Flask view answers right away, leaving long polls to ASGI"""
+    cursor = get_delta(app, client, subscription_uuid).json["cursor"]
+
+    started = time.perf_counter()
+    response = get_delta(app, client, subscription_uuid, cursor=cursor, wait=10)
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert time.perf_counter() - started < 5
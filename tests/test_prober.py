@@ -0,0 +1,307 @@
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytz
+from flask import Flask
+from sqlalchemy import event, func, select
+
+from downtime_panda.blueprints.service.models import Ping, Service
+from downtime_panda.blueprints.service.prober import ProbeResult, ProbeTarget
+from downtime_panda.extensions import db, ping_broadcaster, ping_writer, prober
+from downtime_panda.metrics import metrics
+
+
+class _HeadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        if self.path == "/slow":
+            time.sleep(1)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def http_server():
+    """A local HTTP server answering every HEAD request with 200 OK"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _HeadHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_port}"
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def engine(app: Flask):
+    """The probe engine, stopped once the test is over"""
+    yield prober
+    prober.shutdown()
+    ping_writer.shutdown()
+
+
+def test_probe_reachable_and_unreachable(app: Flask, engine, http_server: str):
+    """Tests that a batch of probes reports both reachable and unreachable services"""
+    with app.app_context():
+        reachable = Service(http_server)
+        unreachable = Service("http://127.0.0.1:1")
+        db.session.add_all([reachable, unreachable])
+        db.session.commit()
+
+        results = engine.submit(
+            [
+                ProbeTarget(service_id=reachable.id, uri=reachable.uri),
+                ProbeTarget(service_id=unreachable.id, uri=unreachable.uri),
+            ]
+        ).result(timeout=10)
+
+        assert [result.service_id for result in results] == [
+            reachable.id,
+            unreachable.id,
+        ]
+        assert results[0].http_status == HTTPStatus.OK
+        assert results[0].response_time.total_seconds() >= 0
+        assert results[1].http_status == HTTPStatus.NOT_FOUND
+        assert results[1].response_time.total_seconds() == -1
+
+
+def test_ping_service_saves_ping(app: Flask, engine, http_server: str):
+    """Tests that pinging a service through the engine saves a `Ping` for it"""
+    with app.app_context():
+        service = Service(http_server)
+        db.session.add(service)
+        db.session.commit()
+
+        Service.ping_service(service.id).result(timeout=10)
+        ping_writer.flush()
+
+        ping = service.get_latest_ping()
+        assert isinstance(ping, Ping)
+        assert ping.service_id == service.id
+        assert ping.http_response == HTTPStatus.OK
+        # The latest ping cache only holds the public fields
+        assert db.session.get(Ping, ping.id).first_byte_time is not None
+
+
+def test_claim_due_hands_out_services_once(app: Flask):
+    """Tests that a due service is claimed by a single dispatcher tick only"""
+    interval = timedelta(seconds=5)
+    with app.app_context():
+        service = Service.create_if_not_exists("https://a.new.service")
+        now = datetime.now(pytz.utc)
+
+        assert [
+            (target.service_id, target.uri)
+            for target in Service.claim_due(now, interval)
+        ] == [(service.id, service.uri)]
+        assert Service.claim_due(now, interval) == []
+        assert len(Service.claim_due(now + interval, interval)) == 1
+
+
+def test_claim_due_keeps_services_on_their_own_grid(app: Flask):
+    """Tests that probes stay on a fixed grid per service, whatever their own interval"""
+    with app.app_context():
+        fast = Service.create_if_not_exists("https://fast.service", probe_interval=2)
+        slow = Service.create_if_not_exists("https://slow.service")
+        now = datetime.now(pytz.utc)
+        Service.claim_due(now, timedelta(seconds=5))
+        db.session.refresh(fast)
+        db.session.refresh(slow)
+
+        fast_next = fast.next_probe_at.replace(tzinfo=pytz.utc)
+        slow_next = slow.next_probe_at.replace(tzinfo=pytz.utc)
+        assert timedelta(0) < fast_next - now <= timedelta(seconds=2)
+        assert timedelta(0) < slow_next - now <= timedelta(seconds=5)
+
+        # A late tick skips the missed probes, without shifting the grid
+        late = fast_next + timedelta(seconds=4.5)
+        Service.claim_due(late, timedelta(seconds=5))
+        db.session.refresh(fast)
+        assert fast.next_probe_at.replace(tzinfo=pytz.utc) - fast_next == timedelta(
+            seconds=6
+        )
+
+
+def test_next_probe_time_spreads_phases():
+    """Tests that services are spread over the interval, not bunched up"""
+    after = datetime(2026, 1, 1, tzinfo=pytz.utc)
+    offsets = [
+        (Service.next_probe_time(f"https://service-{i}.example", 10, after) - after)
+        for i in range(100)
+    ]
+    seconds = Counter(math.ceil(offset.total_seconds()) for offset in offsets)
+
+    assert all(0 < offset.total_seconds() <= 10 for offset in offsets)
+    assert max(seconds.values()) < 25
+
+
+def test_same_canonical_uri_shares_a_phase():
+    """Tests that services reaching the same resource are due on the same ticks"""
+    after = datetime(2026, 1, 1, tzinfo=pytz.utc)
+
+    assert Service.next_probe_time(
+        "HTTPS://Example.com:443/status/", 10, after
+    ) == Service.next_probe_time("https://example.com/status", 10, after)
+
+
+def test_probe_uses_service_timeout(app: Flask, engine, http_server: str):
+    """Tests that a probe gives up after the timeout of its own service"""
+    with app.app_context():
+        [result] = engine.submit(
+            [ProbeTarget(service_id=1, uri=f"{http_server}/slow", timeout=0.2)]
+        ).result(timeout=10)
+
+    assert result.http_status == HTTPStatus.NOT_FOUND
+    assert result.response_time.total_seconds() == -1
+
+
+def test_probe_observes_schedule_lag(app: Flask, engine, http_server: str):
+    """Tests that a probe records how late it started compared to its schedule"""
+    lag = metrics.histogram("probe_schedule_lag_seconds")
+    before = lag.count
+    scheduled_at = datetime.now(pytz.utc) - timedelta(seconds=3)
+    with app.app_context():
+        engine.submit(
+            [ProbeTarget(service_id=1, uri=http_server, scheduled_at=scheduled_at)]
+        ).result(timeout=10)
+
+    assert lag.count == before + 1
+    assert lag.max >= 3
+
+
+def test_probes_reuse_pooled_connections(app: Flask, engine, http_server: str):
+    """Tests that a second probe of a host reuses the connection, timing only the first byte"""
+    target = ProbeTarget(service_id=1, uri=http_server)
+    with app.app_context():
+        [cold] = engine.submit([target]).result(timeout=10)
+        [warm] = engine.submit([target]).result(timeout=10)
+
+    assert cold.connect_time is not None
+    assert cold.first_byte_time is not None
+    assert warm.connect_time is None
+    assert warm.first_byte_time is not None
+
+
+def test_cold_connections_time_every_handshake(app: Flask, engine, http_server: str):
+    """Tests that the cold connection mode opens a new connection for every probe"""
+    engine.cold_connections = True
+    target = ProbeTarget(service_id=1, uri=http_server)
+    try:
+        with app.app_context():
+            results = [engine.submit([target]).result(timeout=10)[0] for _ in range(2)]
+    finally:
+        engine.cold_connections = False
+
+    assert all(result.connect_time is not None for result in results)
+
+
+def test_targets_sharing_a_uri_are_probed_once(app: Flask, engine, http_server: str):
+    """Tests that services differing only in the form of their URI share one request"""
+    coalesced = metrics.counter("probe_coalesced_total")
+    before = coalesced.value
+    uris = [f"{http_server}/", f"{http_server.upper()}", f"{http_server}/?b=2&a=1"]
+    with app.app_context():
+        results = engine.submit(
+            [ProbeTarget(service_id=i, uri=uri) for i, uri in enumerate(uris)]
+        ).result(timeout=10)
+
+    assert [result.service_id for result in results] == [0, 1, 2]
+    assert coalesced.value == before + 1
+    assert results[0].pinged_at == results[1].pinged_at != results[2].pinged_at
+
+
+def test_crashing_probe_only_fails_its_target(
+    app: Flask, engine, http_server: str, monkeypatch: pytest.MonkeyPatch
+):
+    """Tests that an unexpected error in one probe does not fail the whole batch"""
+    crashing = f"{http_server}/crash"
+    engine.start()
+    head = engine._session.head
+
+    def head_or_crash(uri, **kwargs):
+        if uri == crashing:
+            raise RuntimeError("unexpected")
+        return head(uri, **kwargs)
+
+    monkeypatch.setattr(engine._session, "head", head_or_crash)
+    with app.app_context():
+        results = engine.submit(
+            [ProbeTarget(service_id=0, uri=http_server), ProbeTarget(1, crashing)]
+        ).result(timeout=10)
+
+    assert [result.http_status for result in results] == [
+        HTTPStatus.OK,
+        HTTPStatus.NOT_FOUND,
+    ]
+    assert results[1].response_time.total_seconds() == -1
+
+
+def test_writer_saves_batch_with_single_commit(app: Flask, service: Service):
+    """Tests that queued results are saved together, in a single transaction"""
+    with app.app_context():
+        commits = []
+        count_commit = commits.append
+        event.listen(db.engine, "commit", count_commit)
+        try:
+            for _ in range(3):
+                ping_writer.put(
+                    ProbeResult(
+                        service_id=service.id,
+                        http_status=HTTPStatus.OK,
+                        response_time=timedelta(seconds=1),
+                        pinged_at=datetime.now(pytz.utc),
+                    )
+                )
+            ping_writer.flush()
+        finally:
+            event.remove(db.engine, "commit", count_commit)
+            ping_writer.shutdown()
+
+        assert len(commits) == 1
+        assert db.session.scalar(select(func.count(Ping.id))) == 3
+
+
+def test_writer_keeps_valid_pings_of_failing_batch(
+    app: Flask, service: Service, monkeypatch: pytest.MonkeyPatch
+):
+    """Tests that a bad result only drops itself, and the IDs follow the batch order"""
+    with app.app_context():
+        dropped = metrics.counter("ping_writer_dropped_total")
+        before = dropped.value
+        saved = []
+        monkeypatch.setattr(ping_broadcaster, "publish", saved.extend)
+        try:
+            for status in (HTTPStatus.OK, None, HTTPStatus.BAD_GATEWAY):
+                ping_writer.put_nowait(
+                    ProbeResult(
+                        service_id=service.id,
+                        http_status=status,
+                        response_time=timedelta(seconds=1),
+                        pinged_at=datetime.now(pytz.utc),
+                    )
+                )
+            ping_writer.flush()
+        finally:
+            ping_writer.shutdown()
+
+        assert dropped.value == before + 1
+        assert [result.http_status for result in saved] == [
+            HTTPStatus.OK,
+            HTTPStatus.BAD_GATEWAY,
+        ]
+        for result in saved:
+            assert db.session.get(Ping, result.ping_id).http_response == (
+                result.http_status
+            )
@@ -0,0 +1,144 @@
+import os
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+import pytz
+from flask import Flask
+from sqlalchemy import func, select, text
+
+from downtime_panda import create_app
+from downtime_panda.blueprints.service.models import Ping, Service
+from downtime_panda.blueprints.service.retention import (
+    DEFAULT_PARTITION,
+    PARTITION_INTERVALS,
+    create_upcoming_partitions,
+    delete_expired_pings,
+    drop_expired_partitions,
+    enforce_ping_retention,
+    get_partitions,
+    is_ping_partitioned,
+)
+from downtime_panda.config import TestingConfig
+from downtime_panda.extensions import db
+
+NOW = datetime.now(pytz.utc)
+
+# Same format as DTPANDA_DB_URL; the database is wiped by the tests
+POSTGRESQL_URL = os.getenv("DTPANDA_TEST_DB_URL")
+
+
+@pytest.fixture()
+def service_pings() -> list[tuple]:
+    """5 pings older than 100 days and 3 pings from the last hour"""
+    pinged_at = [NOW - timedelta(days=100, minutes=i) for i in range(5)]
+    pinged_at += [NOW - timedelta(minutes=i) for i in range(3)]
+    return [(timestamp, HTTPStatus.OK, 1) for timestamp in pinged_at]
+
+
+def count_pings() -> int:
+    return db.session.scalar(select(func.count(Ping.id)))
+
+
+def test_delete_expired_pings_in_batches(app: Flask, service: Service):
+    """Tests that the batched delete removes every expired ping, and only those"""
+    with app.app_context():
+        deleted = delete_expired_pings(NOW - timedelta(days=90), batch_size=2)
+
+        assert deleted == 5
+        assert count_pings() == 3
+
+
+def test_retention_job_falls_back_to_delete(app: Flask, service: Service):
+    """Tests that, without partitioning, the retention job deletes expired pings"""
+    app.config["PING_RETENTION_DAYS"] = 90
+    with app.app_context():
+        assert not is_ping_partitioned()
+
+        enforce_ping_retention()
+
+        assert count_pings() == 3
+
+
+def test_retention_disabled(app: Flask, service: Service):
+    """Tests that a retention of 0 days keeps every ping"""
+    app.config["PING_RETENTION_DAYS"] = 0
+    with app.app_context():
+        enforce_ping_retention()
+
+        assert count_pings() == 8
+
+
+# ---------------------------------------------------------------------------- #
+#                                  POSTGRESQL                                  #
+# ---------------------------------------------------------------------------- #
+@pytest.fixture()
+def postgresql_app() -> Flask:
+    """An app on an empty PostgreSQL database, upgraded to the latest migration"""
+    if not POSTGRESQL_URL:
+        pytest.skip("DTPANDA_TEST_DB_URL is not set")
+
+    class PostgreSQLConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"postgresql+psycopg://{POSTGRESQL_URL}"
+
+    app = create_app(PostgreSQLConfig)
+    with app.app_context():
+        db.session.execute(text("DROP SCHEMA public CASCADE"))
+        db.session.execute(text("CREATE SCHEMA public"))
+        db.session.commit()
+    assert app.test_cli_runner().invoke(args=["schema", "init"]).exit_code == 0
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+def save_ping(service: Service, pinged_at: datetime) -> str:
+    """Save a ping, returning the name of the partition it landed in"""
+    ping = Ping(
+        service_id=service.id,
+        http_status=HTTPStatus.OK,
+        response_time=timedelta(seconds=1),
+        pinged_at=pinged_at,
+    )
+    db.session.add(ping)
+    db.session.commit()
+    return partition_of(ping)
+
+
+def partition_of(ping: Ping) -> str | None:
+    return db.session.scalar(
+        text("SELECT tableoid::regclass::text FROM ping WHERE id = :id"),
+        {"id": ping.id},
+    )
+
+
+@pytest.mark.postgresql
+def test_partitions_and_retention(postgresql_app: Flask):
+    """Tests that pings past the last partition are kept, moved, then dropped once expired"""
+    with postgresql_app.app_context():
+        assert is_ping_partitioned()
+        assert DEFAULT_PARTITION in get_partitions()
+
+        service = Service.create_if_not_exists("https://random.nonexistent.service")
+        old = NOW - timedelta(days=100)
+        future = NOW + timedelta(days=30)
+        assert save_ping(service, old) == "ping_legacy"
+        assert save_ping(service, future) == DEFAULT_PARTITION
+
+        create_upcoming_partitions(NOW, PARTITION_INTERVALS["day"], 35)
+
+        partitions = get_partitions()
+        assert f"ping_p{future:%Y%m%d}" in partitions
+        moved = db.session.scalars(select(Ping).where(Ping.pinged_at == future)).one()
+        assert partition_of(moved) == f"ping_p{future:%Y%m%d}"
+
+        save_ping(service, NOW + timedelta(days=60))
+        drop_expired_partitions(NOW + timedelta(days=90))
+
+        assert "ping_legacy" not in get_partitions()
+        assert f"ping_p{future:%Y%m%d}" not in get_partitions()
+        assert DEFAULT_PARTITION in get_partitions()
+        assert count_pings() == 0
@@ -0,0 +1,196 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from typing import Literal
+
+import pytest
+import pytz
+from flask import Flask, url_for
+from flask.testing import FlaskClient
+from sqlalchemy import select
+
+from downtime_panda.blueprints.service.models import Ping, PingRollup, Service
+from downtime_panda.blueprints.service.rollups import refresh_rollups
+from downtime_panda.blueprints.subscription.models import Subscription
+from downtime_panda.blueprints.user.models import User
+from downtime_panda.extensions import db
+
+HOUR = datetime(2025, 6, 9, 10, 0, 0, tzinfo=pytz.utc)
+
+
+@pytest.fixture()
+def service_pings() -> list[tuple]:
+    """3 pings in the first minute and one, unreachable, in the next one"""
+    return [
+        (HOUR, HTTPStatus.OK, 0.1),
+        (HOUR + timedelta(seconds=5), HTTPStatus.OK, 0.3),
+        (HOUR + timedelta(seconds=10), HTTPStatus.INTERNAL_SERVER_ERROR, 0.2),
+        (HOUR + timedelta(minutes=1), HTTPStatus.NOT_FOUND, -1),
+    ]
+
+
+def get_rollups(resolution: int) -> list[PingRollup]:
+    query = (
+        select(PingRollup)
+        .filter_by(resolution=resolution)
+        .order_by(PingRollup.bucket_start)
+    )
+    return db.session.scalars(query).all()
+
+
+def test_refresh_rollups(app: Flask, service: Service):
+    """Tests that pings are aggregated in minute buckets, then merged in hour buckets"""
+    with app.app_context():
+        refresh_rollups(HOUR + timedelta(minutes=5), max_buckets=60)
+
+        first_minute, second_minute = get_rollups(60)
+        assert first_minute.count == 3
+        assert first_minute.failures == 1
+        assert first_minute.response_time_min == pytest.approx(0.1)
+        assert first_minute.response_time_avg == pytest.approx(0.2)
+        assert first_minute.response_time_max == pytest.approx(0.3)
+        assert first_minute.response_time_p95 == pytest.approx(0.3)
+        assert first_minute.status_histogram == {"200": 2, "500": 1}
+        assert first_minute.dominant_status == HTTPStatus.OK
+
+        assert second_minute.count == 1
+        assert second_minute.failures == 1
+        assert second_minute.measured == 0
+        assert second_minute.response_time_avg is None
+
+        (hour,) = get_rollups(3600)
+        assert hour.count == 4
+        assert hour.failures == 2
+        assert hour.measured == 3
+        assert hour.response_time_avg == pytest.approx(0.2)
+        assert hour.status_histogram == {"200": 2, "500": 1, "404": 1}
+
+
+@pytest.mark.parametrize(
+    "service_pings",
+    [
+        [
+            (HOUR + timedelta(seconds=second), HTTPStatus.OK, (second + 1) / 100)
+            for second in range(20)
+        ]
+    ],
+)
+def test_refresh_rollups_aggregates_in_database(
+    app: Flask, capture_queries, service: Service
+):
+    """Tests that minute buckets are computed by the database, without loading pings"""
+    with app.app_context():
+        with capture_queries("FROM ping") as queries:
+            refresh_rollups(HOUR + timedelta(minutes=5), max_buckets=60)
+
+        (minute,) = get_rollups(60)
+        assert minute.count == minute.measured == 20
+        assert minute.response_time_min == pytest.approx(0.01)
+        assert minute.response_time_avg == pytest.approx(0.105)
+        assert minute.response_time_max == pytest.approx(0.2)
+        assert minute.response_time_p95 == pytest.approx(0.19)
+        assert minute.status_histogram == {"200": 20}
+    assert not any("ping.id" in query.statement for query in queries)
+
+
+def test_refresh_rollups_is_incremental(app: Flask, service: Service):
+    """Tests that running the rollups again picks up new pings without duplicates"""
+    with app.app_context():
+        db.session.add(service)
+        refresh_rollups(HOUR + timedelta(minutes=5), max_buckets=60)
+
+        service.ping.add(
+            Ping(
+                service_id=service.id,
+                http_status=HTTPStatus.OK,
+                response_time=timedelta(seconds=0.5),
+                pinged_at=HOUR + timedelta(minutes=1, seconds=5),
+            )
+        )
+        db.session.commit()
+        refresh_rollups(HOUR + timedelta(minutes=5), max_buckets=60)
+
+        assert [rollup.count for rollup in get_rollups(60)] == [3, 2]
+        assert [rollup.count for rollup in get_rollups(3600)] == [5]
+
+
+def test_refresh_rollups_skips_gaps(app: Flask, service: Service):
+    """Tests that a stretch without pings longer than a run does not stall the rollups"""
+    later = HOUR + timedelta(hours=5)
+    now = later + timedelta(minutes=10)
+    with app.app_context():
+        db.session.add(service)
+        refresh_rollups(HOUR + timedelta(minutes=5), max_buckets=60)
+
+        service.ping.add(
+            Ping(
+                service_id=service.id,
+                http_status=HTTPStatus.OK,
+                response_time=timedelta(seconds=0.5),
+                pinged_at=later,
+            )
+        )
+        db.session.commit()
+        refresh_rollups(now, max_buckets=60)
+
+        minutes = get_rollups(60)
+        assert [rollup.bucket_start.replace(tzinfo=pytz.utc) for rollup in minutes] == [
+            HOUR,
+            HOUR + timedelta(minutes=1),
+            later,
+        ]
+        assert [rollup.count for rollup in get_rollups(3600)] == [4, 1]
+
+
+@pytest.mark.parametrize(
+    "span, resolution",
+    [
+        (timedelta(minutes=30), None),
+        (timedelta(hours=6), 60),
+        (timedelta(days=7), 3600),
+        (timedelta(days=365), 86400),
+    ],
+)
+def test_get_series_resolution(
+    app: Flask, service: Service, span: timedelta, resolution: int | None
+):
+    """Tests that the series uses the finest resolution fitting the point budget"""
+    with app.app_context():
+        db.session.add(service)
+        refresh_rollups(HOUR + timedelta(minutes=5), max_buckets=60)
+
+        picked, points = service.get_series(
+            HOUR - span / 2, HOUR + span / 2, max_points=500
+        )
+
+        assert picked == resolution
+        assert points
+
+
+def test_view_subscription_range(
+    app: Flask,
+    client: FlaskClient,
+    user_alice: User,
+    is_alice_logged_in: Literal[True],
+    service: Service,
+):
+    """Tests that the status page renders a long time range from the rollups"""
+    with app.test_request_context():
+        db.session.add(user_alice)
+        db.session.add(service)
+        subscription = Subscription.subscribe_user_to_service(
+            user_alice, service, "A Random Nonexistent Service"
+        )
+
+        response = client.get(
+            url_for(
+                "subscription.view_subscription", uuid=subscription.uuid, range="1y"
+            )
+        )
+        assert response.status_code == HTTPStatus.OK
+
+        response = client.get(
+            url_for(
+                "subscription.view_subscription", uuid=subscription.uuid, range="2y"
+            )
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,98 @@
+import struct
+from array import array
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import pytz
+
+from downtime_panda.blueprints.service.models import Ping, PingRollup
+from downtime_panda.blueprints.subscription.series import BINARY_HEADER, PingSeries
+
+NOW = datetime(2025, 6, 9, 10, 0, 0, tzinfo=pytz.utc)
+NOW_MS = 1749463200000
+
+
+def make_series() -> PingSeries:
+    return PingSeries.from_points(
+        [
+            Ping(
+                service_id=1,
+                http_status=HTTPStatus.OK,
+                response_time=timedelta(milliseconds=100),
+                pinged_at=NOW,
+            ),
+            Ping(
+                service_id=1,
+                http_status=HTTPStatus.BAD_GATEWAY,
+                response_time=timedelta(seconds=2),
+                # SQLite hands back naive datetimes
+                pinged_at=(NOW + timedelta(seconds=5)).replace(tzinfo=None),
+            ),
+            PingRollup(
+                service_id=1,
+                resolution=60,
+                bucket_start=NOW + timedelta(minutes=1),
+                count=1,
+                failures=1,
+                measured=0,
+                response_time_avg=None,
+                status_histogram={"503": 1},
+            ),
+        ]
+    )
+
+
+def test_packed_json():
+    """Tests that timestamps are delta encoded, and response times kept to float32"""
+    assert make_series().to_json() == {
+        "t0": NOW_MS,
+        "dt": [0, 5000, 55000],
+        "rt": [0.1, 2.0, -1],
+        "status": [200, 502, 503],
+    }
+
+
+def test_empty_series():
+    """Tests that an empty series encodes to empty columns"""
+    series = PingSeries.from_points([])
+
+    assert series.to_json() == {"t0": 0, "dt": [], "rt": [], "status": []}
+    assert series.to_binary(cursor=7) == BINARY_HEADER.pack(0, 2, 0, 7)
+
+
+def test_binary_typed_arrays():
+    """Tests the layout of the binary encoding, column by column"""
+    payload = make_series().to_binary(cursor=42)
+
+    count, version, t0, cursor = BINARY_HEADER.unpack_from(payload)
+    assert (count, version, t0, cursor) == (3, 2, NOW_MS, 42)
+
+    offset = BINARY_HEADER.size
+    dt = struct.unpack_from("<3q", payload, offset)
+    rt = struct.unpack_from("<3f", payload, offset + 8 * count)
+    status = struct.unpack_from("<3H", payload, offset + 12 * count)
+    assert dt == (0, 5000, 55000)
+    assert list(rt) == list(array("f", [0.1, 2.0, -1]))
+    assert status == (200, 502, 503)
+    assert len(payload) == offset + 14 * count
+
+
+def test_binary_long_gaps():
+    """Tests that points more than 24.8 days apart, past an int32 of milliseconds, are encoded"""
+    gap = timedelta(days=60)
+    series = PingSeries.from_points(
+        [
+            Ping(
+                service_id=1,
+                http_status=HTTPStatus.OK,
+                response_time=timedelta(milliseconds=100),
+                pinged_at=pinged_at,
+            )
+            for pinged_at in (NOW, NOW + gap)
+        ]
+    )
+
+    payload = series.to_binary()
+
+    dt = struct.unpack_from("<2q", payload, BINARY_HEADER.size)
+    assert dt == (0, gap // timedelta(milliseconds=1))
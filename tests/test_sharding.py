@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytz
+from flask import Flask
+
+from downtime_panda.blueprints.service.dispatcher import (
+    release_prober_lease,
+    renew_prober_lease,
+)
+from downtime_panda.blueprints.service.models import ProberLease, Service
+from downtime_panda.blueprints.service.sharding import HashRing, ProberShard
+from downtime_panda.extensions import db, prober_shard
+
+SLOTS = 1024
+
+
+def shard(app: Flask, prober_id: str, members: list[str]) -> ProberShard:
+    app.config["PROBER_ID"] = prober_id
+    shard = ProberShard(app)
+    shard.rebalance(members)
+    return shard
+
+
+def claim(shard: ProberShard, now: datetime, **kwargs) -> set[int]:
+    targets = Service.claim_due(
+        now,
+        timedelta(seconds=5),
+        slots=shard.slots,
+        slot_count=shard.slot_count,
+        **kwargs,
+    )
+    return {target.service_id for target in targets}
+
+
+def test_ring_assigns_every_slot_once():
+    """Tests that the slots are spread over every prober, each slot to a single one"""
+    probers = ["a", "b", "c"]
+    ring = HashRing(probers)
+    shares = [ring.slots_of(prober, SLOTS) for prober in probers]
+
+    assert set().union(*shares) == set(range(SLOTS))
+    assert sum(len(share) for share in shares) == SLOTS
+    # Virtual nodes keep the shares roughly even
+    assert all(len(share) > SLOTS / 3 / 2 for share in shares)
+
+
+def test_ring_moves_few_slots_when_a_prober_joins():
+    """Tests that a new prober only takes slots over, without reshuffling the others"""
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+
+    moved = [slot for slot in range(SLOTS) if before.owner(slot) != after.owner(slot)]
+
+    assert all(after.owner(slot) == "d" for slot in moved)
+    assert len(moved) < SLOTS / 2
+
+
+def test_shards_claim_disjoint_services(app: Flask):
+    """Tests that the probers split the due services, none probed twice or skipped"""
+    with app.app_context():
+        service_ids = {
+            Service.create_if_not_exists(f"https://service-{i}.example").id
+            for i in range(50)
+        }
+        first = shard(app, "first", ["first", "second"])
+        second = shard(app, "second", ["first", "second"])
+        now = datetime.now(pytz.utc)
+
+        claimed_first = claim(first, now)
+        claimed_second = claim(second, now)
+
+    assert claimed_first.isdisjoint(claimed_second)
+    assert claimed_first | claimed_second == service_ids
+    assert claimed_first and claimed_second
+
+
+def test_overdue_services_of_dead_prober_are_taken_over(app: Flask):
+    """Tests that services left overdue by a dead prober are claimed by the others"""
+    with app.app_context():
+        created = datetime.now(pytz.utc)
+        for i in range(20):
+            Service.create_if_not_exists(f"https://service-{i}.example")
+        survivor = shard(app, "survivor", ["survivor", "dead"])
+        now = datetime.now(pytz.utc)
+
+        claimed = claim(survivor, now)
+        assert len(claimed) < 20
+
+        # Not overdue for long enough yet: still left to their owner
+        assert claim(survivor, now, orphaned_before=created) == set()
+
+        taken_over = claim(survivor, now, orphaned_before=now)
+        assert len(claimed) + len(taken_over) == 20
+
+
+def test_lease_renewal_rebalances(app: Flask):
+    """Tests that probers joining and leaving through their leases rebalance the shards"""
+    with app.app_context():
+        prober_shard.prober_id = "me"
+        renew_prober_lease()
+        assert prober_shard.members == {"me"}
+        assert len(prober_shard.slots) == prober_shard.slot_count
+
+        ProberLease.renew("other", datetime.now(pytz.utc) + timedelta(seconds=15))
+        renew_prober_lease()
+        assert prober_shard.members == {"me", "other"}
+        assert 0 < len(prober_shard.slots) < prober_shard.slot_count
+
+        # An expired lease no longer counts
+        ProberLease.renew("other", datetime.now(pytz.utc) - timedelta(seconds=1))
+        renew_prober_lease()
+        assert prober_shard.members == {"me"}
+
+        release_prober_lease()
+        assert db.session.get(ProberLease, "me") is None
+
+
+def test_single_leader(app: Flask):
+    """Tests that exactly one of the live probers runs the jobs shared by all of them"""
+    members = ["a", "b", "c"]
+    leaders = [shard(app, member, members).is_leader for member in members]
+
+    assert leaders.count(True) == 1
@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from http import HTTPStatus
 from typing import Literal
 
@@ -6,7 +7,7 @@ from flask import Flask, url_for
 from flask.testing import FlaskClient
 from sqlalchemy import exists
 
-from downtime_panda.blueprints.service.models import Service
+from downtime_panda.blueprints.service.models import Ping, Service
 from downtime_panda.blueprints.subscription.messages import (
     SUBSCRIPTION_REGISTRATION_SUCCESSFUL,
 )
@@ -15,17 +16,6 @@ from downtime_panda.blueprints.user.models import User
 from downtime_panda.extensions import db
 
 
-@pytest.fixture()
-def existing_service(app: Flask):
-    """Represents a service, saved in the app"""
-    with app.app_context():
-        service = Service("https://random.nonexistent.service")
-        db.session.add(service)
-        db.session.commit()
-
-    return service
-
-
 def test_subscribing_to_new_service(
     app: Flask,
     client: FlaskClient,
@@ -71,18 +61,16 @@ def test_subscribing_to_existing_service(
     client: FlaskClient,
     user_alice: User,
     is_alice_logged_in: Literal[True],
-    existing_service: Service,
+    service: Service,
 ):
     """Tests subscribing to a service that already exists in the db"""
     SUB_NAME = "An Existing Service"
 
     with app.app_context():
         db.session.add(user_alice)
-        db.session.add(existing_service)
+        db.session.add(service)
 
-        assert db.session.query(
-            exists().where(Service.uri == existing_service.uri)
-        ).scalar()
+        assert db.session.query(exists().where(Service.uri == service.uri)).scalar()
 
     with app.test_request_context():
         response = client.post(
@@ -90,7 +78,7 @@ def test_subscribing_to_existing_service(
                 "subscription.service_subscribe",
             ),
             data={
-                "uri": existing_service.uri,
+                "uri": service.uri,
                 "name": SUB_NAME,
             },
             follow_redirects=True,
@@ -106,3 +94,42 @@ def test_subscribing_to_existing_service(
                 Subscription.user_id == user_alice.id,
             )
         ).scalar()
+
+
+@pytest.mark.parametrize("subscription_count", [1, 10])
+def test_list_subscriptions_query_count(
+    app: Flask,
+    client: FlaskClient,
+    capture_queries,
+    user_alice: User,
+    is_alice_logged_in: Literal[True],
+    subscription_count: int,
+):
+    """Tests that listing subscriptions takes the same queries, however many there are"""
+    LIST_QUERIES = 2  # the logged in user, then the subscriptions with their pings
+
+    with app.app_context():
+        db.session.add(user_alice)
+        for i in range(subscription_count):
+            service = Service(f"https://service-{i}.nonexistent.service")
+            db.session.add(service)
+            db.session.commit()
+            for minutes in range(3):
+                service.ping.add(
+                    Ping(
+                        service_id=service.id,
+                        http_status=HTTPStatus.OK if minutes < 2 else 418,
+                        response_time=timedelta(seconds=1),
+                        pinged_at=datetime(2025, 6, 9, 0, minutes, 0),
+                    )
+                )
+            Subscription.subscribe_user_to_service(user_alice, service, f"Service {i}")
+
+    with app.test_request_context():
+        url = url_for("subscription.list_subscriptions")
+    with capture_queries() as queries:
+        response = client.get(url)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.data.count(b"Latest status: 418") == subscription_count
+    assert len(queries) == LIST_QUERIES
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from http import HTTPStatus
+from uuid import uuid4
 
 import pytest
 from flask import Flask, url_for
@@ -13,17 +14,6 @@ from downtime_panda.blueprints.user.models import User
 from downtime_panda.extensions import db
 
 
-@pytest.fixture()
-def service(app: Flask):
-    """Represents a service, saved in the app"""
-    with app.app_context():
-        service = Service("https://random.nonexistent.service")
-        db.session.add(service)
-        db.session.commit()
-
-    return service
-
-
 @pytest.fixture()
 def ping_for_service(app: Flask, service: Service):
     """Represents a single status ping done to a service"""
@@ -151,3 +141,113 @@ def test_api_no_pings(
         )
 
         assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.fixture()
+def alice_subscriptions(app: Flask, user_alice: User) -> list[str]:
+    """UUIDs of 10 subscriptions of Alice, to services with a ping each but the last"""
+    uuids = []
+    with app.app_context():
+        db.session.add(user_alice)
+        for i in range(10):
+            service = Service(f"https://random{i}.nonexistent.service")
+            db.session.add(service)
+            db.session.commit()
+            if i < 9:
+                service.ping.add(
+                    Ping(
+                        service_id=service.id,
+                        http_status=HTTPStatus.OK,
+                        response_time=timedelta(seconds=1),
+                        pinged_at=datetime(2025, 6, 9, 0, 0, i),
+                    )
+                )
+                db.session.commit()
+            subscription = Subscription.subscribe_user_to_service(
+                user_alice, service, f"Service {i}"
+            )
+            uuids.append(str(subscription.uuid))
+
+    return uuids
+
+
+def get_statuses(app: Flask, client: FlaskClient, token: APIToken, **kwargs):
+    with app.test_request_context():
+        db.session.add(token)
+        url = url_for("subscription_api.get_statuses")
+        authorization = f"Bearer {token.token}"
+
+    if "json" in kwargs:
+        return client.post(
+            url, json=kwargs["json"], headers={"Authorization": authorization}
+        )
+    return client.get(
+        url, query_string=kwargs, headers={"Authorization": authorization}
+    )
+
+
+def test_api_statuses_constant_queries(
+    app: Flask,
+    client: FlaskClient,
+    capture_queries,
+    alice_token: APIToken,
+    alice_subscriptions: list[str],
+):
+    """Tests that checking 1 or 10 subscriptions costs the same number of queries"""
+    # Cache the token first
+    get_statuses(app, client, alice_token)
+    with capture_queries() as one_queries:
+        one = get_statuses(
+            app, client, alice_token, subscription_uuid=alice_subscriptions[:1]
+        )
+    with capture_queries() as every_queries:
+        every = get_statuses(app, client, alice_token)
+
+    assert one.status_code == HTTPStatus.OK
+    assert set(one.json["statuses"]) == set(alice_subscriptions[:1])
+    assert every.status_code == HTTPStatus.OK
+    assert set(every.json["statuses"]) == set(alice_subscriptions)
+    assert every.json["statuses"][alice_subscriptions[-1]] is None
+    assert every.json["statuses"][alice_subscriptions[0]] == {
+        "http_response": HTTPStatus.OK,
+        "response_time": 1.0,
+        "pinged_at": datetime(2025, 6, 9, 0, 0, 0).isoformat(),
+    }
+    assert len(one_queries) == len(every_queries)
+
+
+def test_api_statuses_post(
+    app: Flask,
+    client: FlaskClient,
+    alice_token: APIToken,
+    alice_subscriptions: list[str],
+):
+    """Tests the JSON body of the batch endpoint, and the report of unknown UUIDs"""
+    unknown = "00000000-0000-0000-0000-000000000000"
+    response = get_statuses(
+        app,
+        client,
+        alice_token,
+        json={"subscription_uuids": [*alice_subscriptions[3:5], unknown]},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json["statuses"]) == set(alice_subscriptions[3:5])
+    assert response.json["not_found"] == [unknown]
+
+
+def test_api_statuses_bad_requests(
+    app: Flask, client: FlaskClient, alice_token: APIToken
+):
+    """Tests that invalid UUIDs and oversized batches are refused"""
+    invalid = get_statuses(app, client, alice_token, subscription_uuid="nope")
+    app.config["STATUS_BATCH_MAX_SIZE"] = 1
+    oversized = get_statuses(
+        app,
+        client,
+        alice_token,
+        json={"subscription_uuids": [str(uuid4()), str(uuid4())]},
+    )
+
+    assert invalid.status_code == HTTPStatus.BAD_REQUEST
+    assert oversized.status_code == HTTPStatus.BAD_REQUEST
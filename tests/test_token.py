@@ -1,19 +1,35 @@
+import hashlib
+import hmac
 from http import HTTPStatus
 
+import pytest
 from flask import Flask, url_for
 from flask.testing import FlaskClient
+from sqlalchemy import select
 
 from downtime_panda.blueprints.token.messages import ERROR_TOKEN_DOESNT_EXIST
 from downtime_panda.blueprints.token.models import APIToken
+from downtime_panda.blueprints.user.models import User
 from downtime_panda.extensions import db
+from downtime_panda.token_cache import TokenCache
 
 
 def test_generate_new_token(client: FlaskClient, app: Flask, is_alice_logged_in: True):
     """Tests the generation of a token for a user (Alice, in this case)"""
     with app.test_request_context():
-        response = client.post(url_for("token.generate_token"), follow_redirects=True)
+        response = client.post(url_for("token.generate_token"))
 
-    assert response.status_code == HTTPStatus.OK
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.cache_control.no_store
+    token = response.text.split("<code>")[1].split("</code>")[0]
+    with app.app_context():
+        assert User.get_by_token(token).username == "alice"
+
+    # Shown once, and never stored in the session cookie
+    with client.session_transaction() as session:
+        assert token not in str(dict(session))
+    with app.test_request_context():
+        assert token not in client.get(url_for("token.list_tokens")).text
 
 
 def test_revoke_token(
@@ -73,3 +89,95 @@ def test_token_revoke_from_unauthorized_user(
         assert response.status_code == HTTPStatus.NOT_FOUND
         assert ERROR_TOKEN_DOESNT_EXIST.encode() in response.data
         assert alice_token.exists()
+
+
+def call_api(app: Flask, client: FlaskClient, token: str):
+    with app.test_request_context():
+        url = url_for("subscription_api.get_statuses")
+    return client.get(url, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_token_saved_as_keyed_hash(app: Flask, alice_token: APIToken):
+    """Tests that tokens are only saved as their keyed hash"""
+    with app.app_context():
+        db.session.add(alice_token)
+        saved = db.session.execute(select(APIToken.__table__)).mappings().one()
+
+    assert alice_token.token not in saved.values()
+    assert (
+        saved["token_hash"]
+        == hmac.new(
+            app.config["API_TOKEN_HASH_KEY"].encode(),
+            alice_token.token.encode(),
+            hashlib.sha256,
+        ).hexdigest()
+    )
+    assert alice_token.token.startswith(saved["token_prefix"])
+
+
+def test_token_cached(
+    app: Flask, client: FlaskClient, capture_queries, alice_token: APIToken
+):
+    """Tests that a token used again is authenticated without looking it up"""
+    token = alice_token.token
+    with capture_queries("FROM api_token") as first:
+        call_api(app, client, token)
+    with capture_queries("FROM api_token") as again:
+        call_api(app, client, token)
+
+    assert len(first) == 1
+    assert again == []
+    assert call_api(app, client, "not-a-token").status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_revoked_token_rejected_at_once(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: True,
+    alice_token: APIToken,
+):
+    """Tests that revoking a token drops it from the cache"""
+    token = alice_token.token
+    assert call_api(app, client, token).status_code == HTTPStatus.OK
+
+    with app.test_request_context():
+        db.session.add(alice_token)
+        client.post(url_for("token.revoke_token", token_id=alice_token.id))
+
+    assert call_api(app, client, token).status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_user_revoke_token_drops_it_from_cache(
+    app: Flask,
+    client: FlaskClient,
+    is_alice_logged_in: True,
+    user_alice: User,
+    alice_token: APIToken,
+):
+    """Tests that a token revoked through its user is rejected at once"""
+    token = alice_token.token
+    assert call_api(app, client, token).status_code == HTTPStatus.OK
+
+    with app.app_context():
+        db.session.add_all([user_alice, alice_token])
+        user_alice.revoke_token(alice_token.id)
+
+    assert call_api(app, client, token).status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_token_cache_lru_and_ttl(monkeypatch: pytest.MonkeyPatch):
+    """Tests that the least recently used token is evicted, and entries expire"""
+    clock = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: clock[0])
+    cache = TokenCache()
+    cache.max_size, cache.ttl = 2, 10
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    clock[0] += 11
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (3, 2)
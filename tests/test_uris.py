@@ -0,0 +1,44 @@
+import pytest
+from flask import Flask
+
+from downtime_panda.blueprints.service.models import Service
+from downtime_panda.blueprints.service.uris import canonical_uri
+from downtime_panda.extensions import db
+
+
+@pytest.mark.parametrize(
+    ("uri", "canonical"),
+    [
+        ("https://example.com", "https://example.com"),
+        ("HTTPS://Example.COM/", "https://example.com"),
+        ("https://example.com:443/status/", "https://example.com/status"),
+        ("http://example.com:8080/?b=2&a=1#top", "http://example.com:8080?a=1&b=2"),
+        ("http://[::1]:80/health", "http://[::1]/health"),
+        ("not a uri", "not a uri"),
+    ],
+)
+def test_canonical_uri(uri: str, canonical: str):
+    """Tests that URIs reaching the same resource share the same canonical form"""
+    assert canonical_uri(uri) == canonical
+
+
+def test_equivalent_uris_share_a_service(app: Flask):
+    """Tests that subscribing to equivalent URIs reuses a single service"""
+    with app.app_context():
+        service = Service.create_if_not_exists("HTTPS://Example.com/status/")
+        same = Service.create_if_not_exists("https://example.com:443/status")
+
+        assert service.id == same.id
+        assert service.uri == "https://example.com/status"
+
+
+def test_legacy_uri_is_reused(app: Flask):
+    """Tests that a service saved before canonicalization is still found by its URI"""
+    with app.app_context():
+        legacy = Service("https://Example.com/legacy/")
+        db.session.add(legacy)
+        db.session.commit()
+
+        assert (
+            Service.create_if_not_exists("https://Example.com/legacy/").id == legacy.id
+        )